@@ -0,0 +1,45 @@
+"""Headless core of the economic simulator.
+
+Everything that runs without a screen lives here: the data models, the
+``Empresa`` turn engine, events, achievements, supply chains, save/load,
+the action journal, autosave, the shared market and the headless tools
+(ensemble, planner and strategy search). Nothing in this package may
+import Qt or OpenGL; ``python -m economia verificar`` checks that and the
+cold-import budget.
+"""
+
+from .modelos import (
+    PROFUNDIDADE_HISTORICO, VERSAO_SAVE_BINARIO, AgregadosCidade, Conquista, Construcao,
+    ConstrucaoModelo, EstadoConstrucoes, Evento, FotoConstrucoes, FotoEmpresa, HistoricoPrecos, Ordem,
+    Recurso, VistaConstrucoes
+)
+from .eventos import (
+    EVENTOS, ICONES_EVENTO, AmostradorAlias, EfeitoCapital, EfeitoPreco, EfeitoProducao,
+    ModificadorProducao, RegistroEventos, TipoEvento
+)
+from .conquistas import STATS_CONQUISTAS, MotorConquistas, compilar_condicao
+from .insumos import resolver_insumos
+from .diario import INTERVALO_CHECKPOINT, DiarioAcoes, reproduzir_diario
+from .empresa import CAPITAL_INICIAL, Empresa
+from .autosave import DIRETORIO_AUTOSAVE, Autosalvamento, StatusAutosave
+from .mercado import Mercado, ResultadoLiquidacao
+from .ensemble import PERCENTIS_ENSEMBLE, ResultadoEnsemble, executar_ensemble
+from .planejador import Acao, AvaliacaoAcao, ResultadoPlanejamento, acoes_legais, planejar_acoes
+from .estrategia import NoBusca, ResultadoEstrategia, buscar_estrategia
+
+__all__ = [
+    'PROFUNDIDADE_HISTORICO', 'VERSAO_SAVE_BINARIO', 'AgregadosCidade', 'Conquista', 'Construcao',
+    'ConstrucaoModelo', 'EstadoConstrucoes', 'Evento', 'FotoConstrucoes', 'FotoEmpresa', 'HistoricoPrecos',
+    'Ordem', 'Recurso', 'VistaConstrucoes',
+    'EVENTOS', 'ICONES_EVENTO', 'AmostradorAlias', 'EfeitoCapital', 'EfeitoPreco', 'EfeitoProducao',
+    'ModificadorProducao', 'RegistroEventos', 'TipoEvento',
+    'STATS_CONQUISTAS', 'MotorConquistas', 'compilar_condicao',
+    'resolver_insumos',
+    'INTERVALO_CHECKPOINT', 'DiarioAcoes', 'reproduzir_diario',
+    'CAPITAL_INICIAL', 'Empresa',
+    'DIRETORIO_AUTOSAVE', 'Autosalvamento', 'StatusAutosave',
+    'Mercado', 'ResultadoLiquidacao',
+    'PERCENTIS_ENSEMBLE', 'ResultadoEnsemble', 'executar_ensemble',
+    'Acao', 'AvaliacaoAcao', 'ResultadoPlanejamento', 'acoes_legais', 'planejar_acoes',
+    'NoBusca', 'ResultadoEstrategia', 'buscar_estrategia',
+]
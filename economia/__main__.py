@@ -0,0 +1,188 @@
+"""Command line entry point: ``python -m economia verificar|benchmark``.
+
+``verificar`` guards the two promises of the headless core: no module of
+the package imports Qt or OpenGL (checked both in the source, so a lazy
+import inside a function is caught too, and in ``sys.modules`` after a
+real import), and a cold import fits the startup budget. NumPy and
+``numpy.random`` are the baseline every ``Empresa`` needs, so the budget
+covers only what the package adds on top of them.
+
+``benchmark`` times the core operations over a grid of city sizes and
+history lengths, writes the report as JSON and, given a baseline report,
+fails on any case that regressed past the tolerance.
+"""
+
+import os
+import sys
+import ast
+import json
+import argparse
+import statistics
+import subprocess
+
+from . import benchmark
+
+MODULOS_GUI = ('PySide6', 'PySide2', 'shiboken6', 'PyQt5', 'PyQt6', 'OpenGL')
+ORCAMENTO_IMPORTACAO_MS = 50.0
+REPETICOES_IMPORTACAO = 7
+
+_MEDIR_IMPORTACAO = """
+import sys, time, json
+t0 = time.perf_counter()
+import numpy, numpy.random
+t1 = time.perf_counter()
+import economia
+t2 = time.perf_counter()
+print(json.dumps({
+    'numpy_ms': (t1 - t0) * 1e3,
+    'economia_ms': (t2 - t1) * 1e3,
+    'gui': sorted(m for m in sys.modules if m.split('.')[0] in %r),
+}))
+""" % (MODULOS_GUI,)
+
+def _raiz_pacote() -> str:
+    return os.path.dirname(os.path.abspath(__file__))
+
+def importacoes_gui() -> list:
+    """(file, line, module) for every Qt/OpenGL import anywhere in the package source."""
+    achados = []
+    raiz = _raiz_pacote()
+    for nome in sorted(os.listdir(raiz)):
+        if not nome.endswith('.py'):
+            continue
+        caminho = os.path.join(raiz, nome)
+        with open(caminho, encoding='utf-8') as f:
+            arvore = ast.parse(f.read(), caminho)
+        for no in ast.walk(arvore):
+            if isinstance(no, ast.Import):
+                modulos = [a.name for a in no.names]
+            elif isinstance(no, ast.ImportFrom) and not no.level:
+                modulos = [no.module or '']
+            else:
+                continue
+            achados += [(nome, no.lineno, m) for m in modulos if m.split('.')[0] in MODULOS_GUI]
+    return achados
+
+def medir_importacao(repeticoes: int = REPETICOES_IMPORTACAO) -> dict:
+    """Import the package in ``repeticoes`` fresh interpreters; medians in ms.
+
+    A first, untimed run writes the bytecode cache, as any installed copy
+    would have it, so the timed runs are cold interpreters but warm files.
+    """
+    ambiente = dict(os.environ)
+    ambiente.pop('PYTHONDONTWRITEBYTECODE', None)
+    ambiente['PYTHONPATH'] = os.pathsep.join(filter(None, [os.path.dirname(_raiz_pacote()),
+                                                           ambiente.get('PYTHONPATH')]))
+    execucoes = []
+    for _ in range(repeticoes + 1):
+        saida = subprocess.run([sys.executable, '-c', _MEDIR_IMPORTACAO], env=ambiente,
+                               capture_output=True, text=True, check=True).stdout
+        execucoes.append(json.loads(saida))
+    execucoes = execucoes[1:]
+    return {
+        'numpy_ms': statistics.median(e['numpy_ms'] for e in execucoes),
+        'economia_ms': statistics.median(e['economia_ms'] for e in execucoes),
+        'gui': sorted({m for e in execucoes for m in e['gui']}),
+    }
+
+def verificar(orcamento_ms: float = ORCAMENTO_IMPORTACAO_MS,
+              repeticoes: int = REPETICOES_IMPORTACAO) -> dict:
+    """Run every check; the report's ``ok`` is False if any of them failed."""
+    fonte = importacoes_gui()
+    medicao = medir_importacao(repeticoes)
+    return {
+        'ok': not fonte and not medicao['gui'] and medicao['economia_ms'] <= orcamento_ms,
+        'importacoes_gui': [f"{arquivo}:{linha} {modulo}" for arquivo, linha, modulo in fonte],
+        'modulos_gui_carregados': medicao['gui'],
+        'numpy_ms': round(medicao['numpy_ms'], 1),
+        'economia_ms': round(medicao['economia_ms'], 1),
+        'orcamento_ms': orcamento_ms,
+    }
+
+def _lista_inteiros(texto: str) -> list:
+    return [int(v) for v in texto.split(',') if v]
+
+def _formatar_chave(chave) -> str:
+    caso, construcoes, historico, compacta = chave
+    return f"{caso:<24}{construcoes:>8}{historico:>8}  {'compacta' if compacta else 'lista'}"
+
+def _main_benchmark(args) -> int:
+    if args.entrada:
+        with open(args.entrada, encoding='utf-8') as f:
+            relatorio = json.load(f)
+    else:
+        modos = {'lista': [False], 'compacta': [True], 'ambos': [False, True]}[args.modo]
+        print(f"{'caso':<24}{'constr.':>8}{'hist.':>8}  {'modo':<10}{'ms/chamada':>12}{'pico KiB':>12}")
+        def progresso(r):
+            print(f"{_formatar_chave(r.chave):<58}{r.ms_mediana:>12.4f}{r.pico_memoria_bytes / 1024:>12.1f}",
+                  flush=True)
+        relatorio = benchmark.executar_benchmark(args.construcoes, args.historicos, modos, args.casos,
+                                                 args.orcamento_s, progresso)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, indent=2)
+        print(f"Relatório salvo em {args.saida}")
+    if not args.comparar:
+        return 0
+
+    with open(args.comparar, encoding='utf-8') as f:
+        base = benchmark.carregar_resultados(json.load(f))
+    atual = benchmark.carregar_resultados(relatorio)
+    regressoes = benchmark.comparar_resultados(base, atual, args.tolerancia_tempo, args.tolerancia_memoria)
+    comparados = len({r.chave for r in base} & {r.chave for r in atual})
+    for reg in regressoes:
+        unidade = 'ms' if reg.metrica == 'ms_mediana' else 'B'
+        print(f"✗ {_formatar_chave(reg.chave)}  {reg.metrica}: {reg.base:.4g} → {reg.atual:.4g} {unidade} "
+              f"(×{reg.razao:.2f})")
+    print(f"{comparados} casos comparados com {args.comparar}: "
+          + (f"{len(regressoes)} regressões" if regressoes else "nenhuma regressão"))
+    return 1 if regressoes else 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m economia', description="Núcleo headless do simulador")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    cmd = comandos.add_parser('verificar', help="falha se o núcleo importar Qt/OpenGL ou estourar o orçamento")
+    cmd.add_argument('--orcamento-ms', type=float, default=ORCAMENTO_IMPORTACAO_MS,
+                     help="tempo máximo de importação além do NumPy")
+    cmd.add_argument('--repeticoes', type=int, default=REPETICOES_IMPORTACAO)
+    cmd.add_argument('--json', action='store_true', help="imprime o relatório em JSON")
+    cmd = comandos.add_parser('benchmark', help="mede as operações do núcleo e compara com uma base")
+    cmd.add_argument('--construcoes', type=_lista_inteiros, default=list(benchmark.TAMANHOS_BENCHMARK),
+                     help="tamanhos de cidade separados por vírgula")
+    cmd.add_argument('--historicos', type=_lista_inteiros, default=list(benchmark.HISTORICOS_BENCHMARK),
+                     help="profundidades de histórico separadas por vírgula")
+    cmd.add_argument('--modo', choices=('lista', 'compacta', 'ambos'), default='ambos',
+                     help="armazenamento das construções")
+    cmd.add_argument('--casos', type=lambda t: [c for c in t.split(',') if c],
+                     default=list(benchmark.CASOS_BENCHMARK), help="operações separadas por vírgula")
+    cmd.add_argument('--orcamento-s', type=float, default=benchmark.ORCAMENTO_CASO_S,
+                     help="tempo de medição por caso")
+    cmd.add_argument('--saida', help="grava o relatório JSON neste arquivo")
+    cmd.add_argument('--entrada', help="usa um relatório já gravado em vez de medir")
+    cmd.add_argument('--comparar', metavar='BASE', help="relatório base; sai com 1 se algum caso regrediu")
+    cmd.add_argument('--tolerancia-tempo', type=float, default=benchmark.TOLERANCIA_TEMPO)
+    cmd.add_argument('--tolerancia-memoria', type=float, default=benchmark.TOLERANCIA_MEMORIA)
+    args = parser.parse_args(argv)
+
+    if args.comando == 'benchmark':
+        try:
+            return _main_benchmark(args)
+        except ValueError as e:
+            parser.error(str(e))
+
+    relatorio = verificar(args.orcamento_ms, args.repeticoes)
+    if args.json:
+        print(json.dumps(relatorio, indent=2))
+    else:
+        for achado in relatorio['importacoes_gui']:
+            print(f"✗ import de GUI no núcleo: {achado}")
+        if relatorio['modulos_gui_carregados']:
+            print(f"✗ módulos de GUI carregados: {', '.join(relatorio['modulos_gui_carregados'])}")
+        marca = '✓' if relatorio['economia_ms'] <= relatorio['orcamento_ms'] else '✗'
+        print(f"{marca} importação a frio: {relatorio['economia_ms']:.1f} ms além do NumPy "
+              f"({relatorio['numpy_ms']:.1f} ms), orçamento {relatorio['orcamento_ms']:.0f} ms")
+        print("OK" if relatorio['ok'] else "FALHOU")
+    return 0 if relatorio['ok'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
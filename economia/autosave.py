@@ -0,0 +1,122 @@
+"""Background autosave into rotating, atomically replaced slots."""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+from datetime import datetime
+
+from .modelos import FotoEmpresa
+from .empresa import Empresa
+
+DIRETORIO_AUTOSAVE = os.path.join(os.path.expanduser('~'), '.simulador3d', 'autosave')
+
+@dataclass
+class StatusAutosave:
+    salvando: bool = False
+    ultimo_arquivo: Optional[str] = None
+    ultimo_turno: Optional[int] = None
+    ultima_hora: Optional[datetime] = None
+    snapshot_ms: float = 0.0  # time the caller's thread spent on the snapshot
+    escrita_ms: float = 0.0   # time the worker spent serializing and syncing
+    erro: Optional[str] = None
+
+def _fsync_diretorio(diretorio: str):
+    """Make a rename inside ``diretorio`` durable (POSIX only)."""
+    if os.name != 'posix':
+        return
+    fd = os.open(diretorio, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class Autosalvamento:
+    """Periodic autosave into a rotating set of ``slots`` binary saves.
+    
+    The caller's thread only takes a copy-on-write snapshot. A worker thread
+    restores it into its own scratch ``Empresa`` (only the pages that changed
+    since the last autosave are copied), serializes it to a temporary file,
+    fsyncs it and renames it over the oldest slot, so a slot on disk is
+    always a complete save.
+    """
+    
+    def __init__(self, diretorio: str = DIRETORIO_AUTOSAVE, slots: int = 3,
+                 intervalo_turnos: Optional[int] = 10, intervalo_segundos: Optional[float] = None):
+        if slots < 1:
+            raise ValueError("É preciso pelo menos um slot de autosave")
+        self.diretorio = diretorio
+        self.slots = slots
+        self.intervalo_turnos = intervalo_turnos
+        self.intervalo_segundos = intervalo_segundos
+        self.status = StatusAutosave()
+        os.makedirs(diretorio, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='autosave')
+        self._futuro = None
+        self._rascunho: Optional[Empresa] = None  # only touched by the worker
+        self._turno_salvo: Optional[int] = None
+        self._hora_salva = time.monotonic()
+    
+    def caminho_slot(self, slot: int) -> str:
+        return os.path.join(self.diretorio, f"autosave_{slot}.npz")
+    
+    def _proximo_slot(self) -> str:
+        """An empty slot if there is one, else the oldest."""
+        caminhos = [self.caminho_slot(i) for i in range(self.slots)]
+        for caminho in caminhos:
+            if not os.path.exists(caminho):
+                return caminho
+        return min(caminhos, key=os.path.getmtime)
+    
+    def devido(self, empresa: Empresa) -> bool:
+        if self.intervalo_turnos and (self._turno_salvo is None
+                                      or empresa.turno - self._turno_salvo >= self.intervalo_turnos):
+            return True
+        return bool(self.intervalo_segundos) and time.monotonic() - self._hora_salva >= self.intervalo_segundos
+    
+    def verificar(self, empresa: Empresa) -> bool:
+        """Start an autosave if one is due and none is running. Returns whether one started."""
+        if self._futuro is not None and not self._futuro.done():
+            return False
+        if not self.devido(empresa):
+            return False
+        self.salvar_agora(empresa)
+        return True
+    
+    def salvar_agora(self, empresa: Empresa):
+        inicio = time.perf_counter()
+        foto = empresa.capturar()
+        self.status.snapshot_ms = (time.perf_counter() - inicio) * 1000
+        self.status.salvando = True
+        self._turno_salvo = foto.turno
+        self._hora_salva = time.monotonic()
+        self._futuro = self._executor.submit(self._gravar, foto, empresa.profundidade_historico)
+    
+    def _gravar(self, foto: FotoEmpresa, profundidade_historico: int):
+        inicio = time.perf_counter()
+        try:
+            if self._rascunho is None:
+                self._rascunho = Empresa(profundidade_historico, compacta=True)
+            self._rascunho.restaurar(foto)
+            caminho = self._proximo_slot()
+            temporario = caminho + '.tmp'
+            with open(temporario, 'wb') as f:
+                self._rascunho.salvar_binario(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, caminho)
+            _fsync_diretorio(self.diretorio)
+            self.status.ultimo_arquivo = caminho
+            self.status.ultimo_turno = foto.turno
+            self.status.ultima_hora = datetime.now()
+            self.status.erro = None
+        except Exception as e:
+            self.status.erro = str(e)
+        finally:
+            self.status.escrita_ms = (time.perf_counter() - inicio) * 1000
+            self.status.salvando = False
+    
+    def encerrar(self):
+        """Wait for a save in progress and stop the worker."""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,200 @@
+"""Benchmark suite for the economy core: ``python -m economia benchmark``.
+
+Every case times one public ``Empresa`` operation on a synthetic city of a
+given size and price-history length, and measures the peak memory that a
+single call allocates. Results are plain JSON, so a run on the target
+machine can be kept as a baseline and later runs compared against it.
+"""
+
+import gc
+import math
+import platform
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .empresa import Empresa
+from .modelos import HistoricoPrecos
+
+VERSAO_BENCHMARK = 1
+TAMANHOS_BENCHMARK = (10, 1000, 100000)
+HISTORICOS_BENCHMARK = (100, 1000, 10000)
+ORCAMENTO_CASO_S = 0.25
+AMOSTRAS_MINIMAS = 3
+AMOSTRAS_MAXIMAS = 200
+LOTE_ALVO_S = 0.01  # fast calls are timed in batches of about this long
+TOLERANCIA_TEMPO = 0.20
+TOLERANCIA_MEMORIA = 0.10
+# Differences below these floors are timer and allocator noise, never a regression
+PISO_TEMPO_MS = 0.005
+PISO_MEMORIA_BYTES = 64 * 1024
+CAPITAL_BENCHMARK = 1e15
+ESTOQUE_BENCHMARK = 10 ** 9
+FRACAO_MELHORADA = 0.25
+
+@dataclass
+class ResultadoCaso:
+    """Timing and memory of one operation on one city configuration."""
+    caso: str
+    construcoes: int
+    historico: int
+    compacta: bool
+    amostras: int
+    ms_mediana: float  # per call; for avancar_turno this is the time per turn
+    ms_minimo: float
+    pico_memoria_bytes: int
+
+    @property
+    def chave(self) -> Tuple[str, int, int, bool]:
+        return (self.caso, self.construcoes, self.historico, self.compacta)
+
+@dataclass
+class Regressao:
+    """A case that got slower or hungrier than the baseline allows."""
+    chave: Tuple[str, int, int, bool]
+    metrica: str  # 'ms_mediana' or 'pico_memoria_bytes'
+    base: float
+    atual: float
+
+    @property
+    def razao(self) -> float:
+        return self.atual / self.base if self.base else math.inf
+
+def montar_cidade(construcoes: int, historico: int, compacta: bool = False, semente: int = 0) -> Empresa:
+    """A deterministic city with ``construcoes`` buildings spread over every model.
+
+    A quarter of the buildings is one level up, every price history is full
+    and stocks are large enough that supply chains never ration.
+    """
+    empresa = Empresa(profundidade_historico=historico, compacta=compacta, semente=semente,
+                      capital=CAPITAL_BENCHMARK)
+    modelos = list(empresa.modelos_construcao)
+    for i, modelo_id in enumerate(modelos):
+        quantidade = construcoes // len(modelos) + (i < construcoes % len(modelos))
+        if quantidade:
+            empresa.construir(modelo_id, quantidade)
+    for indice in range(0, construcoes, int(1 / FRACAO_MELHORADA)):
+        empresa.upgrade_construcao(indice)
+    rng = np.random.default_rng(semente)
+    for r in empresa.recursos.values():
+        passos = rng.normal(0.0, 0.02, historico - 1).cumsum()
+        valores = np.concatenate(([r.preco], r.preco * np.exp(passos)))
+        r.preco_historico = HistoricoPrecos(historico, valores.tolist())
+        r.quantidade = ESTOQUE_BENCHMARK
+    empresa.capital = CAPITAL_BENCHMARK
+    return empresa
+
+def _casos(empresa: Empresa) -> Dict[str, Callable[[], object]]:
+    dados = empresa.to_dict()
+    return {
+        'avancar_turno': empresa.avancar_turno,
+        'verificar_conquistas': empresa.verificar_conquistas,
+        'custo_manutencao_total': empresa.custo_manutencao_total,
+        'to_dict': empresa.to_dict,
+        'from_dict': lambda: empresa.from_dict(dados),
+        'comprar_recurso': lambda: empresa.comprar_recurso('madeira', 1),
+        'vender_recurso': lambda: empresa.vender_recurso('madeira', 1),
+    }
+
+CASOS_BENCHMARK = ('avancar_turno', 'verificar_conquistas', 'custo_manutencao_total',
+                   'to_dict', 'from_dict', 'comprar_recurso', 'vender_recurso')
+
+def cronometrar(funcao: Callable[[], object], orcamento_s: float = ORCAMENTO_CASO_S) -> List[float]:
+    """Seconds per call, one sample per batch, until the budget runs out."""
+    inicio = time.perf_counter()
+    funcao()
+    estimativa = time.perf_counter() - inicio
+    lote = max(1, int(LOTE_ALVO_S / max(estimativa, 1e-9)))
+    amostras = []
+    limite = time.perf_counter() + orcamento_s
+    while len(amostras) < AMOSTRAS_MINIMAS or (time.perf_counter() < limite and
+                                                len(amostras) < AMOSTRAS_MAXIMAS):
+        inicio = time.perf_counter()
+        for _ in range(lote):
+            funcao()
+        amostras.append((time.perf_counter() - inicio) / lote)
+    return amostras
+
+def pico_memoria(funcao: Callable[[], object]) -> int:
+    """Bytes allocated at the high-water mark of a single traced call."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        funcao()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def executar_benchmark(tamanhos: Sequence[int] = TAMANHOS_BENCHMARK,
+                       historicos: Sequence[int] = HISTORICOS_BENCHMARK,
+                       modos: Sequence[bool] = (False, True),
+                       casos: Sequence[str] = CASOS_BENCHMARK,
+                       orcamento_s: float = ORCAMENTO_CASO_S,
+                       progresso: Callable[[ResultadoCaso], None] = None) -> dict:
+    """Run every case on every (size, history, storage mode) city; a JSON-ready report.
+
+    Each case gets a freshly built city, so one case's side effects (turns
+    played, stock bought) never leak into the next one's timings.
+    """
+    desconhecidos = set(casos) - set(CASOS_BENCHMARK)
+    if desconhecidos:
+        raise ValueError(f"Casos desconhecidos: {', '.join(sorted(desconhecidos))}")
+    resultados = []
+    for compacta in modos:
+        for construcoes in tamanhos:
+            for historico in historicos:
+                for caso in casos:
+                    empresa = montar_cidade(construcoes, historico, compacta)
+                    funcao = _casos(empresa)[caso]
+                    gc.collect()
+                    amostras = cronometrar(funcao, orcamento_s)
+                    resultado = ResultadoCaso(
+                        caso=caso, construcoes=construcoes, historico=historico, compacta=compacta,
+                        amostras=len(amostras),
+                        ms_mediana=float(np.median(amostras)) * 1e3,
+                        ms_minimo=min(amostras) * 1e3,
+                        pico_memoria_bytes=pico_memoria(funcao),
+                    )
+                    resultados.append(resultado)
+                    if progresso is not None:
+                        progresso(resultado)
+    return {
+        'versao': VERSAO_BENCHMARK,
+        'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'maquina': platform.platform(),
+        'processador': platform.processor() or platform.machine(),
+        'resultados': [asdict(r) for r in resultados],
+    }
+
+def carregar_resultados(relatorio: dict) -> List[ResultadoCaso]:
+    if relatorio.get('versao') != VERSAO_BENCHMARK:
+        raise ValueError(f"Versão de benchmark não suportada: {relatorio.get('versao')}")
+    return [ResultadoCaso(**r) for r in relatorio['resultados']]
+
+def comparar_resultados(base: Sequence[ResultadoCaso], atual: Sequence[ResultadoCaso],
+                        tolerancia_tempo: float = TOLERANCIA_TEMPO,
+                        tolerancia_memoria: float = TOLERANCIA_MEMORIA) -> List[Regressao]:
+    """Cases present in both runs whose time or peak memory grew past the tolerance.
+
+    Cases missing from either side are skipped, so a baseline taken with a
+    smaller grid still checks everything it covers.
+    """
+    por_chave = {r.chave: r for r in base}
+    regressoes = []
+    for r in atual:
+        b = por_chave.get(r.chave)
+        if b is None:
+            continue
+        if (r.ms_mediana > b.ms_mediana * (1 + tolerancia_tempo) and
+                r.ms_mediana - b.ms_mediana > PISO_TEMPO_MS):
+            regressoes.append(Regressao(r.chave, 'ms_mediana', b.ms_mediana, r.ms_mediana))
+        if (r.pico_memoria_bytes > b.pico_memoria_bytes * (1 + tolerancia_memoria) and
+                r.pico_memoria_bytes - b.pico_memoria_bytes > PISO_MEMORIA_BYTES):
+            regressoes.append(Regressao(r.chave, 'pico_memoria_bytes',
+                                        b.pico_memoria_bytes, r.pico_memoria_bytes))
+    return regressoes
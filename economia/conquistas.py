@@ -0,0 +1,140 @@
+"""Achievement engine: conditions compiled once and checked by the stats they depend on."""
+
+import ast
+import operator
+from functools import reduce
+from typing import Dict, List
+
+import numpy as np
+
+from .modelos import Conquista
+
+# Stats an achievement condition may refer to
+STATS_CONQUISTAS = ('turno', 'capital', 'construcoes', 'pesquisa', 'max_nivel', 'tipos_construcao')
+
+_OPERADORES_CONDICAO = {
+    ast.GtE: operator.ge, ast.Gt: operator.gt, ast.LtE: operator.le, ast.Lt: operator.lt,
+    ast.Eq: operator.eq, ast.NotEq: operator.ne,
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+}
+
+def compilar_condicao(condicao: str):
+    """Compile an achievement condition into ``(funcao, dependencias)``.
+    
+    Conditions are small expressions over ``STATS_CONQUISTAS`` such as
+    ``'capital >= 50000'``. They are turned into closures once, with plain
+    ``stat <op> number`` comparisons becoming a single threshold check. The
+    closures work the same on scalars and on NumPy arrays of per-turn stats.
+    Raises ``ValueError`` for anything outside that small grammar.
+    """
+    try:
+        arvore = ast.parse(condicao, mode='eval').body
+    except SyntaxError as e:
+        raise ValueError(f"Condição inválida: {condicao!r}") from e
+    dependencias = set()
+    
+    def operador(op):
+        if type(op) not in _OPERADORES_CONDICAO:
+            raise ValueError(f"Operador não suportado em {condicao!r}")
+        return _OPERADORES_CONDICAO[type(op)]
+    
+    def compilar(no):
+        if isinstance(no, ast.Constant) and isinstance(no.value, (int, float)):
+            valor = no.value
+            return lambda stats: valor
+        if isinstance(no, ast.Name):
+            if no.id not in STATS_CONQUISTAS:
+                raise ValueError(f"Estatística desconhecida {no.id!r} em {condicao!r}")
+            dependencias.add(no.id)
+            nome = no.id
+            return lambda stats: stats[nome]
+        if isinstance(no, ast.Compare):
+            ops = [operador(op) for op in no.ops]
+            if (len(ops) == 1 and isinstance(no.left, ast.Name)
+                    and isinstance(no.comparators[0], ast.Constant)):
+                # Threshold check: stat <op> number
+                compilar(no.left)
+                op, nome, limite = ops[0], no.left.id, compilar(no.comparators[0])(None)
+                return lambda stats: op(stats[nome], limite)
+            termos = [compilar(no.left)] + [compilar(c) for c in no.comparators]
+            
+            def comparar(stats):
+                valores = [f(stats) for f in termos]
+                resultado = ops[0](valores[0], valores[1])
+                for i in range(1, len(ops)):
+                    resultado = resultado & ops[i](valores[i], valores[i + 1])
+                return resultado
+            return comparar
+        if isinstance(no, ast.BoolOp):
+            termos = [compilar(v) for v in no.values]
+            juntar = operator.and_ if isinstance(no.op, ast.And) else operator.or_
+            return lambda stats: reduce(juntar, (f(stats) for f in termos))
+        if isinstance(no, ast.UnaryOp) and isinstance(no.op, (ast.Not, ast.USub)):
+            termo = compilar(no.operand)
+            op = np.logical_not if isinstance(no.op, ast.Not) else operator.neg
+            return lambda stats: op(termo(stats))
+        if isinstance(no, ast.BinOp):
+            op, esq, dir_ = operador(no.op), compilar(no.left), compilar(no.right)
+            return lambda stats: op(esq(stats), dir_(stats))
+        raise ValueError(f"Expressão não suportada em {condicao!r}")
+    
+    return compilar(arvore), frozenset(dependencias)
+
+class MotorConquistas:
+    """Checks achievements with conditions compiled once from ``Conquista.condicao``.
+    
+    Each condition knows which stats it reads, and :meth:`verificar` only
+    re-checks locked achievements whose stats changed since the last call.
+    """
+    
+    def __init__(self, conquistas: Dict[str, Conquista]):
+        self.conquistas = conquistas
+        self._condicoes = {}
+        self._por_stat: Dict[str, List[str]] = {nome: [] for nome in STATS_CONQUISTAS}
+        for cid, c in conquistas.items():
+            funcao, deps = compilar_condicao(c.condicao)
+            self._condicoes[cid] = funcao
+            for nome in deps:
+                self._por_stat[nome].append(cid)
+        self.reiniciar()
+    
+    def reiniciar(self):
+        """Forget the last seen stats so the next check looks at every achievement."""
+        self._vistos: Dict[str, float] = {}
+    
+    def verificar(self, stats: dict, turno: int) -> List[Conquista]:
+        if self._vistos:
+            candidatas = set()
+            for nome, valor in stats.items():
+                if self._vistos[nome] != valor:
+                    candidatas.update(self._por_stat[nome])
+        else:
+            candidatas = set(self.conquistas)
+        self._vistos = dict(stats)
+        
+        novas = []
+        for cid, c in self.conquistas.items():
+            if cid in candidatas and not c.desbloqueada and self._condicoes[cid](stats):
+                c.desbloqueada = True
+                c.turno_desbloqueio = turno
+                novas.append(c)
+        return novas
+    
+    def verificar_serie(self, stats: dict, turnos: np.ndarray, stats_finais: dict) -> List[Conquista]:
+        """Check every locked achievement against per-turn stat arrays.
+        
+        An achievement unlocks on the first turn its condition holds.
+        ``stats_finais`` are the scalar stats at the end of the series.
+        """
+        novas = []
+        for cid, c in self.conquistas.items():
+            if c.desbloqueada:
+                continue
+            atingida = np.broadcast_to(np.asarray(self._condicoes[cid](stats), dtype=bool), turnos.shape)
+            if atingida.any():
+                c.desbloqueada = True
+                c.turno_desbloqueio = int(turnos[int(np.argmax(atingida))])
+                novas.append(c)
+        self._vistos = dict(stats_finais)
+        novas.sort(key=lambda c: c.turno_desbloqueio)
+        return novas
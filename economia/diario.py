@@ -0,0 +1,205 @@
+"""Append-only binary journal of an Empresa's calls, and replay from it."""
+
+import json
+import io
+import struct
+import zlib
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+from .modelos import Ordem
+
+MAGICO_DIARIO = b'EMPJ'
+VERSAO_DIARIO = 2  # 2 added OP_LIGADO and OP_MERCADO
+INTERVALO_CHECKPOINT = 1000  # turns
+
+# Record opcodes; each record is the opcode byte followed by its payload
+OP_CONSTRUIR, OP_UPGRADE, OP_DEMOLIR, OP_COMPRAR, OP_VENDER, OP_TURNO, OP_TURNOS, OP_ORDENS, OP_CHECKPOINT, OP_LIGADO, OP_MERCADO = range(1, 12)
+_FORMATOS_DIARIO = {
+    OP_CONSTRUIR: struct.Struct('<BI'),   # model index, quantity
+    OP_UPGRADE: struct.Struct('<I'),      # building index
+    OP_DEMOLIR: struct.Struct('<I'),      # building index
+    OP_COMPRAR: struct.Struct('<Bq'),     # resource index, quantity
+    OP_VENDER: struct.Struct('<Bq'),      # resource index, quantity
+    OP_TURNO: struct.Struct('<'),
+    OP_TURNOS: struct.Struct('<I'),       # turns
+    OP_ORDENS: struct.Struct('<IB'),      # order count, partial fill; then one _ORDEM_DIARIO each
+    OP_CHECKPOINT: struct.Struct('<II'),  # turn, blob length; then zlib'd to_dict() JSON
+    OP_LIGADO: struct.Struct('<B'),       # attached to a Mercado?
+    OP_MERCADO: struct.Struct('<Bddq'),   # resource count, cost, revenue, units sold; then one _MERCADO_DIARIO each
+}
+_ORDEM_DIARIO = struct.Struct('<BBq')  # sell?, resource index, quantity
+_MERCADO_DIARIO = struct.Struct('<qd')  # signed units filled, posted price
+_CABECALHO_DIARIO = struct.Struct('<4sHI')  # magic, version, metadata length; then metadata JSON
+
+class DiarioAcoes:
+    """Append-only binary journal of an ``Empresa``'s state-changing calls.
+    
+    The file starts with the RNG seed and a full checkpoint, so replaying the
+    calls in order rebuilds the game bit for bit. A checkpoint is added every
+    ``intervalo_checkpoint`` turns (and on every load or undo, which are not
+    calls that can be replayed), so :func:`reproduzir_diario` only has to
+    replay from the nearest one. While the company is attached to a
+    ``Mercado`` its turns don't move prices; each clearing's fills and
+    posted prices are journaled instead.
+    """
+    
+    def __init__(self, empresa: 'Empresa', caminho: Optional[str] = None,
+                 intervalo_checkpoint: int = INTERVALO_CHECKPOINT):
+        self.caminho = caminho
+        self.intervalo_checkpoint = intervalo_checkpoint
+        self._indice_recurso = empresa._indice_recurso
+        self._turno_checkpoint = empresa.turno
+        self._arquivo = open(caminho, 'wb') if caminho else io.BytesIO()
+        meta = json.dumps({
+            'semente': empresa._seed_seq.entropy,
+            'spawn_key': list(empresa._seed_seq.spawn_key),
+            'compacta': empresa.compacta,
+            'profundidade_historico': empresa.profundidade_historico,
+        }).encode('utf-8')
+        self._arquivo.write(_CABECALHO_DIARIO.pack(MAGICO_DIARIO, VERSAO_DIARIO, len(meta)) + meta)
+        self.checkpoint(empresa)
+    
+    def registrar(self, empresa: 'Empresa', op: int, *args):
+        self._arquivo.write(bytes((op,)) + _FORMATOS_DIARIO[op].pack(*args))
+        if op in (OP_TURNO, OP_TURNOS):
+            if empresa.turno - self._turno_checkpoint >= self.intervalo_checkpoint:
+                self.checkpoint(empresa)
+            else:
+                # A crash loses at most the current turn
+                self._arquivo.flush()
+    
+    def registrar_ordens(self, ordens: Sequence[Ordem], parcial: bool):
+        partes = [bytes((OP_ORDENS,)), _FORMATOS_DIARIO[OP_ORDENS].pack(len(ordens), parcial)]
+        partes += [_ORDEM_DIARIO.pack(o.tipo == 'vender', self._indice_recurso[o.recurso], o.quantidade)
+                   for o in ordens]
+        self._arquivo.write(b''.join(partes))
+    
+    def registrar_mercado(self, delta: np.ndarray, custo: float, receita: float, vendidos: int,
+                          precos: np.ndarray):
+        partes = [bytes((OP_MERCADO,)), _FORMATOS_DIARIO[OP_MERCADO].pack(len(delta), custo, receita, vendidos)]
+        partes += [_MERCADO_DIARIO.pack(d, p) for d, p in zip(delta.tolist(), precos.tolist())]
+        self._arquivo.write(b''.join(partes))
+        self._arquivo.flush()
+    
+    def checkpoint(self, empresa: 'Empresa'):
+        self._turno_checkpoint = empresa.turno
+        blob = zlib.compress(json.dumps(empresa.to_dict()).encode('utf-8'))
+        partes = [bytes((OP_CHECKPOINT,)), _FORMATOS_DIARIO[OP_CHECKPOINT].pack(empresa.turno, len(blob)), blob]
+        # to_dict() doesn't know about the market, and replay resumes here
+        if empresa.mercado is not None:
+            partes += [bytes((OP_LIGADO,)), _FORMATOS_DIARIO[OP_LIGADO].pack(True)]
+        self._arquivo.write(b''.join(partes))
+        self._arquivo.flush()
+    
+    def conteudo(self) -> bytes:
+        """Everything written so far (in-memory journals only)."""
+        return self._arquivo.getvalue()
+    
+    def fechar(self):
+        self._arquivo.close()
+
+def _ler_diario(dados: bytes):
+    """Parse a journal into (metadata, records); each record is (op, args, blob)."""
+    magico, versao, n_meta = _CABECALHO_DIARIO.unpack_from(dados, 0)
+    if magico != MAGICO_DIARIO:
+        raise ValueError("Arquivo não é um diário de ações")
+    if versao > VERSAO_DIARIO:
+        raise ValueError(f"Versão de diário não suportada: {versao}")
+    pos = _CABECALHO_DIARIO.size
+    meta = json.loads(dados[pos:pos + n_meta])
+    pos += n_meta
+    
+    registros = []
+    while pos < len(dados):
+        op = dados[pos]
+        formato = _FORMATOS_DIARIO[op]
+        args = formato.unpack_from(dados, pos + 1)
+        pos += 1 + formato.size
+        extra = None
+        if op == OP_CHECKPOINT:
+            extra = dados[pos:pos + args[1]]
+            pos += args[1]
+        elif op == OP_ORDENS:
+            extra = [_ORDEM_DIARIO.unpack_from(dados, pos + k * _ORDEM_DIARIO.size) for k in range(args[0])]
+            pos += args[0] * _ORDEM_DIARIO.size
+        elif op == OP_MERCADO:
+            extra = [_MERCADO_DIARIO.unpack_from(dados, pos + k * _MERCADO_DIARIO.size) for k in range(args[0])]
+            pos += args[0] * _MERCADO_DIARIO.size
+        registros.append((op, args, extra))
+    return meta, registros
+
+def _turnos_registros(registros) -> List[int]:
+    """The game's turn right after each record."""
+    turnos, atual = [], 0
+    for op, args, _ in registros:
+        if op == OP_CHECKPOINT:
+            atual = args[0]
+        elif op == OP_TURNO:
+            atual += 1
+        elif op == OP_TURNOS:
+            atual += args[0]
+        turnos.append(atual)
+    return turnos
+
+def reproduzir_diario(fonte: Union[str, bytes], turno: Optional[int] = None) -> 'Empresa':
+    """Rebuild a journaled game, at its end or as it last stood on ``turno``.
+    
+    Replay starts from the last checkpoint before the last record that
+    leaves the game on ``turno`` and stops after it. A multi-turn
+    ``avancar_turnos`` span is atomic: its inner turns can't be rebuilt on
+    their own, and asking for one, or for a turn outside the journal,
+    raises ``ValueError``. Turns played on a ``Mercado`` take their fills
+    and prices from the journal, so no market is needed to replay them.
+    """
+    if isinstance(fonte, str):
+        with open(fonte, 'rb') as f:
+            fonte = f.read()
+    # Empresa imports this module for the journal, so it is only looked up here
+    from .empresa import Empresa
+    
+    meta, registros = _ler_diario(fonte)
+    empresa = Empresa(meta['profundidade_historico'], meta['compacta'],
+                      np.random.SeedSequence(meta['semente'], spawn_key=tuple(meta['spawn_key'])))
+    
+    fim = len(registros)
+    if turno is not None:
+        turnos = _turnos_registros(registros)
+        if turno not in turnos:
+            if min(turnos) < turno < max(turnos):
+                raise ValueError(f"Turno {turno} cai dentro de um avanço de vários turnos do diário")
+            raise ValueError(f"Turno {turno} fora do diário (turnos {min(turnos)} a {max(turnos)})")
+        fim = len(turnos) - turnos[::-1].index(turno)
+    inicio = max(i for i in range(fim) if registros[i][0] == OP_CHECKPOINT)
+    
+    for op, args, extra in registros[inicio:fim]:
+        if op == OP_CHECKPOINT:
+            empresa.from_dict(json.loads(zlib.decompress(extra)))
+            empresa._precos_externos = False
+        elif op == OP_LIGADO:
+            empresa._precos_externos = bool(args[0])
+        elif op == OP_MERCADO:
+            delta, precos = zip(*extra)
+            empresa._aplicar_execucao(np.array(delta, dtype=np.int64), args[1], args[2], args[3])
+            for r, preco in zip(empresa.recursos.values(), precos):
+                r.preco = preco
+                r.preco_historico.append(preco)
+        elif op == OP_TURNO:
+            empresa.avancar_turno()
+        elif op == OP_TURNOS:
+            empresa.avancar_turnos(*args)
+        elif op == OP_CONSTRUIR:
+            empresa.construir(empresa._ordem_modelos[args[0]], args[1])
+        elif op == OP_UPGRADE:
+            empresa.upgrade_construcao(*args)
+        elif op == OP_DEMOLIR:
+            empresa.demolir_construcao(*args)
+        elif op == OP_COMPRAR:
+            empresa.comprar_recurso(empresa._ordem_recursos[args[0]], args[1])
+        elif op == OP_VENDER:
+            empresa.vender_recurso(empresa._ordem_recursos[args[0]], args[1])
+        elif op == OP_ORDENS:
+            empresa.executar_ordens([Ordem('vender' if v else 'comprar', empresa._ordem_recursos[r], q)
+                                     for v, r, q in extra], bool(args[1]))
+    return empresa
@@ -0,0 +1,932 @@
+"""Empresa, the whole game state of one company and the turn engine."""
+
+import math
+import json
+from typing import Dict, List, Optional, Sequence, Union
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+from .modelos import (
+    AgregadosCidade, Conquista, Construcao, ConstrucaoModelo, EstadoConstrucoes, Evento, FotoEmpresa,
+    HistoricoPrecos, LINHAS_POR_PAGINA, Ordem, PROFUNDIDADE_HISTORICO, Recurso, VERSAO_SAVE_BINARIO,
+    VistaConstrucoes
+)
+from .eventos import EVENTOS, ICONES_EVENTO, ModificadorProducao
+from .conquistas import MotorConquistas
+from .insumos import _liquidar_insumos, resolver_insumos
+from .diario import (
+    DiarioAcoes, INTERVALO_CHECKPOINT, OP_COMPRAR, OP_CONSTRUIR, OP_DEMOLIR, OP_TURNO, OP_TURNOS,
+    OP_UPGRADE, OP_VENDER
+)
+
+CAPITAL_INICIAL = 1500000.0
+
+class Empresa:
+    def __init__(self, profundidade_historico: int = PROFUNDIDADE_HISTORICO, compacta: bool = False,
+                 semente: Union[int, np.random.SeedSequence, None] = None, capital: float = CAPITAL_INICIAL):
+        self.profundidade_historico = profundidade_historico
+        # Compact cities keep no per-building objects: just a (model, level)
+        # count matrix plus the small per-building arrays, so a turn costs
+        # O(types x levels) regardless of how many buildings there are.
+        self.compacta = compacta
+        self.capital: float = capital
+        self.turno: int = 1
+        self.pontos_pesquisa: int = 0
+        self.recursos: Dict[str, Recurso] = {}
+        self.construcoes: List[Construcao] = []
+        self._estado = EstadoConstrucoes()
+        self.modelos_construcao: Dict[str, ConstrucaoModelo] = {}
+        self.eventos_log: deque = deque(maxlen=20)
+        self.modificadores_producao: List[ModificadorProducao] = []
+        # Debug aid: cross-check the aggregate cache against a full recompute on every read
+        self.depurar_agregados: bool = False
+        # Last snapshot taken or restored; the next one shares unchanged parts with it
+        self._ultima_foto: Optional[FotoEmpresa] = None
+        # Append-only journal of state-changing calls, see iniciar_diario()
+        self.diario: Optional['DiarioAcoes'] = None
+        # Shared market that owns prices once registered, see Mercado.registrar()
+        self.mercado: Optional['Mercado'] = None
+        # Replaying a journaled market game: prices come from its records
+        self._precos_externos: bool = False
+        self.conquistas: Dict[str, Conquista] = {}
+        self.estatisticas = {
+            'total_ganho': 0.0,
+            'total_gasto': 0.0,
+            'turnos_jogados': 0,
+            'construcoes_feitas': 0,
+            'upgrades_feitos': 0,
+            'recursos_vendidos': 0,
+            'eventos_ocorridos': 0,
+            'max_capital': 15000.0
+        }
+        self._init_rngs(semente)
+        self._init_recursos()
+        self._init_modelos()
+        self._init_conquistas()
+        self._reiniciar_contadores()
+        if self.compacta:
+            self.construcoes = VistaConstrucoes(self)
+    
+    def _init_rngs(self, semente: Union[int, np.random.SeedSequence, None]):
+        """Derive the market, event and event-target streams from one seed.
+        
+        Each stream is its own ``numpy.random.Generator`` spawned from the
+        same ``SeedSequence``, so games are reproducible and independently
+        seeded games (e.g. ensemble workers) never share a stream.
+        
+        The children are derived by spawn key rather than ``spawn()``, which
+        would advance the caller's sequence: passing the same
+        ``SeedSequence`` again must give the same streams.
+        """
+        if not isinstance(semente, np.random.SeedSequence):
+            semente = np.random.SeedSequence(semente)
+        self._seed_seq = semente
+        mercado, eventos, alvos = (
+            np.random.SeedSequence(semente.entropy, spawn_key=semente.spawn_key + (i,),
+                                   pool_size=semente.pool_size)
+            for i in range(3)
+        )
+        self.rng_mercado = np.random.default_rng(mercado)
+        self.rng_eventos = np.random.default_rng(eventos)
+        self.rng_alvos = np.random.default_rng(alvos)
+    
+    @property
+    def semente(self) -> int:
+        return self._seed_seq.entropy
+    
+    def _init_recursos(self):
+        recursos_data = [
+            ('madeira', 'Madeira', 100, 5.00, 0.15, '🌲', (0.4, 0.26, 0.13)),
+            ('metal', 'Metal', 50, 20.00, 0.20, '🔩', (0.6, 0.6, 0.65)),
+            ('cafe', 'Café', 20, 50.00, 0.10, '☕', (0.4, 0.26, 0.13)),
+            ('energia', 'Energia', 200, 2.50, 0.05, '⚡', (1.0, 0.9, 0.2)),
+            ('petroleo', 'Petróleo', 10, 85.00, 0.25, '🛢️', (0.15, 0.15, 0.15)),
+            ('ouro', 'Ouro', 5, 150.00, 0.35, '🪙', (1.0, 0.84, 0.0)),
+        ]
+        for id_, nome, qtd, preco, vol, simb, cor in recursos_data:
+            self.recursos[id_] = Recurso(nome, qtd, preco, vol, simb, cor,
+                                         HistoricoPrecos(self.profundidade_historico))
+    
+    def _init_modelos(self):
+        modelos = [
+            ConstrucaoModelo('madeira', 'Serraria', 1500, 'madeira', 50, 30, '🏭',
+                           descricao='Produz madeira de reflorestamento', cor_principal=(0.6, 0.45, 0.3)),
+            ConstrucaoModelo('metal', 'Mineradora', 3000, 'metal', 25, 75, '⛏️',
+                           descricao='Extrai metais preciosos', cor_principal=(0.4, 0.4, 0.45),
+                           insumos={'energia': 1.0, 'madeira': 0.4}),
+            ConstrucaoModelo('energia', 'Hidrelétrica', 4000, 'energia', 100, 120, '💡',
+                           descricao='Gera energia limpa', cor_principal=(0.3, 0.5, 0.7)),
+            ConstrucaoModelo('cafe', 'Cafezal', 5000, 'cafe', 10, 100, '🌿',
+                           descricao='Plantação de café premium', cor_principal=(0.2, 0.5, 0.2)),
+            ConstrucaoModelo('petroleo', 'Refinaria', 8000, 'petroleo', 8, 200, '🏗️',
+                           descricao='Refina petróleo bruto', cor_principal=(0.3, 0.3, 0.35),
+                           insumos={'energia': 3.0}),
+            ConstrucaoModelo('ouro', 'Mina de Ouro', 12000, 'ouro', 3, 350, '💎',
+                           descricao='Extrai ouro e gemas', cor_principal=(0.8, 0.7, 0.2),
+                           insumos={'energia': 5.0, 'metal': 1.0}),
+            ConstrucaoModelo('pesquisa', 'Centro de P&D', 7000, None, 0, 200, '🔬',
+                           pesquisa=10, descricao='Gera pontos de pesquisa', cor_principal=(0.35, 0.4, 0.9)),
+            ConstrucaoModelo('banco', 'Banco', 10000, None, 0, 150, '🏦',
+                           descricao='Gera 2% de juros por turno', cor_principal=(0.5, 0.5, 0.55)),
+        ]
+        self.modelos_construcao = {m.id: m for m in modelos}
+        self._montar_tabelas()
+    
+    def _montar_tabelas(self):
+        """Precompute per-(model, level) lookup tables for the turn engine.
+
+        Values come from the same ``Construcao`` properties the UI uses, so
+        the vectorized turn matches the per-building formulas exactly.
+        """
+        self._ordem_modelos = list(self.modelos_construcao.keys())
+        self._indice_modelo = {mid: i for i, mid in enumerate(self._ordem_modelos)}
+        self._ordem_recursos = list(self.recursos.keys())
+        self._indice_recurso = {k: i for i, k in enumerate(self._ordem_recursos)}
+        
+        n_modelos = len(self._ordem_modelos)
+        n_niveis = max(m.nivel_max for m in self.modelos_construcao.values()) + 1
+        self._tab_producao = np.zeros((n_modelos, n_niveis), dtype=np.int64)
+        self._tab_pesquisa = np.zeros((n_modelos, n_niveis), dtype=np.int64)
+        self._tab_manutencao = np.zeros((n_modelos, n_niveis), dtype=np.float64)
+        self._recurso_modelo = np.full(n_modelos, -1, dtype=np.int64)
+        self._mascara_banco = np.zeros(n_modelos, dtype=bool)
+        # Input-output matrix (resources x models) and output map (models x resources)
+        self._tab_insumos = np.zeros((len(self._ordem_recursos), n_modelos))
+        self._saida_recurso = np.zeros((n_modelos, len(self._ordem_recursos)))
+        
+        for i, mid in enumerate(self._ordem_modelos):
+            modelo = self.modelos_construcao[mid]
+            if modelo.producao_recurso:
+                self._recurso_modelo[i] = self._ordem_recursos.index(modelo.producao_recurso)
+                self._saida_recurso[i, self._recurso_modelo[i]] = 1.0
+                for chave, qtd in modelo.insumos.items():
+                    self._tab_insumos[self._indice_recurso[chave], i] = qtd
+            self._mascara_banco[i] = mid == 'banco'
+            for nivel in range(1, modelo.nivel_max + 1):
+                c = Construcao(modelo=modelo, nivel=nivel)
+                self._tab_producao[i, nivel] = c.producao_atual
+                self._tab_manutencao[i, nivel] = c.manutencao_atual
+                self._tab_pesquisa[i, nivel] = int(modelo.pesquisa * (1 + (nivel - 1) * 0.3))
+    
+    def _init_conquistas(self):
+        conquistas = [
+            Conquista('primeiro_turno', 'Iniciante', 'Complete o primeiro turno', '🎯', 'turno >= 2'),
+            Conquista('capital_50k', 'Investidor', 'Alcance R$ 50.000', '💰', 'capital >= 50000'),
+            Conquista('capital_100k', 'Magnata', 'Alcance R$ 100.000', '💎', 'capital >= 100000'),
+            Conquista('capital_500k', 'Bilionário', 'Alcance R$ 500.000', '👑', 'capital >= 500000'),
+            Conquista('5_construcoes', 'Construtor', 'Construa 5 edificações', '🏗️', 'construcoes >= 5'),
+            Conquista('10_construcoes', 'Desenvolvedor', 'Construa 10 edificações', '🏙️', 'construcoes >= 10'),
+            Conquista('pesquisa_100', 'Cientista', 'Alcance 100 pontos de pesquisa', '🔬', 'pesquisa >= 100'),
+            Conquista('turno_50', 'Veterano', 'Sobreviva 50 turnos', '⭐', 'turno >= 50'),
+            Conquista('upgrade_max', 'Perfeccionista', 'Faça upgrade de uma construção ao nível máximo', '🏆', 'max_nivel >= 5'),
+            Conquista('diversificado', 'Diversificado', 'Tenha pelo menos 4 tipos de construção', '🌈', 'tipos_construcao >= 4'),
+        ]
+        self.conquistas = {c.id: c for c in conquistas}
+        self._motor_conquistas = MotorConquistas(self.conquistas)
+    
+    def _reiniciar_contadores(self):
+        """Recount the (model, level) matrix and the aggregate cache from scratch."""
+        self._contagem = self._contagem_por_nivel()
+        self._agregados = self._recalcular_agregados()
+    
+    def _contar(self, modelo_idx: int, nivel: int, delta: int):
+        """Add (``delta > 0``) or remove (``delta < 0``) buildings from the counts and aggregates."""
+        self._contagem[modelo_idx, nivel] += delta
+        
+        ag = self._agregados
+        ag.manutencao += delta * float(self._tab_manutencao[modelo_idx, nivel])
+        recurso = self._recurso_modelo[modelo_idx]
+        if recurso >= 0:
+            ag.producao[recurso] += delta * self._tab_producao[modelo_idx, nivel]
+        ag.pesquisa += delta * int(self._tab_pesquisa[modelo_idx, nivel])
+        if self._mascara_banco[modelo_idx]:
+            ag.soma_niveis_banco += delta * nivel
+    
+    def _recalcular_agregados(self) -> AgregadosCidade:
+        """Full O(buildings) recompute of the aggregate cache."""
+        producao = np.zeros(len(self._ordem_recursos), dtype=np.int64)
+        modelo_idx, nivel, _ = self._estado.visao()
+        if not len(modelo_idx):
+            return AgregadosCidade(0.0, producao, 0, 0)
+        contagem = self._contagem_por_nivel()
+        producao_modelo = (contagem * self._tab_producao).sum(axis=1)
+        produz = self._recurso_modelo >= 0
+        np.add.at(producao, self._recurso_modelo[produz], producao_modelo[produz])
+        return AgregadosCidade(
+            manutencao=sum(self._tab_manutencao[modelo_idx, nivel].tolist()),
+            producao=producao,
+            pesquisa=int((contagem * self._tab_pesquisa).sum()),
+            soma_niveis_banco=int(nivel[self._mascara_banco[modelo_idx]].sum()),
+        )
+    
+    def _conferir_agregados(self):
+        esperado = self._recalcular_agregados()
+        ag = self._agregados
+        if (not math.isclose(ag.manutencao, esperado.manutencao, rel_tol=1e-9, abs_tol=1e-6)
+                or not np.array_equal(ag.producao, esperado.producao)
+                or ag.pesquisa != esperado.pesquisa
+                or ag.soma_niveis_banco != esperado.soma_niveis_banco):
+            raise RuntimeError(f"Cache de agregados divergiu: {ag} != {esperado}")
+        if not np.array_equal(self._contagem, self._contagem_por_nivel()):
+            raise RuntimeError("Contagem por (modelo, nível) divergiu")
+    
+    def agregados(self) -> AgregadosCidade:
+        """Cached per-turn totals (maintenance, production, research, bank levels)."""
+        if self.depurar_agregados:
+            self._conferir_agregados()
+        return self._agregados
+    
+    def _stats_conquistas(self) -> dict:
+        niveis = np.flatnonzero(self._contagem.any(axis=0))
+        return {
+            'turno': self.turno,
+            'capital': self.capital,
+            'construcoes': len(self._estado),
+            'pesquisa': self.pontos_pesquisa,
+            'max_nivel': int(niveis[-1]) if len(niveis) else 0,
+            'tipos_construcao': int(np.count_nonzero(self._contagem.any(axis=1))),
+        }
+    
+    def verificar_conquistas(self):
+        return self._motor_conquistas.verificar(self._stats_conquistas(), self.turno)
+    
+    def custo_manutencao_total(self):
+        return self.agregados().manutencao
+    
+    def _contagem_por_nivel(self) -> np.ndarray:
+        """Building counts as a (model, level) matrix."""
+        modelo_idx, nivel, _ = self._estado.visao()
+        n_modelos, n_niveis = self._tab_producao.shape
+        chaves = modelo_idx.astype(np.intp) * n_niveis + nivel
+        return np.bincount(chaves, minlength=n_modelos * n_niveis).reshape(n_modelos, n_niveis)
+    
+    def avancar_turno(self):
+        eventos = []
+        
+        # Manutenção
+        manut = self.custo_manutencao_total()
+        self.capital -= manut
+        self.estatisticas['total_gasto'] += manut
+        
+        # Produção e pesquisa
+        producao, pesquisa = self._producao_por_turno()
+        for r, qtd in zip(self.recursos.values(), producao.tolist()):
+            r.quantidade += qtd
+        self.pontos_pesquisa += pesquisa
+        self._consumir_modificadores()
+        
+        # Banco gera juros - compounds bank by bank, in building order
+        if self._agregados.soma_niveis_banco and self.compacta:
+            juros = self.capital * (self._fator_juros() - 1)
+            self.capital += juros
+            self.estatisticas['total_ganho'] += juros
+        elif self._agregados.soma_niveis_banco:
+            for n in self._niveis_banco():
+                juros = self.capital * 0.02 * n
+                self.capital += juros
+                self.estatisticas['total_ganho'] += juros
+        
+        # Volatilidade de preços (a shared market moves them when it clears)
+        if self.mercado is None and not self._precos_externos:
+            variacoes = self.rng_mercado.uniform(-1.0, 1.0, len(self.recursos)).tolist()
+            for r, u in zip(self.recursos.values(), variacoes):
+                var = u * r.volatilidade
+                r.preco = max(0.1, round(r.preco * (1 + var), 2))
+                r.preco_historico.append(r.preco)
+        
+        # Eventos aleatórios (30% chance)
+        if self.rng_eventos.random() < 0.30:
+            evento = self._gerar_evento()
+            eventos.append(evento)
+            self.eventos_log.appendleft(evento)
+            self.estatisticas['eventos_ocorridos'] += 1
+        
+        self.turno += 1
+        self.estatisticas['turnos_jogados'] += 1
+        self.estatisticas['max_capital'] = max(self.estatisticas['max_capital'], self.capital)
+        
+        # Verificar conquistas
+        novas_conquistas = self.verificar_conquistas()
+        
+        self._registrar(OP_TURNO)
+        
+        return eventos, novas_conquistas
+    
+    def _producao_por_turno(self, estoque: Optional[np.ndarray] = None, modificadores: bool = True):
+        """Per-turn net output as (change per resource in ``_ordem_recursos`` order, research points).
+        
+        Buildings with inputs draw them from ``estoque`` (the current stock by
+        default) and are throttled by ``resolver_insumos`` when it runs short.
+        """
+        ag = self.agregados()
+        producao = ag.producao
+        if modificadores and self.modificadores_producao:
+            producao = producao.copy()
+            for mod in self.modificadores_producao:
+                i = self._ordem_recursos.index(mod.recurso)
+                producao[i] = int(producao[i] * mod.fator)
+        if not self._tab_insumos.any():
+            return producao, ag.pesquisa
+        
+        if estoque is None:
+            estoque = np.array([r.quantidade for r in self.recursos.values()], dtype=np.int64)
+        return self._producao_insumos(producao, self._potencial_modelos(), estoque), ag.pesquisa
+    
+    def _potencial_modelos(self) -> np.ndarray:
+        """Each model's output at full capacity, before modifiers and inputs."""
+        return (self._contagem * self._tab_producao).sum(axis=1).astype(np.float64)
+    
+    def _producao_insumos(self, producao: np.ndarray, potencial: np.ndarray, estoque: np.ndarray) -> np.ndarray:
+        """Net whole-unit output per resource once inputs are drawn from ``estoque``.
+        
+        ``producao`` is the output per resource after modifiers and
+        ``potencial`` each model's output at full capacity. Leading axes are
+        independent companies, so the planner plays every action and future
+        of a turn in one call.
+        """
+        # Spread each resource's (modified) output over the models that make it
+        bruto = potencial @ self._saida_recurso
+        with np.errstate(divide='ignore', invalid='ignore'):
+            potencial = potencial * (np.where(bruto > 0, producao / bruto, 0.0) @ self._saida_recurso.T)
+        saida, consumo, utilizacao = resolver_insumos(potencial, estoque, self._tab_insumos, self._saida_recurso)
+        # Companies short of nothing keep their exact integer output
+        saida = np.where((utilizacao == 1.0).all(axis=-1, keepdims=True), producao, saida)
+        return _liquidar_insumos(saida, consumo, estoque)
+    
+    def _producao_estavel(self, producao: np.ndarray, estoque: np.ndarray) -> bool:
+        """Whether ``producao`` repeats every turn from ``estoque`` on.
+        
+        True when no input was short and no input's stock shrinks, so the
+        supply chains stay unthrottled for as long as the buildings stand.
+        """
+        consumidos = self._tab_insumos.any(axis=1)
+        if not consumidos.any():
+            return True
+        return bool((producao[consumidos] >= 0).all()
+                    and np.array_equal(producao, self._producao_por_turno(estoque + producao)[0]))
+    
+    def _consumir_modificadores(self):
+        """Tick one turn off every production modifier, dropping the expired ones."""
+        if not self.modificadores_producao:
+            return
+        for mod in self.modificadores_producao:
+            mod.turnos_restantes -= 1
+        self.modificadores_producao = [m for m in self.modificadores_producao if m.turnos_restantes > 0]
+    
+    def _niveis_banco(self) -> List[int]:
+        """Levels of every bank, in building order."""
+        modelo_idx, nivel, _ = self._estado.visao()
+        return nivel[self._mascara_banco[modelo_idx]].tolist()
+    
+    def _fator_juros(self) -> float:
+        """Capital multiplier for one turn of bank interest.
+        
+        Compact cities raise each level's factor to the number of banks at
+        that level instead of compounding bank by bank.
+        """
+        fator = 1.0
+        if not self._agregados.soma_niveis_banco:
+            return fator
+        if self.compacta:
+            bancos_por_nivel = self._contagem[self._mascara_banco].sum(axis=0).tolist()
+            for nivel, qtd in enumerate(bancos_por_nivel):
+                if qtd:
+                    try:
+                        fator *= (1 + 0.02 * nivel) ** qtd
+                    except OverflowError:
+                        # Bank-by-bank compounding would just reach inf too
+                        return math.inf
+        else:
+            for nivel in self._niveis_banco():
+                fator *= 1 + 0.02 * nivel
+        return fator
+    
+    def avancar_turnos(self, n: int):
+        """Advance ``n`` turns in one call.
+        
+        Buildings can't change during the span, so maintenance, production,
+        research and bank interest are the same every turn and are applied in
+        closed form between random events. Production is only solved turn by
+        turn while an event modifier is active or a supply chain is short of
+        inputs. Price shocks, event rolls and event picks for all ``n`` turns
+        are drawn up front.
+        
+        Returns the events and newly unlocked achievements of the whole span.
+        """
+        if self.mercado is not None:
+            raise ValueError("Empresa ligada a um mercado: avance os turnos pelo Mercado")
+        if n <= 0:
+            return [], []
+        
+        eventos = []
+        recursos = [self.recursos[k] for k in self._ordem_recursos]
+        volatilidade = np.array([r.volatilidade for r in recursos])
+        choques = self.rng_mercado.uniform(-1.0, 1.0, size=(n, len(recursos))) * volatilidade
+        tem_evento = self.rng_eventos.random(n) < 0.30
+        sorteados = EVENTOS.amostrador.sortear_lote(*self.rng_eventos.random((2, n)))
+        
+        manut = self.custo_manutencao_total()
+        fator_juros = self._fator_juros()
+        ag = self.agregados()
+        pesquisa = ag.pesquisa
+        estoque = np.array([r.quantidade for r in recursos], dtype=np.int64)
+        producao_estavel = None
+        
+        turno_inicial = self.turno
+        pesquisa_inicial = self.pontos_pesquisa
+        capitais = np.empty(n)
+        historico = np.empty((n, len(recursos)))
+        precos = np.array([r.preco for r in recursos])
+        inicio = 0
+        for k in range(n):
+            precos = np.maximum(0.1, np.round(precos * (1 + choques[k]), 2))
+            historico[k] = precos
+            if producao_estavel is not None and not self.modificadores_producao:
+                estoque += producao_estavel
+            else:
+                producao = self._producao_por_turno(estoque)[0]
+                producao_estavel = None
+                if not self.modificadores_producao and self._producao_estavel(producao, estoque):
+                    producao_estavel = producao
+                estoque += producao
+                self._consumir_modificadores()
+            if not tem_evento[k] and k < n - 1:
+                continue
+            
+            # Close the deterministic stretch that ends on this turn
+            capitais[inicio:k + 1] = self._capital_forma_fechada(k + 1 - inicio, manut, fator_juros)
+            inicio = k + 1
+            if tem_evento[k]:
+                for r, preco in zip(recursos, precos.tolist()):
+                    r.preco = preco
+                evento = self._gerar_evento(int(sorteados[k]))
+                eventos.append(evento)
+                self.eventos_log.appendleft(evento)
+                self.estatisticas['eventos_ocorridos'] += 1
+                precos = np.array([r.preco for r in recursos])
+                capitais[k] = self.capital
+        
+        for r, preco, qtd, serie in zip(recursos, precos.tolist(), estoque.tolist(), historico.T):
+            r.preco = preco
+            r.quantidade = qtd
+            r.preco_historico.extend(serie)
+        self.pontos_pesquisa += n * pesquisa
+        
+        self.turno += n
+        self.estatisticas['turnos_jogados'] += n
+        self.estatisticas['max_capital'] = max(self.estatisticas['max_capital'], float(capitais.max()))
+        
+        passos = np.arange(1, n + 1)
+        novas_conquistas = self._verificar_conquistas_serie(
+            turno_inicial + passos, capitais, pesquisa_inicial + passos * pesquisa
+        )
+        
+        self._registrar(OP_TURNOS, n)
+        
+        return eventos, novas_conquistas
+    
+    def _capital_forma_fechada(self, turnos: int, manut: float, fator_juros: float) -> np.ndarray:
+        """Apply ``turnos`` turns of maintenance and bank interest to the capital.
+        
+        Each turn is ``c -> (c - manut) * fator_juros``, so the trajectory is
+        a geometric series around its fixed point. Returns the capital at the
+        end of every turn.
+        """
+        c0 = self.capital
+        k = np.arange(1, turnos + 1)
+        if fator_juros == 1.0:
+            trajetoria = c0 - k * manut
+        else:
+            fixo = manut * fator_juros / (fator_juros - 1)
+            with np.errstate(over='ignore'):  # runaway interest goes to inf, like the turn loop
+                trajetoria = fixo + (c0 - fixo) * fator_juros ** k
+        
+        self.capital = float(trajetoria[-1])
+        self.estatisticas['total_gasto'] += turnos * manut
+        if fator_juros != 1.0:
+            # Whatever the capital gained beyond the maintenance paid is interest
+            self.estatisticas['total_ganho'] += self.capital - c0 + turnos * manut
+        return trajetoria
+    
+    def _verificar_conquistas_serie(self, turnos, capitais, pesquisas):
+        """Check achievements against per-turn stat series of a multi-turn span.
+        
+        Each condition is evaluated over the whole series at once and
+        unlocks on the first turn it holds.
+        """
+        stats_finais = self._stats_conquistas()
+        stats = dict(stats_finais, turno=turnos, capital=capitais, pesquisa=pesquisas)
+        return self._motor_conquistas.verificar_serie(stats, turnos, stats_finais)
+    
+    def _gerar_evento(self, indice: Optional[int] = None) -> Evento:
+        """Apply a random event from ``EVENTOS`` (or the one at ``indice``)."""
+        if indice is None:
+            indice = EVENTOS.amostrador.sortear(*self.rng_eventos.random(2).tolist())
+        tipo_evento = EVENTOS.tipos[indice]
+        
+        # Only events that act on a resource pick one
+        recurso = None
+        desc = tipo_evento.descricao
+        if EVENTOS.usa_recurso[indice]:
+            recurso = self.recursos[self._ordem_recursos[self.rng_alvos.integers(len(self._ordem_recursos))]]
+            desc = desc.format(recurso=recurso.nome)
+        
+        for efeito in tipo_evento.efeitos:
+            efeito.aplicar(self, recurso)
+        
+        return Evento(tipo_evento.titulo, desc, tipo_evento.tipo, ICONES_EVENTO[tipo_evento.tipo])
+    
+    def comprar_recurso(self, chave: str, quantidade: int):
+        r = self.recursos[chave]
+        custo = quantidade * r.preco
+        if custo > self.capital:
+            raise ValueError("Capital insuficiente")
+        self.capital -= custo
+        r.quantidade += quantidade
+        self.estatisticas['total_gasto'] += custo
+        if self.mercado is not None:
+            self.mercado.fluxo[self._indice_recurso[chave]] += quantidade
+        self._registrar(OP_COMPRAR, self._indice_recurso[chave], quantidade)
+    
+    def vender_recurso(self, chave: str, quantidade: int):
+        r = self.recursos[chave]
+        if quantidade > r.quantidade:
+            raise ValueError("Quantidade insuficiente")
+        ganho = quantidade * r.preco
+        self.capital += ganho
+        r.quantidade -= quantidade
+        self.estatisticas['total_ganho'] += ganho
+        self.estatisticas['recursos_vendidos'] += quantidade
+        if self.mercado is not None:
+            self.mercado.fluxo[self._indice_recurso[chave]] -= quantidade
+        self._registrar(OP_VENDER, self._indice_recurso[chave], quantidade)
+    
+    def executar_ordens(self, ordens: Sequence[Ordem], parcial: bool = False) -> np.ndarray:
+        """Execute a basket of buy/sell orders at the current prices in one pass.
+        
+        By default the basket is all-or-nothing: it is checked as a whole
+        (sales fund purchases, no resource may end below zero) and either
+        every order fills or ``ValueError`` is raised and nothing changes.
+        With ``parcial`` sales fill first, up to the stock held before the
+        basket, then purchases in order as far as the capital allows.
+        Returns the quantity filled for each order.
+        """
+        if not ordens:
+            return np.zeros(0, dtype=np.int64)
+        idx, quantidades, venda = self._vetorizar_ordens(ordens)
+        recursos = [self.recursos[k] for k in self._ordem_recursos]
+        precos = np.array([r.preco for r in recursos])[idx]
+        estoque = np.array([r.quantidade for r in recursos], dtype=np.int64)
+        
+        if parcial:
+            preenchido = self._preencher_parcial(idx, quantidades, venda, precos, estoque)
+        else:
+            preenchido = quantidades
+            sinal = np.where(venda, -preenchido, preenchido)
+            if (estoque + np.bincount(idx, weights=sinal, minlength=len(recursos)) < 0).any():
+                raise ValueError("Quantidade insuficiente")
+            valores = preenchido * precos
+            if valores[~venda].sum() > self.capital + valores[venda].sum():
+                raise ValueError("Capital insuficiente")
+        
+        valores = preenchido * precos
+        sinal = np.where(venda, -preenchido, preenchido)
+        delta = np.bincount(idx, weights=sinal, minlength=len(recursos)).astype(np.int64)
+        self._aplicar_execucao(delta, float(valores[~venda].sum()), float(valores[venda].sum()),
+                               int(preenchido[venda].sum()))
+        if self.mercado is not None:
+            self.mercado.fluxo += delta
+        if self.diario is not None:
+            self.diario.registrar_ordens(ordens, parcial)
+        return preenchido
+    
+    def _vetorizar_ordens(self, ordens: Sequence[Ordem]):
+        """Validate ``ordens`` into (resource index, quantity, is-sale) arrays."""
+        try:
+            idx = np.array([self._indice_recurso[o.recurso] for o in ordens], dtype=np.intp)
+        except KeyError as e:
+            raise ValueError(f"Recurso desconhecido: {e.args[0]}") from None
+        if any(o.tipo not in ('comprar', 'vender') for o in ordens):
+            raise ValueError("Ordem inválida")
+        quantidades = np.array([o.quantidade for o in ordens], dtype=np.int64)
+        if (quantidades < 0).any():
+            raise ValueError("Quantidade inválida")
+        venda = np.array([o.tipo == 'vender' for o in ordens])
+        return idx, quantidades, venda
+    
+    def _aplicar_execucao(self, delta: np.ndarray, custo: float, receita: float, vendidos: int):
+        """Book filled trades: stock change per resource, cash out, cash in and units sold."""
+        for r, d in zip(self.recursos.values(), delta.tolist()):
+            r.quantidade += d
+        self.capital += receita - custo
+        self.estatisticas['total_gasto'] += custo
+        self.estatisticas['total_ganho'] += receita
+        self.estatisticas['recursos_vendidos'] += vendidos
+    
+    def _preencher_parcial(self, idx, quantidades, venda, precos, estoque) -> np.ndarray:
+        preenchido = np.zeros_like(quantidades)
+        disponivel = estoque.copy()
+        caixa = self.capital
+        for i in np.flatnonzero(venda).tolist():
+            q = min(int(quantidades[i]), int(disponivel[idx[i]]))
+            disponivel[idx[i]] -= q
+            preenchido[i] = q
+            caixa += q * precos[i]
+        for i in np.flatnonzero(~venda).tolist():
+            acessivel = int(quantidades[i]) if caixa == math.inf else int(caixa // precos[i])
+            q = max(0, min(int(quantidades[i]), acessivel))
+            preenchido[i] = q
+            caixa -= q * precos[i]
+        return preenchido
+    
+    def construir(self, modelo_id: str, quantidade: int = 1):
+        if quantidade < 1:
+            raise ValueError("Quantidade inválida")
+        modelo = self.modelos_construcao[modelo_id]
+        custo = modelo.custo * quantidade
+        if self.capital < custo:
+            raise ValueError("Capital insuficiente")
+        self.capital -= custo
+        self.estatisticas['total_gasto'] += custo
+        self.estatisticas['construcoes_feitas'] += quantidade
+        if not self.compacta:
+            self.construcoes.extend(Construcao(modelo=modelo, nivel=1, built_at=self.turno)
+                                    for _ in range(quantidade))
+        self._estado.adicionar(self._indice_modelo[modelo_id], 1, self.turno, quantidade)
+        self._contar(self._indice_modelo[modelo_id], 1, quantidade)
+        self._registrar(OP_CONSTRUIR, self._indice_modelo[modelo_id], quantidade)
+    
+    def upgrade_construcao(self, index: int):
+        if index < 0 or index >= len(self.construcoes):
+            raise ValueError("Construção inválida")
+        
+        c = self.construcoes[index]
+        if c.nivel >= c.modelo.nivel_max:
+            raise ValueError("Nível máximo atingido")
+        
+        custo = c.custo_upgrade
+        if self.capital < custo:
+            raise ValueError("Capital insuficiente")
+        
+        self.capital -= custo
+        nivel = c.nivel + 1
+        if not self.compacta:
+            c.nivel = nivel
+        self._estado.definir_nivel(index, nivel)
+        self._contar(self._indice_modelo[c.modelo.id], nivel - 1, -1)
+        self._contar(self._indice_modelo[c.modelo.id], nivel, +1)
+        self.estatisticas['total_gasto'] += custo
+        self.estatisticas['upgrades_feitos'] += 1
+        self._registrar(OP_UPGRADE, index)
+    
+    def demolir_construcao(self, index: int):
+        if index < 0 or index >= len(self.construcoes):
+            raise ValueError("Construção inválida")
+        
+        c = self.construcoes[index]
+        reembolso = c.modelo.custo * 0.3  # 30% de reembolso
+        self.capital += reembolso
+        self.estatisticas['total_ganho'] += reembolso
+        if not self.compacta:
+            self.construcoes.pop(index)
+        self._estado.remover(index)
+        self._contar(self._indice_modelo[c.modelo.id], c.nivel, -1)
+        self._registrar(OP_DEMOLIR, index)
+    
+    def _registrar(self, op: int, *args):
+        if self.diario is not None:
+            self.diario.registrar(self, op, *args)
+    
+    def iniciar_diario(self, caminho: Optional[str] = None,
+                       intervalo_checkpoint: Optional[int] = None) -> 'DiarioAcoes':
+        """Start journaling every state-changing call, to ``caminho`` or to memory."""
+        self.diario = DiarioAcoes(self, caminho, intervalo_checkpoint or INTERVALO_CHECKPOINT)
+        return self.diario
+    
+    def capturar(self) -> FotoEmpresa:
+        """Take a snapshot of the whole game state for undo or what-if branches.
+        
+        Only the price histories and building pages that changed since the
+        previous snapshot are copied; everything else is a handful of scalars.
+        """
+        base = self._ultima_foto
+        historicos = []
+        for i, r in enumerate(self.recursos.values()):
+            h = r.preco_historico
+            if base is not None and base.historicos[i][0] == h.versao:
+                historicos.append(base.historicos[i])
+            else:
+                historicos.append((h.versao, h.capacidade, h.ultimos().copy()))
+        ag = self._agregados
+        conquistas = list(self.conquistas.values())
+        foto = FotoEmpresa(
+            capital=self.capital,
+            turno=self.turno,
+            pontos_pesquisa=self.pontos_pesquisa,
+            quantidades=np.array([r.quantidade for r in self.recursos.values()], dtype=np.int64),
+            precos=np.array([r.preco for r in self.recursos.values()], dtype=np.float64),
+            historicos=tuple(historicos),
+            construcoes=self._estado.capturar(base.construcoes if base is not None else None),
+            contagem=self._contagem.copy(),
+            agregados=AgregadosCidade(ag.manutencao, ag.producao.copy(), ag.pesquisa, ag.soma_niveis_banco),
+            desbloqueadas=np.array([c.desbloqueada for c in conquistas], dtype=bool),
+            turnos_desbloqueio=np.array([c.turno_desbloqueio for c in conquistas], dtype=np.int64),
+            estatisticas=tuple(self.estatisticas.items()),
+            modificadores=tuple((m.recurso, m.fator, m.turnos_restantes) for m in self.modificadores_producao),
+            eventos_log=tuple(self.eventos_log),
+            semente=self._seed_seq,
+            estados_rng=(self.rng_mercado.bit_generator.state, self.rng_eventos.bit_generator.state,
+                         self.rng_alvos.bit_generator.state),
+        )
+        self._ultima_foto = foto
+        return foto
+    
+    def restaurar(self, foto: FotoEmpresa):
+        """Return to ``foto``. Only the parts that differ from it are written back."""
+        self.capital = foto.capital
+        self.turno = foto.turno
+        self.pontos_pesquisa = foto.pontos_pesquisa
+        
+        for r, qtd, preco, (versao, capacidade, pontos) in zip(
+                self.recursos.values(), foto.quantidades.tolist(), foto.precos.tolist(), foto.historicos):
+            r.quantidade = qtd
+            r.preco = preco
+            if r.preco_historico.versao != versao:
+                r.preco_historico = HistoricoPrecos(capacidade, pontos)
+                r.preco_historico.versao = versao
+        
+        tamanho_anterior = len(self._estado)
+        sujas = self._estado.restaurar(foto.construcoes)
+        if not self.compacta:
+            self._reconstruir_objetos(sujas, tamanho_anterior)
+        self._contagem = foto.contagem.copy()
+        ag = foto.agregados
+        self._agregados = AgregadosCidade(ag.manutencao, ag.producao.copy(), ag.pesquisa, ag.soma_niveis_banco)
+        
+        for c, desbloqueada, turno in zip(self.conquistas.values(), foto.desbloqueadas.tolist(),
+                                          foto.turnos_desbloqueio.tolist()):
+            c.desbloqueada = desbloqueada
+            c.turno_desbloqueio = turno
+        self._motor_conquistas.reiniciar()
+        
+        self.estatisticas = dict(foto.estatisticas)
+        self.modificadores_producao = [ModificadorProducao(*m) for m in foto.modificadores]
+        self.eventos_log.clear()
+        self.eventos_log.extend(foto.eventos_log)
+        
+        self._seed_seq = foto.semente
+        for rng, estado in zip((self.rng_mercado, self.rng_eventos, self.rng_alvos), foto.estados_rng):
+            rng.bit_generator.state = estado
+        self._ultima_foto = foto
+        # The shared market isn't rewound with the company
+        if self.mercado is not None:
+            self.mercado.publicar(self)
+        # A jump in state can't be replayed from calls, so the journal stores it whole
+        if self.diario is not None:
+            self.diario.checkpoint(self)
+    
+    def _reconstruir_objetos(self, paginas: np.ndarray, tamanho_anterior: int):
+        """Rebuild the ``Construcao`` objects for restored pages and rows that reappeared."""
+        n = len(self._estado)
+        lista = self.construcoes
+        del lista[n:]
+        lista.extend([None] * (n - len(lista)))
+        faixas = [(p * LINHAS_POR_PAGINA, min((p + 1) * LINHAS_POR_PAGINA, n)) for p in paginas.tolist()]
+        if tamanho_anterior < n:
+            faixas.append((tamanho_anterior, n))
+        modelo_idx, nivel, built_at = self._estado.visao()
+        for i, j in faixas:
+            for k, m, nv, b in zip(range(i, j), modelo_idx[i:j].tolist(), nivel[i:j].tolist(),
+                                   built_at[i:j].tolist()):
+                lista[k] = Construcao(modelo=self.modelos_construcao[self._ordem_modelos[m]], nivel=nv, built_at=b)
+    
+    @contextmanager
+    def ramificar(self):
+        """What-if branch: whatever happens inside the ``with`` block is rolled back on exit."""
+        foto = self.capturar()
+        try:
+            yield self
+        finally:
+            self.restaurar(foto)
+    
+    def _dados_escalares(self) -> dict:
+        """Everything in a save except the buildings and the price histories."""
+        return {
+            'capital': self.capital,
+            'turno': self.turno,
+            'pontos_pesquisa': self.pontos_pesquisa,
+            'recursos': {k: {'quantidade': v.quantidade, 'preco': v.preco}
+                        for k, v in self.recursos.items()},
+            'conquistas': {k: {'desbloqueada': v.desbloqueada, 'turno': v.turno_desbloqueio}
+                          for k, v in self.conquistas.items()},
+            'estatisticas': self.estatisticas,
+            'modificadores_producao': [{'recurso': m.recurso, 'fator': m.fator, 'turnos': m.turnos_restantes}
+                                       for m in self.modificadores_producao],
+            'rng': {
+                'semente': self._seed_seq.entropy,
+                'spawn_key': list(self._seed_seq.spawn_key),
+                'mercado': self.rng_mercado.bit_generator.state,
+                'eventos': self.rng_eventos.bit_generator.state,
+                'alvos': self.rng_alvos.bit_generator.state,
+            },
+        }
+    
+    def to_dict(self) -> dict:
+        data = self._dados_escalares()
+        for k, v in self.recursos.items():
+            data['recursos'][k]['preco_historico'] = v.preco_historico.para_dict()
+        data['construcoes'] = [{'modelo_id': self._ordem_modelos[m], 'nivel': n, 'built_at': b}
+                               for m, n, b in zip(*(a.tolist() for a in self._estado.visao()))]
+        return data
+    
+    def from_dict(self, data: dict):
+        historicos = {k: HistoricoPrecos.de_dict(v.get('preco_historico', [v['preco']]), self.profundidade_historico)
+                      for k, v in data['recursos'].items()}
+        construcoes = data['construcoes']
+        self._aplicar_dados(
+            data, historicos,
+            np.array([self._indice_modelo[c['modelo_id']] for c in construcoes], dtype=np.uint8),
+            np.array([c['nivel'] for c in construcoes], dtype=np.uint8),
+            np.array([c['built_at'] for c in construcoes], dtype=np.int32),
+        )
+    
+    def salvar_binario(self, arquivo, comprimir: bool = True):
+        """Write a versioned ``.npz`` save.
+        
+        Buildings and price histories are stored as typed arrays; the small
+        remainder of the state is one JSON blob. ``comprimir`` deflates the
+        arrays, which mostly pays off on the buildings.
+        """
+        meta = self._dados_escalares()
+        meta['modelos'] = self._ordem_modelos
+        historicos = [self.recursos[k].preco_historico.ultimos() for k in self._ordem_recursos]
+        modelo_idx, nivel, built_at = self._estado.visao()
+        (np.savez_compressed if comprimir else np.savez)(
+            arquivo,
+            versao=np.array(VERSAO_SAVE_BINARIO),
+            meta=np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8),
+            construcoes_modelo=modelo_idx,
+            construcoes_nivel=nivel,
+            construcoes_built_at=built_at,
+            historicos=np.concatenate(historicos),
+            historicos_tamanho=np.array([len(h) for h in historicos], dtype=np.int64),
+        )
+    
+    def carregar_binario(self, arquivo):
+        """Load a save written by :meth:`salvar_binario`."""
+        with np.load(arquivo, allow_pickle=False) as npz:
+            versao = int(npz['versao'])
+            if versao > VERSAO_SAVE_BINARIO:
+                raise ValueError(f"Versão de save não suportada: {versao}")
+            meta = json.loads(npz['meta'].tobytes().decode('utf-8'))
+            # Model indices are remapped by id, so saves survive reordering the models
+            mapa = np.array([self._indice_modelo[m] for m in meta['modelos']], dtype=np.uint8)
+            tamanhos = npz['historicos_tamanho']
+            series = np.split(npz['historicos'], np.cumsum(tamanhos)[:-1])
+            historicos = {k: HistoricoPrecos(max(self.profundidade_historico, len(v)), v)
+                          for k, v in zip(meta['recursos'], series)}
+            self._aplicar_dados(meta, historicos, mapa[npz['construcoes_modelo']],
+                                npz['construcoes_nivel'], npz['construcoes_built_at'])
+    
+    def _aplicar_dados(self, data: dict, historicos: Dict[str, HistoricoPrecos],
+                       modelo_idx: np.ndarray, nivel: np.ndarray, built_at: np.ndarray):
+        """Load a saved state: the scalar part of a save plus typed building arrays."""
+        self.capital = data['capital']
+        self.turno = data['turno']
+        self.pontos_pesquisa = data['pontos_pesquisa']
+        
+        for k, v in data['recursos'].items():
+            if k in self.recursos:
+                self.recursos[k].quantidade = v['quantidade']
+                self.recursos[k].preco = v['preco']
+                self.recursos[k].preco_historico = historicos[k]
+        
+        self._estado.carregar(modelo_idx, nivel, built_at)
+        if not self.compacta:
+            modelos = [self.modelos_construcao[mid] for mid in self._ordem_modelos]
+            self.construcoes = [Construcao(modelo=modelos[m], nivel=n, built_at=b)
+                                for m, n, b in zip(modelo_idx.tolist(), nivel.tolist(), built_at.tolist())]
+        self._reiniciar_contadores()
+        
+        for k, v in data.get('conquistas', {}).items():
+            if k in self.conquistas:
+                self.conquistas[k].desbloqueada = v['desbloqueada']
+                self.conquistas[k].turno_desbloqueio = v['turno']
+        self._motor_conquistas.reiniciar()
+        
+        self.estatisticas = data.get('estatisticas', self.estatisticas)
+        self.modificadores_producao = [ModificadorProducao(m['recurso'], m['fator'], m['turnos'])
+                                       for m in data.get('modificadores_producao', [])]
+        
+        # Older saves have no RNG state and keep the current streams
+        if 'rng' in data:
+            rng = data['rng']
+            self._init_rngs(np.random.SeedSequence(rng['semente'], spawn_key=tuple(rng['spawn_key'])))
+            self.rng_mercado.bit_generator.state = rng['mercado']
+            self.rng_eventos.bit_generator.state = rng['eventos']
+            self.rng_alvos.bit_generator.state = rng['alvos']
+        
+        if self.diario is not None:
+            self.diario.checkpoint(self)
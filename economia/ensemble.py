@@ -0,0 +1,176 @@
+"""Headless Monte Carlo ensemble of whole games, spread over worker processes."""
+
+import math
+import os
+import time
+# The process pool (and multiprocessing) only loads on first use, off the import path
+from concurrent import futures
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+from .empresa import Empresa
+
+PERCENTIS_ENSEMBLE = (5, 25, 50, 75, 95)
+# Percentiles come from a mergeable sketch: each capital is counted in a
+# logarithmic bucket whose values are all within ERRO_PERCENTIS of each other
+ERRO_PERCENTIS = 0.005
+CAPITAL_MINIMO_SKETCH = 0.01  # magnitudes below a cent share the zero bucket
+_GAMA = (1 + ERRO_PERCENTIS) / (1 - ERRO_PERCENTIS)
+_BALDE_MAXIMO = math.ceil((math.log(np.finfo(np.float64).max) - math.log(CAPITAL_MINIMO_SKETCH))
+                          / math.log(_GAMA)) + 1
+_LARGURA_TURNO = 2 * _BALDE_MAXIMO + 1
+
+@dataclass
+class ResultadoEnsemble:
+    """Per-turn capital distribution over an ensemble of independent runs."""
+    execucoes: int
+    turnos: int
+    media: np.ndarray
+    desvio: np.ndarray
+    percentis: Dict[int, np.ndarray]  # within ERRO_PERCENTIS of the exact percentile
+    prob_ruina: np.ndarray  # chance of having gone below zero capital by each turn
+    segundos: float
+    workers: int
+    
+    @property
+    def execucoes_por_segundo_por_nucleo(self) -> float:
+        return self.execucoes / max(self.segundos, 1e-9) / self.workers
+
+def _baldes(capitais: np.ndarray) -> np.ndarray:
+    """Signed sketch bucket of every capital; 0 holds everything below a cent."""
+    magnitude = np.abs(capitais)
+    with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+        indice = np.ceil(np.log(magnitude / CAPITAL_MINIMO_SKETCH) / math.log(_GAMA))
+        indice = np.where(magnitude >= CAPITAL_MINIMO_SKETCH, np.minimum(indice, _BALDE_MAXIMO - 1) + 1, 0)
+    return (np.sign(capitais) * indice).astype(np.int64)
+
+def _somar_baldes(chaves: np.ndarray, contagens: np.ndarray, somas: np.ndarray):
+    unicas, inverso = np.unique(chaves, return_inverse=True)
+    with np.errstate(invalid='ignore'):
+        return (unicas, np.bincount(inverso, weights=contagens, minlength=len(unicas)).astype(np.int64),
+                np.bincount(inverso, weights=somas, minlength=len(unicas)))
+
+@dataclass
+class ResumoEnsemble:
+    """Per-turn summary of a set of runs that merges without the runs themselves.
+    
+    Mean and spread are kept as (mean, sum of squared deviations) and merged
+    with Chan's formula, ruin as counts, and the percentiles as a sparse
+    sketch of (turn, bucket) counts and sums; a percentile is the mean of
+    its bucket, exact when the bucket holds a single value. The size depends
+    on how spread the capital is, never on the number of runs.
+    """
+    execucoes: int
+    media: np.ndarray
+    m2: np.ndarray
+    ruinas: np.ndarray  # runs that went below zero capital by each turn
+    chaves: np.ndarray  # turn * _LARGURA_TURNO + bucket offset, sorted and unique
+    contagens: np.ndarray
+    somas: np.ndarray
+    
+    @classmethod
+    def de_capitais(cls, capitais: np.ndarray) -> 'ResumoEnsemble':
+        """Summary of runs x turns capital trajectories."""
+        with np.errstate(invalid='ignore', over='ignore'):
+            media = capitais.mean(axis=0)
+            m2 = ((capitais - media) ** 2).sum(axis=0)
+        turno = np.arange(capitais.shape[1]) * _LARGURA_TURNO + _BALDE_MAXIMO
+        return cls(capitais.shape[0], media, m2,
+                   np.logical_or.accumulate(capitais < 0, axis=1).sum(axis=0),
+                   *_somar_baldes((_baldes(capitais) + turno).ravel(), np.ones(capitais.size), capitais.ravel()))
+    
+    def juntar(self, outro: 'ResumoEnsemble') -> 'ResumoEnsemble':
+        n = self.execucoes + outro.execucoes
+        with np.errstate(invalid='ignore', over='ignore'):
+            delta = outro.media - self.media
+            media = self.media + delta * (outro.execucoes / n)
+            m2 = self.m2 + outro.m2 + delta ** 2 * (self.execucoes * outro.execucoes / n)
+        return ResumoEnsemble(n, media, m2, self.ruinas + outro.ruinas,
+                              *_somar_baldes(np.concatenate([self.chaves, outro.chaves]),
+                                             np.concatenate([self.contagens, outro.contagens]),
+                                             np.concatenate([self.somas, outro.somas])))
+    
+    def percentis(self, percentis: Sequence[float] = PERCENTIS_ENSEMBLE) -> Dict[float, np.ndarray]:
+        """Per-turn estimate of the run at rank ``floor(p/100 * (runs - 1))`` for each ``p``."""
+        turnos = len(self.media)
+        acumulado = np.cumsum(self.contagens)
+        inicio_turno = np.searchsorted(self.chaves, np.arange(turnos) * _LARGURA_TURNO)
+        antes = np.concatenate(([0], acumulado))[inicio_turno]
+        resultado = {}
+        for p in percentis:
+            posto = math.floor(p / 100 * (self.execucoes - 1))
+            balde = np.searchsorted(acumulado, antes + posto, side='right')
+            resultado[p] = self.somas[balde] / self.contagens[balde]
+        return resultado
+
+def _jogar_lote(sementes: Sequence[np.random.SeedSequence], turnos: int, ordem_construcao: Sequence[str],
+                capital_inicial: Optional[float]) -> np.ndarray:
+    """Play one game per seed and return its capital at the end of every turn.
+    
+    The build order is followed greedily: each turn the next building in the
+    list is bought as soon as it is affordable.
+    """
+    capitais = np.empty((len(sementes), turnos), dtype=np.float64)
+    for i, semente in enumerate(sementes):
+        empresa = Empresa(semente=semente)
+        if capital_inicial is not None:
+            empresa.capital = capital_inicial
+        fila = list(ordem_construcao)
+        for t in range(turnos):
+            while fila and empresa.capital >= empresa.modelos_construcao[fila[0]].custo:
+                empresa.construir(fila.pop(0))
+            empresa.avancar_turno()
+            capitais[i, t] = empresa.capital
+    return capitais
+
+def _simular_lote(sementes: Sequence[np.random.SeedSequence], turnos: int, ordem_construcao: Sequence[str],
+                  capital_inicial: Optional[float]) -> ResumoEnsemble:
+    """Worker: play a batch of games and send back only its summary."""
+    return ResumoEnsemble.de_capitais(_jogar_lote(sementes, turnos, ordem_construcao, capital_inicial))
+
+def _resumir_ensemble(resumo: ResumoEnsemble, segundos: float, workers: int) -> ResultadoEnsemble:
+    with np.errstate(invalid='ignore'):
+        desvio = np.sqrt(resumo.m2 / resumo.execucoes)
+    return ResultadoEnsemble(
+        execucoes=resumo.execucoes,
+        turnos=len(resumo.media),
+        media=resumo.media,
+        desvio=desvio,
+        percentis=resumo.percentis(PERCENTIS_ENSEMBLE),
+        prob_ruina=resumo.ruinas / resumo.execucoes,
+        segundos=segundos,
+        workers=workers,
+    )
+
+def executar_ensemble(execucoes: int = 1000, turnos: int = 200,
+                      ordem_construcao: Sequence[str] = (),
+                      capital_inicial: Optional[float] = None, semente: int = 0,
+                      workers: Optional[int] = None, tamanho_lote: Optional[int] = None,
+                      ao_progredir: Optional[Callable[[ResultadoEnsemble], None]] = None
+                      ) -> ResultadoEnsemble:
+    """Run ``execucoes`` independently seeded games across a process pool.
+    
+    Workers send back a ``ResumoEnsemble`` per batch, never game state or
+    trajectories, and the driver merges each one as it lands, so memory
+    and merge time do not grow with the number of runs. ``ao_progredir``
+    receives the running summary every time a batch lands.
+    """
+    workers = workers or os.cpu_count() or 1
+    tamanho_lote = tamanho_lote or max(1, math.ceil(execucoes / (workers * 4)))
+    sementes = np.random.SeedSequence(semente).spawn(execucoes)
+    lotes = [sementes[i:i + tamanho_lote] for i in range(0, execucoes, tamanho_lote)]
+    
+    inicio = time.perf_counter()
+    resumo = None
+    with futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = [pool.submit(_simular_lote, lote, turnos, tuple(ordem_construcao), capital_inicial)
+                   for lote in lotes]
+        for futuro in futures.as_completed(futuros):
+            parte = futuro.result()
+            resumo = parte if resumo is None else resumo.juntar(parte)
+            if ao_progredir:
+                ao_progredir(_resumir_ensemble(resumo, time.perf_counter() - inicio, workers))
+    
+    return _resumir_ensemble(resumo, time.perf_counter() - inicio, workers)
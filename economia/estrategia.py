@@ -0,0 +1,139 @@
+"""Beam search over multi-turn action plans."""
+
+import math
+import time
+import heapq
+from concurrent import futures
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .modelos import FotoEmpresa
+from .empresa import Empresa
+from .planejador import Acao, _amostrar_futuros, _amostrar_futuros_lote, _pontuar_acoes, acoes_legais
+
+@dataclass
+class NoBusca:
+    foto: FotoEmpresa
+    plano: tuple  # Acao path from the root
+    acoes_no_turno: int
+    valor: float  # expected patrimônio at the end of the evaluation horizon
+
+@dataclass
+class ResultadoEstrategia:
+    plano: List[Acao]
+    valor: float
+    nos: int
+    consultas_cache: int
+    acertos_cache: int
+    segundos: float
+    workers: int
+    
+    @property
+    def nos_por_segundo(self) -> float:
+        return self.nos / max(self.segundos, 1e-9)
+    
+    @property
+    def taxa_acerto_cache(self) -> float:
+        return self.acertos_cache / max(self.consultas_cache, 1)
+
+def _chave_transposicao(foto: FotoEmpresa, acoes_no_turno: int) -> tuple:
+    """Hash key of a search state.
+    
+    Prices, events and modifiers only depend on the turn along a search
+    path, and building order does not change the economy, so states that
+    agree on these fields and on the moves left this turn play out
+    identically.
+    """
+    return (foto.turno, acoes_no_turno, round(foto.capital, 2), foto.pontos_pesquisa,
+            foto.quantidades.tobytes(), foto.contagem.tobytes())
+
+def buscar_estrategia(empresa: Empresa, turnos: int = 20, largura_feixe: int = 8,
+                      acoes_por_turno: int = 2, horizonte_avaliacao: int = 20,
+                      sementes: int = 32, semente: Optional[int] = None,
+                      workers: int = 1) -> ResultadoEstrategia:
+    """Beam search for the best sequence of moves over the next ``turnos`` turns.
+    
+    A move is one of ``acoes_legais(..., todas=True)`` or ending the turn,
+    with at most ``acoes_por_turno`` moves before the turn must end. Turns
+    inside the tree are played with the company's own random streams, so
+    the plan is for this seeded game. Every node is valued by its expected
+    patrimônio ``horizonte_avaliacao`` turns past the plan, over ``sementes``
+    market futures that are sampled once per turn (split across a process
+    pool when ``workers > 1``). States reached twice, e.g. by building the
+    same things in another order, are pruned through a transposition table.
+    ``empresa`` itself is left untouched.
+    """
+    if turnos < 1 or largura_feixe < 1 or horizonte_avaliacao < 1:
+        raise ValueError("Turnos, largura do feixe e horizonte devem ser positivos")
+    inicio = time.perf_counter()
+    turno_final = empresa.turno + turnos
+    filhas = np.random.SeedSequence(semente).spawn(sementes)
+    trabalho = Empresa(compacta=True)
+    esperar = [Acao('esperar', None, "⏸️ Esperar")]
+    fim_turno = Acao('turno', None, "⏭️ Próximo turno")
+    workers = max(1, min(workers, sementes))
+    pool = futures.ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    
+    futuros_por_turno = {}
+    def valores(foto: FotoEmpresa, acoes: Sequence[Acao]) -> List[float]:
+        chave = (foto.turno, foto.precos.tobytes())
+        if chave not in futuros_por_turno:
+            restante = turno_final + horizonte_avaliacao - foto.turno
+            if pool is None:
+                futuros_por_turno[chave] = _amostrar_futuros(trabalho, foto, restante, filhas)
+            else:
+                tamanho = math.ceil(sementes / workers)
+                partes = list(pool.map(_amostrar_futuros_lote, *zip(*[
+                    (foto, restante, filhas[i:i + tamanho]) for i in range(0, sementes, tamanho)
+                ])))
+                futuros_por_turno[chave] = tuple(np.concatenate(x) for x in zip(*partes))
+        _, patrimonio, _ = _pontuar_acoes(trabalho, foto, acoes, futuros_por_turno[chave])
+        return patrimonio.mean(axis=1).tolist()
+    
+    expandidos = consultas = acertos = 0
+    try:
+        raiz = empresa.capturar()
+        vistos = {_chave_transposicao(raiz, 0)}
+        fronteira = [NoBusca(raiz, (), 0, valores(raiz, esperar)[0])]
+        finais: List[NoBusca] = []
+        while fronteira:
+            filhos = []
+            for no in fronteira:
+                expandidos += 1
+                trabalho.restaurar(no.foto)
+                acoes = [] if no.acoes_no_turno >= acoes_por_turno else acoes_legais(trabalho, todas=True)[1:]
+                novas = []
+                for acao in acoes + [fim_turno]:
+                    trabalho.restaurar(no.foto)
+                    acao.aplicar(trabalho)
+                    foto = trabalho.capturar()
+                    consultas += 1
+                    chave = _chave_transposicao(foto, 0 if acao.tipo == 'turno' else no.acoes_no_turno + 1)
+                    if chave in vistos:
+                        acertos += 1
+                        continue
+                    vistos.add(chave)
+                    novas.append((acao, foto))
+                
+                # Moves inside the turn are valued from the parent's futures in one batch
+                dentro = [(acao, foto) for acao, foto in novas if acao.tipo != 'turno']
+                pontos = valores(no.foto, [acao for acao, _ in dentro]) if dentro else []
+                for (acao, foto), valor in zip(dentro, pontos):
+                    filhos.append(NoBusca(foto, no.plano + (acao,), no.acoes_no_turno + 1, valor))
+                for acao, foto in novas:
+                    if acao.tipo != 'turno':
+                        continue
+                    filho = NoBusca(foto, no.plano + (acao,), 0, valores(foto, esperar)[0])
+                    (finais if foto.turno >= turno_final else filhos).append(filho)
+            fronteira = heapq.nlargest(largura_feixe, filhos, key=lambda n: n.valor)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    
+    if not finais:
+        raise ValueError("Nenhum plano chegou ao turno final")
+    melhor = max(finais, key=lambda n: n.valor)
+    return ResultadoEstrategia(list(melhor.plano), melhor.valor, expandidos, consultas, acertos,
+                               time.perf_counter() - inicio, workers)
@@ -0,0 +1,118 @@
+"""Random event registry: event types, their effects and the alias sampler that picks them."""
+
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .modelos import Recurso
+
+@dataclass
+class ModificadorProducao:
+    """Temporary multiplier on one resource's production."""
+    recurso: str
+    fator: float
+    turnos_restantes: int
+
+@dataclass(frozen=True)
+class EfeitoPreco:
+    """Multiplies the event's target resource price."""
+    fator: float
+    minimo: float = 0.0
+    
+    def aplicar(self, empresa: 'Empresa', recurso: Optional[Recurso]):
+        recurso.preco = max(self.minimo, round(recurso.preco * self.fator, 2))
+        if empresa.mercado is not None:
+            # A shared market passes the shock on to every company at its next clearing
+            empresa.mercado.choque(empresa, recurso, self.fator)
+
+@dataclass(frozen=True)
+class EfeitoCapital:
+    """Adds (or, if negative, removes) a fixed amount of capital."""
+    delta: float
+    
+    def aplicar(self, empresa: 'Empresa', recurso: Optional[Recurso]):
+        empresa.capital += self.delta
+
+@dataclass(frozen=True)
+class EfeitoProducao:
+    """Multiplies a resource's production for the next ``duracao`` turns."""
+    recurso: str
+    fator: float
+    duracao: int
+    
+    def aplicar(self, empresa: 'Empresa', recurso: Optional[Recurso]):
+        empresa.modificadores_producao.append(ModificadorProducao(self.recurso, self.fator, self.duracao))
+
+@dataclass(frozen=True)
+class TipoEvento:
+    tipo: str  # 'bonus', 'penalty', 'neutral', 'special'
+    titulo: str
+    descricao: str  # may use {recurso} for the target resource
+    efeitos: tuple = ()
+    peso: float = 1.0
+    
+    @property
+    def usa_recurso(self) -> bool:
+        return any(isinstance(e, EfeitoPreco) for e in self.efeitos)
+
+ICONES_EVENTO = {'bonus': '✅', 'penalty': '⚠️', 'neutral': 'ℹ️', 'special': '⭐'}
+
+class AmostradorAlias:
+    """Walker/Vose alias table: O(n) to build, O(1) per weighted draw."""
+    
+    def __init__(self, pesos: Sequence[float]):
+        n = len(pesos)
+        total = float(sum(pesos))
+        escalados = [p * n / total for p in pesos]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        pequenos = [i for i, p in enumerate(escalados) if p < 1.0]
+        grandes = [i for i, p in enumerate(escalados) if p >= 1.0]
+        while pequenos and grandes:
+            menor, maior = pequenos.pop(), grandes.pop()
+            self.prob[menor] = escalados[menor]
+            self.alias[menor] = maior
+            escalados[maior] += escalados[menor] - 1.0
+            (pequenos if escalados[maior] < 1.0 else grandes).append(maior)
+        self._prob = np.array(self.prob)
+        self._alias = np.array(self.alias)
+    
+    def sortear(self, u_coluna: float, u_aceite: float) -> int:
+        """Draw an index from two uniforms in [0, 1)."""
+        i = int(u_coluna * len(self.prob))
+        return i if u_aceite < self.prob[i] else self.alias[i]
+    
+    def sortear_lote(self, u_coluna: np.ndarray, u_aceite: np.ndarray) -> np.ndarray:
+        i = (u_coluna * len(self.prob)).astype(np.intp)
+        return np.where(u_aceite < self._prob[i], i, self._alias[i])
+
+class RegistroEventos:
+    """Random events, built once, with an alias table over their weights."""
+    
+    def __init__(self, tipos: Sequence[TipoEvento]):
+        self.tipos = tuple(tipos)
+        self.usa_recurso = tuple(t.usa_recurso for t in self.tipos)
+        self.amostrador = AmostradorAlias([t.peso for t in self.tipos])
+
+EVENTOS = RegistroEventos([
+    # Bônus
+    TipoEvento('bonus', '📈 Boom de Mercado!', 'O preço de {recurso} subiu 60%!',
+               (EfeitoPreco(1.6),)),
+    TipoEvento('bonus', '🎁 Doação Recebida', 'Você recebeu R$ 2.000 de um investidor!',
+               (EfeitoCapital(2000),)),
+    TipoEvento('bonus', '⚡ Eficiência Energética', 'Sua produção de energia vai dobrar no próximo turno!',
+               (EfeitoProducao('energia', 2.0, 1),)),
+    
+    # Penalidades
+    TipoEvento('penalty', '📉 Crise no Setor', 'O preço de {recurso} caiu 40%!',
+               (EfeitoPreco(0.6, minimo=0.5),)),
+    TipoEvento('penalty', '🔧 Manutenção Extra', 'Reparos emergenciais custaram R$ 1.000!',
+               (EfeitoCapital(-1000),)),
+    TipoEvento('penalty', '🌧️ Clima Adverso', 'A produção de café cairá pela metade nos próximos 3 turnos!',
+               (EfeitoProducao('cafe', 0.5, 3),)),
+    
+    # Neutros
+    TipoEvento('neutral', '📊 Mercado Estável', 'Não houve grandes mudanças hoje.'),
+    TipoEvento('neutral', '🔄 Flutuação Normal', 'Os mercados operaram normalmente.'),
+])
@@ -0,0 +1,56 @@
+"""Supply chains: the input-output solve that throttles production short of inputs."""
+
+import numpy as np
+
+ITERACOES_INSUMOS = 32
+TOLERANCIA_INSUMOS = 1e-9
+
+def resolver_insumos(potencial: np.ndarray, estoque: np.ndarray, insumos: np.ndarray,
+                     saida_recurso: np.ndarray):
+    """Solve one turn of a Leontief input-output system with rationing.
+    
+    ``potencial`` is each model's output at full capacity (``..., models``),
+    ``estoque`` the stock at the start of the turn (``..., resources``),
+    ``insumos`` the units of each resource consumed per unit of each model's
+    output (``resources x models``) and ``saida_recurso`` maps model output
+    to resources (``models x resources``). Leading axes are independent
+    companies, so many are solved in one pass.
+    
+    Inputs come from stock plus what is produced this turn. A resource short
+    of demand is rationed proportionally among its consumers and each model
+    then runs at the rate of its scarcest input; the pass repeats until no
+    input is short, which takes one round per supply-chain level. Returns
+    (production, consumption) per resource and each model's utilisation.
+    """
+    forma = np.shape(potencial)[:-1]
+    potencial = np.reshape(potencial, (-1, insumos.shape[1]))
+    estoque = np.reshape(estoque, (-1, insumos.shape[0]))
+    entradas = [(m, np.flatnonzero(coluna)) for m, coluna in enumerate((insumos > 0).T) if coluna.any()]
+    utilizacao = np.ones(potencial.shape)
+    # After the first round only the companies still short are solved again
+    linhas = np.arange(len(potencial))
+    pot, est, uso = potencial, estoque, utilizacao
+    for _ in range(ITERACOES_INSUMOS):
+        saida = pot * uso
+        demanda = saida @ insumos.T
+        oferta = est + saida @ saida_recurso
+        falta = demanda > oferta * (1 + TOLERANCIA_INSUMOS) + TOLERANCIA_INSUMOS
+        if not falta.any():
+            break
+        curtas = falta.any(axis=1)
+        linhas, falta, demanda, oferta = linhas[curtas], falta[curtas], demanda[curtas], oferta[curtas]
+        racao = np.where(falta, oferta / np.where(falta, demanda, 1.0), 1.0)
+        for m, recursos in entradas:
+            utilizacao[linhas, m] *= racao[:, recursos].min(axis=1)
+        pot, est, uso = potencial[linhas], estoque[linhas], utilizacao[linhas]
+    saida = potencial * utilizacao
+    n_recursos, n_modelos = insumos.shape
+    return ((saida @ saida_recurso).reshape(forma + (n_recursos,)),
+            (saida @ insumos.T).reshape(forma + (n_recursos,)), utilizacao.reshape(forma + (n_modelos,)))
+
+def _liquidar_insumos(producao: np.ndarray, consumo: np.ndarray, estoque: np.ndarray) -> np.ndarray:
+    """Whole-unit net change per resource: output rounds down, inputs round up, never past the stock."""
+    producao = (producao + TOLERANCIA_INSUMOS).astype(np.int64)  # never negative, so this floors
+    consumo = np.ceil(consumo - TOLERANCIA_INSUMOS).astype(np.int64)
+    np.minimum(consumo, estoque + producao, out=consumo)
+    return producao - consumo
@@ -0,0 +1,274 @@
+"""Shared market: prices many companies trade against, cleared once a turn."""
+
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+from .modelos import HistoricoPrecos, Ordem, PROFUNDIDADE_HISTORICO, Recurso
+from .insumos import _liquidar_insumos, resolver_insumos
+from .diario import OP_LIGADO
+from .empresa import Empresa
+
+IMPACTO_PRECO = 0.25             # log-price move when all of a turn's volume is on one side
+PROFUNDIDADE_MERCADO = 100000.0  # value of outside liquidity per resource that damps thin markets
+PESO_REFERENCIA = 0.1            # EMA weight of the reference price AI competitors trade against
+FRACAO_VENDA_IA = 0.5            # share of its stock an AI competitor sells at the reference price
+CAPITAL_CONCORRENTE = 100000.0
+
+def _somar_colunas(matriz: np.ndarray) -> np.ndarray:
+    # Several times faster than .sum(axis=0) on a tall, narrow integer matrix
+    return np.einsum('ij->j', matriz)
+
+@dataclass
+class ResultadoLiquidacao:
+    """Outcome of one market clearing, per resource unless noted."""
+    precos_execucao: np.ndarray  # price every order filled at
+    desequilibrio: np.ndarray    # net units demanded (bought minus sold)
+    volume: np.ndarray           # units traded, all participants
+    preenchido: np.ndarray       # signed units filled, registered company x resource
+    segundos: float
+
+class Mercado:
+    """Prices and volatility shared by many competing companies.
+    
+    Registered ``Empresa`` instances queue orders with ``enviar_ordens`` and
+    can still trade at once at the posted price with the spot methods. AI
+    competitors are rows of plain arrays, so a turn costs a few array
+    operations over companies x resources however many there are.
+    
+    Once a turn ``liquidar`` nets every queued order, spot trade and AI
+    order per resource and moves its log-price by ``impacto`` times the
+    imbalance over the volume plus the market depth. All orders fill at that
+    price (sales up to the stock held, purchases scaled down to what each
+    company can pay), then the usual random walk sets the next posted price.
+    A registered company's journal records every clearing's fills and posted
+    prices, so it replays without the market; the planner still sees the
+    company on its own.
+    """
+    
+    def __init__(self, semente: Union[int, np.random.SeedSequence, None] = None,
+                 impacto: float = IMPACTO_PRECO, profundidade: float = PROFUNDIDADE_MERCADO,
+                 profundidade_historico: int = PROFUNDIDADE_HISTORICO):
+        # A blank company supplies the resource list and the per-model tables
+        self._modelo = Empresa(profundidade_historico, compacta=True)
+        self.chaves = list(self._modelo._ordem_recursos)
+        recursos = [self._modelo.recursos[k] for k in self.chaves]
+        n_recursos = len(recursos)
+        self.precos = np.array([r.preco for r in recursos])
+        self.volatilidade = np.array([r.volatilidade for r in recursos])
+        self.historicos = [HistoricoPrecos(profundidade_historico, (r.preco,)) for r in recursos]
+        self.referencia = self.precos.copy()
+        self.impacto = impacto
+        self.profundidade = profundidade
+        self.rng = np.random.default_rng(semente)
+        self.turno = 1
+        self.ultima_liquidacao: Optional[ResultadoLiquidacao] = None
+        
+        self.empresas: List[Empresa] = []
+        self.ordens = np.zeros((0, n_recursos), dtype=np.int64)  # queued, signed, one row per company
+        self.fluxo = np.zeros(n_recursos)    # net units bought by spot trades this turn
+        self.choques = np.ones(n_recursos)   # price event factors waiting for the next clearing
+        
+        self.ia_capital = np.zeros(0)
+        self.ia_estoque = np.zeros((0, n_recursos), dtype=np.int64)
+        self.ia_potencial = np.zeros((0, len(self._modelo._ordem_modelos)))  # output per model at full capacity
+        # Inputs one turn at full capacity takes, and the net output it leaves
+        self.ia_consumo_pleno = np.zeros((0, n_recursos))
+        self.ia_liquido_pleno = np.zeros((0, n_recursos), dtype=np.int64)
+        self.ia_manutencao = np.zeros(0)
+        self.ia_agressividade = np.zeros(0)
+    
+    def __len__(self):
+        return len(self.empresas) + len(self.ia_capital)
+    
+    def registrar(self, empresa: Empresa):
+        """Attach ``empresa``: from now on its prices are this market's."""
+        if empresa.mercado is not None:
+            raise ValueError("Empresa já ligada a um mercado")
+        if empresa._ordem_recursos != self.chaves:
+            raise ValueError("Recursos da empresa não batem com os do mercado")
+        empresa.mercado = self
+        self.empresas.append(empresa)
+        self.ordens = np.vstack([self.ordens, np.zeros((1, len(self.chaves)), dtype=np.int64)])
+        self.publicar(empresa)
+        empresa._registrar(OP_LIGADO, True)
+    
+    def desligar(self, empresa: Empresa):
+        """Detach ``empresa``, dropping its queued orders; it keeps the last posted prices."""
+        linha = self._linha(empresa)
+        del self.empresas[linha]
+        self.ordens = np.delete(self.ordens, linha, axis=0)
+        empresa.mercado = None
+        empresa._registrar(OP_LIGADO, False)
+    
+    def _linha(self, empresa: Empresa) -> int:
+        for i, e in enumerate(self.empresas):
+            if e is empresa:
+                return i
+        raise ValueError("Empresa não registrada neste mercado")
+    
+    def publicar(self, empresa: Empresa):
+        """Copy the posted prices into ``empresa``'s resources."""
+        for r, preco in zip(empresa.recursos.values(), self.precos.tolist()):
+            r.preco = preco
+    
+    def adicionar_concorrentes(self, n: int, construcoes: int = 10,
+                               capital: float = CAPITAL_CONCORRENTE) -> range:
+        """Add ``n`` AI competitors, each with ``construcoes`` level-1 producers.
+        
+        Buildings are spread at random over the producing models and run the
+        same supply chains as a company's. Returns the new competitors' row
+        indices.
+        """
+        if n < 0 or construcoes < 0:
+            raise ValueError("Quantidade inválida")
+        m = self._modelo
+        produtivos = m._recurso_modelo >= 0
+        pesos = produtivos / produtivos.sum()
+        contagem = self.rng.multinomial(construcoes, pesos, size=n)
+        
+        inicio = len(self.ia_capital)
+        self.ia_capital = np.concatenate([self.ia_capital, np.full(n, float(capital))])
+        self.ia_estoque = np.vstack([self.ia_estoque, np.zeros((n, len(self.chaves)), dtype=np.int64)])
+        potencial = contagem * m._tab_producao[:, 1].astype(np.float64)
+        producao, consumo = potencial @ m._saida_recurso, potencial @ m._tab_insumos.T
+        self.ia_potencial = np.vstack([self.ia_potencial, potencial])
+        self.ia_consumo_pleno = np.vstack([self.ia_consumo_pleno, consumo])
+        self.ia_liquido_pleno = np.vstack([self.ia_liquido_pleno, _liquidar_insumos(
+            producao, consumo, np.ceil(consumo).astype(np.int64))])
+        self.ia_manutencao = np.concatenate([self.ia_manutencao, contagem @ m._tab_manutencao[:, 1]])
+        self.ia_agressividade = np.concatenate([self.ia_agressividade, self.rng.uniform(0.5, 2.0, n)])
+        return range(inicio, inicio + n)
+    
+    def enviar_ordens(self, empresa: Empresa, ordens: Sequence[Ordem]):
+        """Queue ``ordens`` for ``empresa`` until the next clearing."""
+        linha = self._linha(empresa)
+        if not ordens:
+            return
+        idx, quantidades, venda = empresa._vetorizar_ordens(ordens)
+        sinal = np.where(venda, -quantidades, quantidades)
+        self.ordens[linha] += np.bincount(idx, weights=sinal, minlength=len(self.chaves)).astype(np.int64)
+    
+    def choque(self, empresa: Empresa, recurso: Recurso, fator: float):
+        """Multiply ``recurso``'s market price by ``fator`` at the next clearing."""
+        for i, r in enumerate(empresa.recursos.values()):
+            if r is recurso:
+                self.choques[i] *= fator
+                return
+    
+    def _ordens_concorrentes(self) -> np.ndarray:
+        """Signed orders of every AI competitor, companies x resources.
+        
+        Each sells more of its stock the further the price is above the
+        reference and spends part of its capital on what is below it.
+        """
+        sinal = self.precos / self.referencia - 1.0
+        fracao = np.multiply.outer(self.ia_agressividade, sinal)
+        vendas = np.clip(fracao + FRACAO_VENDA_IA, 0.0, 1.0)
+        vendas *= self.ia_estoque
+        # Reuse the buffer for the purchases: budget share over price
+        np.negative(fracao, out=fracao)
+        np.clip(fracao, 0.0, 1.0, out=fracao)
+        fracao *= (np.maximum(self.ia_capital, 0.0) / len(self.chaves))[:, None]
+        fracao /= self.precos
+        return fracao.astype(np.int64) - vendas.astype(np.int64)
+    
+    @staticmethod
+    def _executar(compras: np.ndarray, vendas: np.ndarray, capital: np.ndarray, precos: np.ndarray):
+        """Scale each company's purchases down to what its capital plus sales can pay."""
+        receita = vendas @ precos
+        custo = compras @ precos
+        caixa = np.maximum(capital + receita, 0.0)
+        # Only the rows that overspend are scaled; the rest keep their cost
+        apertados = np.flatnonzero(custo > caixa)
+        if len(apertados):
+            compras = compras.copy()
+            fator = caixa[apertados] / custo[apertados]
+            compras[apertados] = np.floor(compras[apertados] * fator[:, None])
+            custo = compras @ precos
+        return compras, custo, receita
+    
+    def liquidar(self) -> ResultadoLiquidacao:
+        """Clear one turn of orders and post the next prices."""
+        inicio = time.perf_counter()
+        n_recursos = len(self.chaves)
+        
+        # AI competitors produce, pay upkeep and decide. One whose stock covers
+        # a full turn of inputs can't be short, so only the rest are solved
+        liquido = self.ia_liquido_pleno
+        curtos = np.flatnonzero((self.ia_estoque < self.ia_consumo_pleno).any(axis=1))
+        if len(curtos):
+            liquido = liquido.copy()
+            estoque = self.ia_estoque[curtos]
+            producao, consumo, _ = resolver_insumos(self.ia_potencial[curtos], estoque,
+                                                    self._modelo._tab_insumos, self._modelo._saida_recurso)
+            liquido[curtos] = _liquidar_insumos(producao, consumo, estoque)
+        self.ia_estoque += liquido
+        self.ia_capital -= self.ia_manutencao
+        ordens_ia = self._ordens_concorrentes()
+        
+        # Registered companies can't sell more than they hold
+        estoque = np.array([[r.quantidade for r in e.recursos.values()] for e in self.empresas],
+                           dtype=np.int64).reshape(-1, n_recursos)
+        capital = np.array([e.capital for e in self.empresas])
+        ordens = np.maximum(self.ordens, -estoque)
+        
+        compras_ia, vendas_ia = np.maximum(ordens_ia, 0), np.maximum(-ordens_ia, 0)
+        compras, vendas = np.maximum(ordens, 0), np.maximum(-ordens, 0)
+        demanda = _somar_colunas(compras_ia) + compras.sum(axis=0)
+        oferta = _somar_colunas(vendas_ia) + vendas.sum(axis=0)
+        desequilibrio = demanda - oferta + self.fluxo
+        volume = demanda + oferta + np.abs(self.fluxo)
+        precos = self.precos * self.choques
+        precos = precos * np.exp(self.impacto * desequilibrio / (volume + self.profundidade / precos))
+        
+        compras_ia, custo_ia, receita_ia = self._executar(compras_ia, vendas_ia, self.ia_capital, precos)
+        self.ia_estoque += compras_ia - vendas_ia
+        self.ia_capital += receita_ia - custo_ia
+        compras, custo, receita = self._executar(compras, vendas, capital, precos)
+        preenchido = compras - vendas
+        execucoes = list(zip(self.empresas, preenchido, custo.tolist(), receita.tolist(),
+                             vendas.sum(axis=1).tolist()))
+        for empresa, delta, c, r, v in execucoes:
+            empresa._aplicar_execucao(delta, c, r, v)
+        
+        variacoes = self.rng.uniform(-1.0, 1.0, n_recursos)
+        self.precos = np.maximum(0.1, np.round(precos * (1 + variacoes * self.volatilidade), 2))
+        self.referencia += PESO_REFERENCIA * (self.precos - self.referencia)
+        for historico, preco in zip(self.historicos, self.precos.tolist()):
+            historico.append(preco)
+        for empresa, delta, c, r, v in execucoes:
+            self.publicar(empresa)
+            for recurso in empresa.recursos.values():
+                recurso.preco_historico.append(recurso.preco)
+            if empresa.diario is not None:
+                empresa.diario.registrar_mercado(delta, c, r, v, self.precos)
+        
+        negociado = _somar_colunas(compras_ia) + compras.sum(axis=0) + oferta + np.abs(self.fluxo)
+        self.ordens[:] = 0
+        self.fluxo[:] = 0.0
+        self.choques[:] = 1.0
+        self.turno += 1
+        self.ultima_liquidacao = ResultadoLiquidacao(precos, desequilibrio, negociado, preenchido,
+                                                     time.perf_counter() - inicio)
+        return self.ultima_liquidacao
+    
+    def avancar_turno(self) -> list:
+        """Advance every registered company one turn, then clear the market.
+        
+        Returns each company's (events, achievements), in registration order.
+        """
+        resultados = [e.avancar_turno() for e in self.empresas]
+        self.liquidar()
+        return resultados
+    
+    def avancar_turnos(self, n: int) -> list:
+        """``avancar_turno`` ``n`` times; events and achievements are gathered per company."""
+        resultados = [([], []) for _ in self.empresas]
+        for _ in range(n):
+            for (eventos, conquistas), (ev, cq) in zip(resultados, self.avancar_turno()):
+                eventos.extend(ev)
+                conquistas.extend(cq)
+        return resultados
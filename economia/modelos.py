@@ -0,0 +1,352 @@
+"""Game data models: resources, buildings, snapshots and the columnar building store."""
+
+import os
+import base64
+import itertools
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from collections.abc import Sequence as SequenceABC
+
+import numpy as np
+
+PROFUNDIDADE_HISTORICO = 1000
+VERSAO_SAVE_BINARIO = 1
+
+_carimbos = [None, None]  # [pid, itertools.count]
+_trava_carimbos = threading.Lock()
+
+def _novo_carimbo() -> int:
+    """Return a stamp never handed out before in this process.
+    
+    Snapshots use stamps as content versions: two equal stamps mean equal
+    data. The pid lives in the high bits so forked workers never reuse one,
+    and ``next()`` on a count is atomic, so threads never share one either.
+    """
+    pid = os.getpid()
+    if _carimbos[0] != pid:
+        with _trava_carimbos:
+            if _carimbos[0] != pid:
+                _carimbos[1] = itertools.count((pid << 40) + 1)
+                _carimbos[0] = pid
+    return next(_carimbos[1])
+
+class HistoricoPrecos:
+    """Fixed-capacity price history backed by a mirrored NumPy ring buffer.
+    
+    Every price is written twice, at slot ``i`` and ``i + capacidade``, so
+    the most recent ``k`` points are always one contiguous slice and
+    :meth:`ultimos` can hand out a view instead of a copy. Appending is O(1);
+    once full, the oldest point is overwritten.
+    """
+    
+    def __init__(self, capacidade: int = PROFUNDIDADE_HISTORICO, valores=()):
+        self.capacidade = capacidade
+        self._buffer = np.zeros(2 * capacidade, dtype=np.float64)
+        self._fim = 0
+        self._tamanho = 0
+        self.versao = _novo_carimbo()
+        self.extend(valores)
+    
+    def __len__(self):
+        return self._tamanho
+    
+    def __getitem__(self, i):
+        return self.ultimos()[i]
+    
+    def __iter__(self):
+        return iter(self.ultimos())
+    
+    def append(self, preco: float):
+        i = self._fim
+        self._buffer[i] = self._buffer[i + self.capacidade] = preco
+        self._fim = (i + 1) % self.capacidade
+        self._tamanho = min(self._tamanho + 1, self.capacidade)
+        self.versao = _novo_carimbo()
+    
+    def extend(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)[-self.capacidade:]
+        if not len(valores):
+            return
+        idx = (self._fim + np.arange(len(valores))) % self.capacidade
+        self._buffer[idx] = valores
+        self._buffer[idx + self.capacidade] = valores
+        self._fim = (self._fim + len(valores)) % self.capacidade
+        self._tamanho = min(self._tamanho + len(valores), self.capacidade)
+        self.versao = _novo_carimbo()
+    
+    def ultimos(self, k: Optional[int] = None) -> np.ndarray:
+        """Read-only view of the last ``k`` points (all of them by default), oldest first."""
+        k = self._tamanho if k is None else min(k, self._tamanho)
+        fim = self._fim + self.capacidade
+        visao = self._buffer[fim - k:fim]
+        visao.flags.writeable = False
+        return visao
+    
+    def para_dict(self) -> dict:
+        """JSON-friendly form: the points as base64-encoded little-endian float64."""
+        dados = self.ultimos().astype('<f8', copy=False).tobytes()
+        return {'capacidade': self.capacidade, 'dados': base64.b64encode(dados).decode('ascii')}
+    
+    @classmethod
+    def de_dict(cls, data, capacidade: int = PROFUNDIDADE_HISTORICO) -> 'HistoricoPrecos':
+        # Older saves stored the history as a plain list of prices
+        if isinstance(data, list):
+            return cls(capacidade, data)
+        valores = np.frombuffer(base64.b64decode(data['dados']), dtype='<f8')
+        return cls(max(capacidade, data.get('capacidade', 0)), valores)
+
+@dataclass
+class Recurso:
+    nome: str
+    quantidade: int
+    preco: float
+    volatilidade: float
+    simbolo: str
+    cor: tuple = (1.0, 1.0, 1.0)
+    preco_historico: HistoricoPrecos = field(default_factory=HistoricoPrecos)
+    
+    def __post_init__(self):
+        if not isinstance(self.preco_historico, HistoricoPrecos):
+            self.preco_historico = HistoricoPrecos(valores=self.preco_historico)
+        if not len(self.preco_historico):
+            self.preco_historico.append(self.preco)
+
+@dataclass
+class ConstrucaoModelo:
+    id: str
+    nome: str
+    custo: float
+    producao_recurso: Optional[str]
+    taxa_producao: int
+    manutencao: float
+    simbolo: str
+    pesquisa: int = 0
+    nivel_max: int = 5
+    descricao: str = ""
+    cor_principal: tuple = (0.5, 0.5, 0.5)
+    insumos: Dict[str, float] = field(default_factory=dict)  # units consumed per unit produced
+
+@dataclass 
+class Construcao:
+    modelo: ConstrucaoModelo
+    nivel: int = 1
+    built_at: int = 0
+    
+    @property
+    def manutencao_atual(self):
+        return self.modelo.manutencao * (1 + (self.nivel - 1) * 0.3)
+    
+    @property
+    def producao_atual(self):
+        return int(self.modelo.taxa_producao * (1 + (self.nivel - 1) * 0.5))
+    
+    @property
+    def custo_upgrade(self):
+        return int(self.modelo.custo * 0.5 * self.nivel)
+
+@dataclass
+class Evento:
+    titulo: str
+    descricao: str
+    tipo: str  # 'bonus', 'penalty', 'neutral', 'special'
+    icone: str
+
+@dataclass(frozen=True)
+class Ordem:
+    """A buy ('comprar') or sell ('vender') order for ``Empresa.executar_ordens``."""
+    tipo: str
+    recurso: str
+    quantidade: int
+
+@dataclass
+class Conquista:
+    id: str
+    nome: str
+    descricao: str
+    icone: str
+    condicao: str
+    desbloqueada: bool = False
+    turno_desbloqueio: int = 0
+
+LINHAS_POR_PAGINA = 1024
+
+@dataclass(frozen=True)
+class FotoConstrucoes:
+    """Snapshot of an ``EstadoConstrucoes``, one frozen copy per page of rows."""
+    tamanho: int
+    versoes: np.ndarray
+    paginas: tuple  # per page: (modelo_idx, nivel, built_at)
+
+class EstadoConstrucoes:
+    """Struct-of-arrays mirror of ``Empresa.construcoes`` used by the turn engine.
+
+    Each building is one row in three parallel NumPy arrays (model index,
+    level and the turn it was built), kept in the same order as the list,
+    so a turn can be computed with ``np.bincount`` and masked reductions
+    instead of a Python loop over ``Construcao`` objects.
+    
+    Rows are grouped in pages of ``LINHAS_POR_PAGINA``; every write stamps
+    the pages it touches, so snapshots only copy (and restores only write
+    back) the pages that changed.
+    """
+
+    def __init__(self, capacidade: int = 64):
+        self.tamanho = 0
+        self.modelo_idx = np.zeros(capacidade, dtype=np.uint8)
+        self.nivel = np.zeros(capacidade, dtype=np.uint8)
+        self.built_at = np.zeros(capacidade, dtype=np.int32)
+        self.versao_pagina = np.zeros(-(-capacidade // LINHAS_POR_PAGINA), dtype=np.int64)
+
+    def __len__(self):
+        return self.tamanho
+
+    def _garantir_capacidade(self, n: int):
+        if n <= len(self.modelo_idx):
+            return
+        nova = max(n, 2 * len(self.modelo_idx))
+        for nome in ('modelo_idx', 'nivel', 'built_at'):
+            antigo = getattr(self, nome)
+            novo = np.zeros(nova, dtype=antigo.dtype)
+            novo[:self.tamanho] = antigo[:self.tamanho]
+            setattr(self, nome, novo)
+        versoes = np.zeros(-(-nova // LINHAS_POR_PAGINA), dtype=np.int64)
+        versoes[:len(self.versao_pagina)] = self.versao_pagina
+        self.versao_pagina = versoes
+
+    def _marcar(self, i: int, j: int):
+        """Stamp the pages holding rows ``i:j`` as changed."""
+        if j > i:
+            self.versao_pagina[i // LINHAS_POR_PAGINA:(j - 1) // LINHAS_POR_PAGINA + 1] = _novo_carimbo()
+
+    def adicionar(self, modelo_idx: int, nivel: int, built_at: int, quantidade: int = 1):
+        self._garantir_capacidade(self.tamanho + quantidade)
+        i, j = self.tamanho, self.tamanho + quantidade
+        self.modelo_idx[i:j] = modelo_idx
+        self.nivel[i:j] = nivel
+        self.built_at[i:j] = built_at
+        self.tamanho = j
+        self._marcar(i, j)
+
+    def definir_nivel(self, index: int, nivel: int):
+        self.nivel[index] = nivel
+        self._marcar(index, index + 1)
+
+    def remover(self, index: int):
+        # Shift the tail down one slot so rows keep the list order
+        n = self.tamanho
+        for arr in (self.modelo_idx, self.nivel, self.built_at):
+            arr[index:n - 1] = arr[index + 1:n]
+        self.tamanho -= 1
+        self._marcar(index, n)
+
+    def limpar(self):
+        self._marcar(0, self.tamanho)
+        self.tamanho = 0
+
+    def carregar(self, modelo_idx: np.ndarray, nivel: np.ndarray, built_at: np.ndarray):
+        """Replace every row with the given arrays."""
+        self.limpar()
+        n = len(modelo_idx)
+        self._garantir_capacidade(n)
+        self.modelo_idx[:n] = modelo_idx
+        self.nivel[:n] = nivel
+        self.built_at[:n] = built_at
+        self.tamanho = n
+        self._marcar(0, n)
+
+    def capturar(self, base: Optional[FotoConstrucoes] = None) -> FotoConstrucoes:
+        """Snapshot the occupied rows, sharing unchanged pages with ``base``."""
+        n_paginas = -(-self.tamanho // LINHAS_POR_PAGINA)
+        versoes = self.versao_pagina[:n_paginas].copy()
+        paginas = []
+        for p, versao in enumerate(versoes.tolist()):
+            if base is not None and p < len(base.versoes) and base.versoes[p] == versao:
+                paginas.append(base.paginas[p])
+                continue
+            i, j = p * LINHAS_POR_PAGINA, min((p + 1) * LINHAS_POR_PAGINA, self.tamanho)
+            paginas.append((self.modelo_idx[i:j].copy(), self.nivel[i:j].copy(), self.built_at[i:j].copy()))
+        return FotoConstrucoes(self.tamanho, versoes, tuple(paginas))
+
+    def restaurar(self, foto: FotoConstrucoes) -> np.ndarray:
+        """Bring the rows back to ``foto``, writing only pages whose stamp differs.
+        
+        Returns the indices of the pages that were written.
+        """
+        self._garantir_capacidade(foto.tamanho)
+        n_paginas = len(foto.versoes)
+        sujas = np.flatnonzero(self.versao_pagina[:n_paginas] != foto.versoes)
+        for p in sujas.tolist():
+            i = p * LINHAS_POR_PAGINA
+            modelo_idx, nivel, built_at = foto.paginas[p]
+            j = i + len(modelo_idx)
+            self.modelo_idx[i:j] = modelo_idx
+            self.nivel[i:j] = nivel
+            self.built_at[i:j] = built_at
+        self.versao_pagina[:n_paginas] = foto.versoes
+        self.tamanho = foto.tamanho
+        return sujas
+
+    def visao(self):
+        """Return views of the occupied rows as (modelo_idx, nivel, built_at)."""
+        n = self.tamanho
+        return self.modelo_idx[:n], self.nivel[:n], self.built_at[:n]
+
+class VistaConstrucoes(SequenceABC):
+    """Read-only ``Construcao`` sequence over a compact city's arrays.
+    
+    Objects are built on access, so a compact ``Empresa`` never holds one
+    Python object per building.
+    """
+    
+    def __init__(self, empresa: 'Empresa'):
+        self._empresa = empresa
+    
+    def __len__(self):
+        return len(self._empresa._estado)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("Construção inválida")
+        e = self._empresa
+        modelo_id = e._ordem_modelos[e._estado.modelo_idx[index]]
+        return Construcao(modelo=e.modelos_construcao[modelo_id],
+                          nivel=int(e._estado.nivel[index]), built_at=int(e._estado.built_at[index]))
+
+@dataclass
+class AgregadosCidade:
+    """Per-turn totals of the whole city, kept up to date as buildings change."""
+    manutencao: float
+    producao: np.ndarray  # per resource, in ``Empresa._ordem_recursos`` order
+    pesquisa: int
+    soma_niveis_banco: int
+
+@dataclass(frozen=True)
+class FotoEmpresa:
+    """Immutable point-in-time copy of an ``Empresa``, see :meth:`Empresa.capturar`.
+    
+    Per-resource arrays follow ``Empresa._ordem_recursos`` and per-achievement
+    arrays follow ``Empresa.conquistas``. The price histories and buildings
+    are shared with the previous snapshot wherever they did not change.
+    """
+    capital: float
+    turno: int
+    pontos_pesquisa: int
+    quantidades: np.ndarray
+    precos: np.ndarray
+    historicos: tuple  # per resource: (versao, capacidade, points)
+    construcoes: FotoConstrucoes
+    contagem: np.ndarray
+    agregados: AgregadosCidade
+    desbloqueadas: np.ndarray
+    turnos_desbloqueio: np.ndarray
+    estatisticas: tuple
+    modificadores: tuple
+    eventos_log: tuple
+    semente: np.random.SeedSequence
+    estados_rng: tuple
@@ -0,0 +1,231 @@
+"""What-if planner: every legal action scored against the same sampled futures."""
+
+import math
+import time
+from concurrent import futures
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+from .modelos import FotoEmpresa
+from .eventos import EVENTOS
+from .empresa import Empresa
+
+# Share of the capital a single planner "buy" move spends
+FRACAO_LOTE_COMPRA = 0.1
+
+@dataclass(frozen=True)
+class Acao:
+    """One move the planner can score.
+    
+    ``tipo`` is 'esperar', 'construir', 'upgrade', 'demolir', 'comprar',
+    'vender' or 'turno' (end the turn).
+    """
+    tipo: str
+    alvo: Union[str, int, None] = None  # model id, building index or resource key
+    descricao: str = ""
+    quantidade: int = 0  # only for 'comprar'
+    
+    def aplicar(self, empresa: Empresa):
+        if self.tipo == 'construir':
+            empresa.construir(self.alvo)
+        elif self.tipo == 'upgrade':
+            empresa.upgrade_construcao(self.alvo)
+        elif self.tipo == 'demolir':
+            empresa.demolir_construcao(self.alvo)
+        elif self.tipo == 'comprar':
+            empresa.comprar_recurso(self.alvo, self.quantidade)
+        elif self.tipo == 'vender':
+            empresa.vender_recurso(self.alvo, empresa.recursos[self.alvo].quantidade)
+        elif self.tipo == 'turno':
+            empresa.avancar_turno()
+        elif self.tipo != 'esperar':
+            raise ValueError(f"Ação desconhecida: {self.tipo}")
+
+def acoes_legais(empresa: Empresa, todas: bool = False) -> List[Acao]:
+    """Every affordable move from the current state, doing nothing first.
+    
+    Buildings of the same model and level behave identically, so only the
+    first one of each (model, level) group is offered. ``todas`` adds
+    demolitions and buying a lot of each resource.
+    """
+    acoes = [Acao('esperar', None, "⏸️ Esperar")]
+    for mid, m in empresa.modelos_construcao.items():
+        if m.custo <= empresa.capital:
+            acoes.append(Acao('construir', mid, f"{m.simbolo} Construir {m.nome}"))
+    
+    modelo_idx, nivel, _ = empresa._estado.visao()
+    grupos = modelo_idx.astype(np.int64) * 256 + nivel
+    _, primeiros = np.unique(grupos, return_index=True)
+    for i in sorted(primeiros.tolist()):
+        c = empresa.construcoes[i]
+        if c.nivel < c.modelo.nivel_max and c.custo_upgrade <= empresa.capital:
+            acoes.append(Acao('upgrade', i, f"⬆️ {c.modelo.nome} nível {c.nivel} → {c.nivel + 1}"))
+        if todas:
+            acoes.append(Acao('demolir', i, f"💥 Demolir {c.modelo.nome} nível {c.nivel}"))
+    
+    for chave, r in empresa.recursos.items():
+        lote = int(empresa.capital * FRACAO_LOTE_COMPRA // r.preco)
+        if todas and lote > 0:
+            acoes.append(Acao('comprar', chave, f"🛒 Comprar {lote} {r.nome}", lote))
+        if r.quantidade > 0:
+            acoes.append(Acao('vender', chave, f"📤 Vender {r.quantidade} {r.nome}"))
+    return acoes
+
+@dataclass
+class AvaliacaoAcao:
+    acao: Acao
+    patrimonio_medio: float  # capital plus stock valued at the final prices
+    capital_medio: float
+    desvio: float  # standard deviation of the final patrimônio across seeds
+    p5: float
+    prob_ruina: float  # chance of going below zero capital during the horizon
+
+@dataclass
+class ResultadoPlanejamento:
+    avaliacoes: List[AvaliacaoAcao]  # best expected patrimônio first
+    horizonte: int
+    sementes: int
+    segundos: float
+    workers: int
+
+def _amostrar_mercado(empresa: Empresa, turnos: int):
+    """Draw one market future from the company's streams.
+    
+    Consumes the streams exactly like ``avancar_turnos`` and applies events
+    through their real effects. Returns the prices at the end of every turn
+    (turnos x R), the capital each turn's event added (turnos) and the
+    production multiplier in force each turn (turnos x R). None of these
+    depend on the player's buildings, so one future serves every action.
+    Leaves ``empresa`` in a scratch state.
+    """
+    recursos = [empresa.recursos[k] for k in empresa._ordem_recursos]
+    volatilidade = np.array([r.volatilidade for r in recursos])
+    choques = empresa.rng_mercado.uniform(-1.0, 1.0, size=(turnos, len(recursos))) * volatilidade
+    tem_evento = empresa.rng_eventos.random(turnos) < 0.30
+    sorteados = EVENTOS.amostrador.sortear_lote(*empresa.rng_eventos.random((2, turnos)))
+    
+    historico = np.empty((turnos, len(recursos)))
+    capital_eventos = np.zeros(turnos)
+    fatores = np.ones((turnos, len(recursos)))
+    precos = np.array([r.preco for r in recursos])
+    for k in range(turnos):
+        for mod in empresa.modificadores_producao:
+            fatores[k, empresa._ordem_recursos.index(mod.recurso)] *= mod.fator
+        empresa._consumir_modificadores()
+        precos = np.maximum(0.1, np.round(precos * (1 + choques[k]), 2))
+        if tem_evento[k]:
+            for r, preco in zip(recursos, precos.tolist()):
+                r.preco = preco
+            empresa.capital = 0.0
+            empresa._gerar_evento(int(sorteados[k]))
+            capital_eventos[k] = empresa.capital
+            precos = np.array([r.preco for r in recursos])
+        historico[k] = precos
+    return historico, capital_eventos, fatores
+
+def _amostrar_futuros(empresa: Empresa, foto: FotoEmpresa, horizonte: int,
+                      sementes: Sequence[np.random.SeedSequence]):
+    """Market futures of ``foto`` for each seed, stacked as seeds x turns (x R).
+    
+    ``empresa`` is scratch space and ends in an undefined state.
+    """
+    futuros = []
+    for semente in sementes:
+        empresa.restaurar(foto)
+        empresa._init_rngs(semente)
+        futuros.append(_amostrar_mercado(empresa, horizonte))
+    return tuple(np.stack(x) for x in zip(*futuros))
+
+def _pontuar_acoes(empresa: Empresa, foto: FotoEmpresa, acoes: Sequence[Acao], futuros):
+    """Play every action of ``foto`` against pre-drawn market futures.
+    
+    Each action is applied once to a fork of ``foto`` to read its starting
+    capital, stock, maintenance, production and interest factor; the
+    horizon is then played for all actions and seeds at once, with the
+    same input rationing as ``Empresa.avancar_turnos``. Returns
+    (final capital, final patrimônio, went broke), each actions x seeds.
+    """
+    precos, capital_eventos, fatores = futuros
+    n_sementes, horizonte = capital_eventos.shape
+    n_acoes, n_recursos = len(acoes), len(empresa._ordem_recursos)
+    capital0 = np.empty(n_acoes)
+    estoque0 = np.empty((n_acoes, n_recursos), dtype=np.int64)
+    manut = np.empty(n_acoes)
+    producao = np.empty((n_acoes, n_recursos), dtype=np.int64)
+    potencial = np.empty((n_acoes, len(empresa._ordem_modelos)))
+    fator_juros = np.empty(n_acoes)
+    for a, acao in enumerate(acoes):
+        empresa.restaurar(foto)
+        acao.aplicar(empresa)
+        ag = empresa.agregados()
+        capital0[a] = empresa.capital
+        estoque0[a] = [empresa.recursos[k].quantidade for k in empresa._ordem_recursos]
+        manut[a] = ag.manutencao
+        producao[a] = ag.producao
+        potencial[a] = empresa._potencial_modelos()
+        fator_juros[a] = empresa._fator_juros()
+    
+    # Stock moves turn by turn, since supply chains ration on what is in
+    # stock; every action and seed is one row of the same input solve
+    estoque = np.repeat(estoque0[:, None, :], n_sementes, axis=1)
+    for k in range(horizonte):
+        fator = fatores[None, :, k, :]
+        producao_k = np.where(fator != 1.0, np.trunc(producao[:, None, :] * fator), producao[:, None, :])
+        estoque += empresa._producao_insumos(producao_k, potencial[:, None, :], estoque)
+    
+    capital = np.repeat(capital0[:, None], n_sementes, axis=1)
+    ruina = np.zeros(capital.shape, dtype=bool)
+    with np.errstate(over='ignore', invalid='ignore'):
+        for k in range(horizonte):
+            capital = (capital - manut[:, None]) * fator_juros[:, None] + capital_eventos[None, :, k]
+            ruina |= capital < 0
+        patrimonio = capital + (estoque * precos[None, :, -1, :]).sum(axis=2)
+    return capital, patrimonio, ruina
+
+def _avaliar_lote(foto: FotoEmpresa, acoes: Sequence[Acao], horizonte: int,
+                  sementes: Sequence[np.random.SeedSequence]):
+    """Worker: score every action of ``foto`` against the futures of ``sementes``."""
+    empresa = Empresa(compacta=True)
+    return _pontuar_acoes(empresa, foto, acoes, _amostrar_futuros(empresa, foto, horizonte, sementes))
+
+def _amostrar_futuros_lote(foto: FotoEmpresa, horizonte: int, sementes: Sequence[np.random.SeedSequence]):
+    """Worker: market futures of ``foto`` for a chunk of seeds."""
+    return _amostrar_futuros(Empresa(compacta=True), foto, horizonte, sementes)
+
+def planejar_acoes(empresa: Empresa, horizonte: int = 50, sementes: int = 64,
+                   semente: Optional[int] = None, workers: int = 1,
+                   acoes: Optional[Sequence[Acao]] = None) -> ResultadoPlanejamento:
+    """Rank every legal action by its expected patrimônio ``horizonte`` turns ahead.
+    
+    All actions are scored against the same ``sementes`` market futures
+    (common random numbers), so the differences between them are not
+    drowned in noise. With ``workers > 1`` the seeds are split across a
+    process pool. ``empresa`` itself is left untouched.
+    """
+    if horizonte < 1 or sementes < 1:
+        raise ValueError("Horizonte e sementes devem ser positivos")
+    acoes = list(acoes) if acoes is not None else acoes_legais(empresa)
+    foto = empresa.capturar()
+    filhas = np.random.SeedSequence(semente).spawn(sementes)
+    
+    inicio = time.perf_counter()
+    workers = max(1, min(workers, sementes))
+    if workers == 1:
+        capital, patrimonio, ruina = _avaliar_lote(foto, acoes, horizonte, filhas)
+    else:
+        tamanho = math.ceil(sementes / workers)
+        with futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            partes = list(pool.map(_avaliar_lote, *zip(*[
+                (foto, acoes, horizonte, filhas[i:i + tamanho]) for i in range(0, sementes, tamanho)
+            ])))
+        capital, patrimonio, ruina = (np.concatenate(x, axis=1) for x in zip(*partes))
+    
+    avaliacoes = [
+        AvaliacaoAcao(acao, float(pat.mean()), float(cap.mean()), float(pat.std()),
+                      float(np.percentile(pat, 5)), float(rui.mean()))
+        for acao, cap, pat, rui in zip(acoes, capital, patrimonio, ruina)
+    ]
+    avaliacoes.sort(key=lambda a: a.patrimonio_medio, reverse=True)
+    return ResultadoPlanejamento(avaliacoes, horizonte, sementes, time.perf_counter() - inicio, workers)
@@ -2,16 +2,18 @@
 # Enhanced 3D Economic Simulator with Low-Poly Graphics
 # Features: Better visuals, more buildings, price charts, events, achievements, save/load
 # Requires: PySide6, PyOpenGL, numpy
+# The economy itself lives in the headless ``economia`` package next to this file
 
 import sys
 import math
-import random
+import ctypes
 import json
 import os
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+import time
+import argparse
+from typing import List, Optional, Tuple
 from collections import deque
-from datetime import datetime
+from dataclasses import dataclass
 
 from PySide6 import QtCore, QtGui, QtWidgets
 from PySide6.QtGui import QSurfaceFormat, QPainter, QColor, QPen, QBrush, QFont, QLinearGradient, QShortcut, QKeySequence
@@ -19,15 +21,29 @@ from PySide6.QtWidgets import (
     QApplication, QWidget, QHBoxLayout, QVBoxLayout, QLabel, QPushButton,
     QListWidget, QListWidgetItem, QSpinBox, QFormLayout, QComboBox, QMessageBox,
     QProgressBar, QTabWidget, QGroupBox, QGridLayout, QScrollArea, QFrame,
-    QFileDialog, QToolTip, QSplitter
+    QFileDialog, QToolTip, QSplitter, QTableWidget, QTableWidgetItem, QHeaderView
 )
 from PySide6.QtOpenGLWidgets import QOpenGLWidget
 from PySide6.QtCore import Qt, QTimer, Signal
 
+# The offscreen render profile runs without a window system through EGL, and
+# PyOpenGL picks its platform once, on first import
+if '--perfil-render' in sys.argv:
+    os.environ.setdefault('PYOPENGL_PLATFORM', 'egl')
+    os.environ.setdefault('EGL_PLATFORM', 'surfaceless')
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
 from OpenGL.GL import *
+from OpenGL.GL import shaders
 from OpenGL.GLU import *
 import numpy as np
 
+from economia import (
+    DIRETORIO_AUTOSAVE, PERCENTIS_ENSEMBLE, Autosalvamento, Empresa, FotoEmpresa, Mercado, Ordem,
+    ResultadoEnsemble, ResultadoPlanejamento, buscar_estrategia, executar_ensemble, planejar_acoes,
+    reproduzir_diario
+)
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # STYLES - Modern Dark Theme
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -198,364 +214,535 @@ QToolTip {
 """
 
 # ═══════════════════════════════════════════════════════════════════════════════
-# GAME DATA MODELS
+# OPENGL HELPERS
 # ═══════════════════════════════════════════════════════════════════════════════
 
-@dataclass
-class Recurso:
-    nome: str
-    quantidade: int
-    preco: float
-    volatilidade: float
-    simbolo: str
-    cor: tuple = (1.0, 1.0, 1.0)
-    preco_historico: List[float] = field(default_factory=list)
-    
-    def __post_init__(self):
-        if not self.preco_historico:
-            self.preco_historico = [self.preco]
-
-@dataclass
-class ConstrucaoModelo:
-    id: str
-    nome: str
-    custo: float
-    producao_recurso: Optional[str]
-    taxa_producao: int
-    manutencao: float
-    simbolo: str
-    pesquisa: int = 0
-    nivel_max: int = 5
-    descricao: str = ""
-    cor_principal: tuple = (0.5, 0.5, 0.5)
-
-@dataclass 
-class Construcao:
-    modelo: ConstrucaoModelo
-    nivel: int = 1
-    built_at: int = 0
-    
-    @property
-    def manutencao_atual(self):
-        return self.modelo.manutencao * (1 + (self.nivel - 1) * 0.3)
-    
-    @property
-    def producao_atual(self):
-        return int(self.modelo.taxa_producao * (1 + (self.nivel - 1) * 0.5))
-    
-    @property
-    def custo_upgrade(self):
-        return int(self.modelo.custo * 0.5 * self.nivel)
-
-@dataclass
-class Evento:
-    titulo: str
-    descricao: str
-    tipo: str  # 'bonus', 'penalty', 'neutral', 'special'
-    icone: str
-
-@dataclass
-class Conquista:
-    id: str
-    nome: str
-    descricao: str
-    icone: str
-    condicao: str
-    desbloqueada: bool = False
-    turno_desbloqueio: int = 0
+# Interleaved vertex layout of every cached mesh: position xyz, normal xyz, color rgba.
+# Primitives are generated without color (the first 6 floats) and draw with the current
+# glColor; baked building meshes carry their own per-vertex colors.
+MESH_FLOATS = 10
+MESH_STRIDE = MESH_FLOATS * 4
 
-# ═══════════════════════════════════════════════════════════════════════════════
-# EMPRESA (GAME STATE)
-# ═══════════════════════════════════════════════════════════════════════════════
+def _triangulate_quads(quads, normals):
+    """(F, 4, 3) quads with per-vertex (F, 4, 3) normals -> interleaved triangles.
+
+    Each quad is split along its 0-2 diagonal, the same split the driver
+    makes for GL_QUADS, so the rasterized result matches immediate mode.
+    """
+    order = [0, 1, 2, 0, 2, 3]
+    return np.concatenate([quads[:, order], normals[:, order]], axis=2).reshape(-1, 6).astype(np.float32)
+
+def _flat_normals(normals, count):
+    return np.repeat(np.asarray(normals, dtype=np.float64)[:, None, :], count, axis=1)
+
+def box_mesh(w, h, d):
+    hw, hh, hd = w/2.0, h/2.0, d/2.0
+    quads = np.array([
+        [(-hw,-hh, hd), (hw,-hh, hd), (hw,hh, hd), (-hw,hh, hd)],
+        [(-hw,-hh,-hd), (-hw,hh,-hd), (hw,hh,-hd), (hw,-hh,-hd)],
+        [(-hw,-hh,-hd), (-hw,-hh, hd), (-hw,hh, hd), (-hw,hh,-hd)],
+        [(hw,-hh,-hd), (hw,hh,-hd), (hw,hh, hd), (hw,-hh, hd)],
+        [(-hw,hh,-hd), (-hw,hh, hd), (hw,hh, hd), (hw,hh,-hd)],
+        [(-hw,-hh,-hd), (hw,-hh,-hd), (hw,-hh, hd), (-hw,-hh, hd)],
+    ])
+    normals = [(0,0,1), (0,0,-1), (-1,0,0), (1,0,0), (0,1,0), (0,-1,0)]
+    return _triangulate_quads(quads, _flat_normals(normals, 4))
+
+def prism_triangle_mesh(base, height, depth):
+    hb, hh, hd = base/2, height/2, depth/2
+    triangles = np.array([
+        [(-hb,-hh, hd), (hb,-hh, hd), (0,hh, hd)],
+        [(-hb,-hh,-hd), (0,hh,-hd), (hb,-hh,-hd)],
+    ])
+    quads = np.array([
+        [(-hb,-hh, hd), (-hb,-hh,-hd), (0,hh,-hd), (0,hh, hd)],
+        [(hb,-hh, hd), (0,hh, hd), (0,hh,-hd), (hb,-hh,-hd)],
+        [(-hb,-hh, hd), (hb,-hh, hd), (hb,-hh,-hd), (-hb,-hh,-hd)],
+    ])
+    caps = np.concatenate([triangles, _flat_normals([(0,0,1), (0,0,-1)], 3)], axis=2).reshape(-1, 6)
+    sides = _triangulate_quads(quads, _flat_normals([(-1,0,0), (1,0,0), (0,-1,0)], 4))
+    return np.concatenate([caps.astype(np.float32), sides])
+
+def cylinder_mesh(radius, height, segments=12):
+    angles = 2 * np.pi * np.arange(segments + 1) / segments
+    ring = np.stack([np.cos(angles), np.zeros_like(angles), np.sin(angles)], axis=1)
+    bottom = ring * radius + (0, -height/2, 0)
+    top = ring * radius + (0, height/2, 0)
+    # Side: quad k of the old GL_QUAD_STRIP is (bottom k, top k, top k+1, bottom k+1)
+    quads = np.stack([bottom[:-1], top[:-1], top[1:], bottom[1:]], axis=1)
+    normals = np.stack([ring[:-1], ring[:-1], ring[1:], ring[1:]], axis=1)
+    side = _triangulate_quads(quads, normals)
+
+    def fan(center, rim, normal):
+        # GL_TRIANGLE_FAN (center, r0, r1, ...) as independent triangles
+        tri = np.stack([np.broadcast_to(center, rim[:-1].shape), rim[:-1], rim[1:]], axis=1)
+        return np.concatenate([tri, _flat_normals([normal] * len(tri), 3)], axis=2).reshape(-1, 6)
+
+    top_cap = fan((0, height/2, 0), top, (0, 1, 0))
+    bottom_cap = fan((0, -height/2, 0), bottom[::-1], (0, -1, 0))
+    return np.concatenate([side, top_cap.astype(np.float32), bottom_cap.astype(np.float32)])
+
+class GLCallCounter:
+    """Counts Python -> GL calls by wrapping the gl*/glu* names of a module namespace."""
 
-class Empresa:
     def __init__(self):
-        self.capital: float = 15000.0
-        self.turno: int = 1
-        self.pontos_pesquisa: int = 0
-        self.recursos: Dict[str, Recurso] = {}
-        self.construcoes: List[Construcao] = []
-        self.modelos_construcao: Dict[str, ConstrucaoModelo] = {}
-        self.eventos_log: deque = deque(maxlen=20)
-        self.conquistas: Dict[str, Conquista] = {}
-        self.estatisticas = {
-            'total_ganho': 0.0,
-            'total_gasto': 0.0,
-            'turnos_jogados': 0,
-            'construcoes_feitas': 0,
-            'upgrades_feitos': 0,
-            'recursos_vendidos': 0,
-            'eventos_ocorridos': 0,
-            'max_capital': 15000.0
-        }
-        self._init_recursos()
-        self._init_modelos()
-        self._init_conquistas()
-    
-    def _init_recursos(self):
-        recursos_data = [
-            ('madeira', 'Madeira', 100, 5.00, 0.15, '🌲', (0.4, 0.26, 0.13)),
-            ('metal', 'Metal', 50, 20.00, 0.20, '🔩', (0.6, 0.6, 0.65)),
-            ('cafe', 'Café', 20, 50.00, 0.10, '☕', (0.4, 0.26, 0.13)),
-            ('energia', 'Energia', 200, 2.50, 0.05, '⚡', (1.0, 0.9, 0.2)),
-            ('petroleo', 'Petróleo', 10, 85.00, 0.25, '🛢️', (0.15, 0.15, 0.15)),
-            ('ouro', 'Ouro', 5, 150.00, 0.35, '🪙', (1.0, 0.84, 0.0)),
-        ]
-        for id_, nome, qtd, preco, vol, simb, cor in recursos_data:
-            self.recursos[id_] = Recurso(nome, qtd, preco, vol, simb, cor)
-    
-    def _init_modelos(self):
-        modelos = [
-            ConstrucaoModelo('madeira', 'Serraria', 1500, 'madeira', 50, 30, '🏭',
-                           descricao='Produz madeira de reflorestamento', cor_principal=(0.6, 0.45, 0.3)),
-            ConstrucaoModelo('metal', 'Mineradora', 3000, 'metal', 25, 75, '⛏️',
-                           descricao='Extrai metais preciosos', cor_principal=(0.4, 0.4, 0.45)),
-            ConstrucaoModelo('energia', 'Hidrelétrica', 4000, 'energia', 100, 120, '💡',
-                           descricao='Gera energia limpa', cor_principal=(0.3, 0.5, 0.7)),
-            ConstrucaoModelo('cafe', 'Cafezal', 5000, 'cafe', 10, 100, '🌿',
-                           descricao='Plantação de café premium', cor_principal=(0.2, 0.5, 0.2)),
-            ConstrucaoModelo('petroleo', 'Refinaria', 8000, 'petroleo', 8, 200, '🏗️',
-                           descricao='Refina petróleo bruto', cor_principal=(0.3, 0.3, 0.35)),
-            ConstrucaoModelo('ouro', 'Mina de Ouro', 12000, 'ouro', 3, 350, '💎',
-                           descricao='Extrai ouro e gemas', cor_principal=(0.8, 0.7, 0.2)),
-            ConstrucaoModelo('pesquisa', 'Centro de P&D', 7000, None, 0, 200, '🔬',
-                           pesquisa=10, descricao='Gera pontos de pesquisa', cor_principal=(0.35, 0.4, 0.9)),
-            ConstrucaoModelo('banco', 'Banco', 10000, None, 0, 150, '🏦',
-                           descricao='Gera 2% de juros por turno', cor_principal=(0.5, 0.5, 0.55)),
-        ]
-        self.modelos_construcao = {m.id: m for m in modelos}
-    
-    def _init_conquistas(self):
-        conquistas = [
-            Conquista('primeiro_turno', 'Iniciante', 'Complete o primeiro turno', '🎯', 'turno >= 2'),
-            Conquista('capital_50k', 'Investidor', 'Alcance R$ 50.000', '💰', 'capital >= 50000'),
-            Conquista('capital_100k', 'Magnata', 'Alcance R$ 100.000', '💎', 'capital >= 100000'),
-            Conquista('capital_500k', 'Bilionário', 'Alcance R$ 500.000', '👑', 'capital >= 500000'),
-            Conquista('5_construcoes', 'Construtor', 'Construa 5 edificações', '🏗️', 'construcoes >= 5'),
-            Conquista('10_construcoes', 'Desenvolvedor', 'Construa 10 edificações', '🏙️', 'construcoes >= 10'),
-            Conquista('pesquisa_100', 'Cientista', 'Alcance 100 pontos de pesquisa', '🔬', 'pesquisa >= 100'),
-            Conquista('turno_50', 'Veterano', 'Sobreviva 50 turnos', '⭐', 'turno >= 50'),
-            Conquista('upgrade_max', 'Perfeccionista', 'Faça upgrade de uma construção ao nível máximo', '🏆', 'max_nivel >= 5'),
-            Conquista('diversificado', 'Diversificado', 'Tenha pelo menos 4 tipos de construção', '🌈', 'tipos_construcao >= 4'),
-        ]
-        self.conquistas = {c.id: c for c in conquistas}
-    
-    def verificar_conquistas(self):
-        novas = []
-        
-        stats = {
-            'turno': self.turno,
-            'capital': self.capital,
-            'construcoes': len(self.construcoes),
-            'pesquisa': self.pontos_pesquisa,
-            'max_nivel': max([c.nivel for c in self.construcoes], default=0),
-            'tipos_construcao': len(set(c.modelo.id for c in self.construcoes)),
-        }
-        
-        for c in self.conquistas.values():
-            if c.desbloqueada:
-                continue
-            try:
-                if eval(c.condicao, {"__builtins__": {}}, stats):
-                    c.desbloqueada = True
-                    c.turno_desbloqueio = self.turno
-                    novas.append(c)
-            except:
-                pass
-        
-        return novas
-    
-    def custo_manutencao_total(self):
-        return sum(c.manutencao_atual for c in self.construcoes)
-    
-    def avancar_turno(self):
-        eventos = []
-        
-        # Manutenção
-        manut = self.custo_manutencao_total()
-        self.capital -= manut
-        self.estatisticas['total_gasto'] += manut
-        
-        # Produção
-        for c in self.construcoes:
-            modelo = c.modelo
-            if modelo.producao_recurso:
-                prod = c.producao_atual
-                self.recursos[modelo.producao_recurso].quantidade += prod
-            if modelo.pesquisa:
-                bonus = int(modelo.pesquisa * (1 + (c.nivel - 1) * 0.3))
-                self.pontos_pesquisa += bonus
-            
-            # Banco gera juros
-            if modelo.id == 'banco':
-                juros = self.capital * 0.02 * c.nivel
-                self.capital += juros
-                self.estatisticas['total_ganho'] += juros
-        
-        # Volatilidade de preços
-        for r in self.recursos.values():
-            var = random.uniform(-r.volatilidade, r.volatilidade)
-            r.preco = max(0.1, round(r.preco * (1 + var), 2))
-            r.preco_historico.append(r.preco)
-            if len(r.preco_historico) > 50:
-                r.preco_historico.pop(0)
-        
-        # Eventos aleatórios (30% chance)
-        if random.random() < 0.30:
-            evento = self._gerar_evento()
-            eventos.append(evento)
-            self.eventos_log.appendleft(evento)
-            self.estatisticas['eventos_ocorridos'] += 1
-        
-        self.turno += 1
-        self.estatisticas['turnos_jogados'] += 1
-        self.estatisticas['max_capital'] = max(self.estatisticas['max_capital'], self.capital)
-        
-        # Verificar conquistas
-        novas_conquistas = self.verificar_conquistas()
-        
-        return eventos, novas_conquistas
-    
-    def _gerar_evento(self) -> Evento:
-        eventos_possiveis = [
-            # Bônus
-            ('bonus', '📈 Boom de Mercado!', 'O preço de {recurso} subiu 60%!', 
-             lambda r: setattr(r, 'preco', round(r.preco * 1.6, 2))),
-            ('bonus', '🎁 Doação Recebida', 'Você recebeu R$ 2.000 de um investidor!',
-             lambda _: setattr(self, 'capital', self.capital + 2000)),
-            ('bonus', '⚡ Eficiência Energética', 'Sua produção de energia dobrou este turno!',
-             lambda _: None),
-            
-            # Penalidades  
-            ('penalty', '📉 Crise no Setor', 'O preço de {recurso} caiu 40%!',
-             lambda r: setattr(r, 'preco', max(0.5, round(r.preco * 0.6, 2)))),
-            ('penalty', '🔧 Manutenção Extra', 'Reparos emergenciais custaram R$ 1.000!',
-             lambda _: setattr(self, 'capital', self.capital - 1000)),
-            ('penalty', '🌧️ Clima Adverso', 'A produção de café foi afetada!',
-             lambda _: None),
-            
-            # Neutros
-            ('neutral', '📊 Mercado Estável', 'Não houve grandes mudanças hoje.',
-             lambda _: None),
-            ('neutral', '🔄 Flutuação Normal', 'Os mercados operaram normalmente.',
-             lambda _: None),
-        ]
-        
-        tipo, titulo, desc, efeito = random.choice(eventos_possiveis)
-        
-        recurso_alvo = random.choice(list(self.recursos.keys()))
-        recurso = self.recursos[recurso_alvo]
-        
-        if '{recurso}' in desc:
-            desc = desc.format(recurso=recurso.nome)
-            efeito(recurso)
-        else:
-            efeito(recurso)
-        
-        icone = {'bonus': '✅', 'penalty': '⚠️', 'neutral': 'ℹ️', 'special': '⭐'}[tipo]
-        
-        return Evento(titulo, desc, tipo, icone)
-    
-    def comprar_recurso(self, chave: str, quantidade: int):
-        r = self.recursos[chave]
-        custo = quantidade * r.preco
-        if custo > self.capital:
-            raise ValueError("Capital insuficiente")
-        self.capital -= custo
-        r.quantidade += quantidade
-        self.estatisticas['total_gasto'] += custo
-    
-    def vender_recurso(self, chave: str, quantidade: int):
-        r = self.recursos[chave]
-        if quantidade > r.quantidade:
-            raise ValueError("Quantidade insuficiente")
-        ganho = quantidade * r.preco
-        self.capital += ganho
-        r.quantidade -= quantidade
-        self.estatisticas['total_ganho'] += ganho
-        self.estatisticas['recursos_vendidos'] += quantidade
-    
-    def construir(self, modelo_id: str):
-        modelo = self.modelos_construcao[modelo_id]
-        if self.capital < modelo.custo:
-            raise ValueError("Capital insuficiente")
-        self.capital -= modelo.custo
-        self.estatisticas['total_gasto'] += modelo.custo
-        self.estatisticas['construcoes_feitas'] += 1
-        self.construcoes.append(Construcao(modelo=modelo, nivel=1, built_at=self.turno))
-    
-    def upgrade_construcao(self, index: int):
-        if index < 0 or index >= len(self.construcoes):
-            raise ValueError("Construção inválida")
-        
-        c = self.construcoes[index]
-        if c.nivel >= c.modelo.nivel_max:
-            raise ValueError("Nível máximo atingido")
-        
-        custo = c.custo_upgrade
-        if self.capital < custo:
-            raise ValueError("Capital insuficiente")
-        
-        self.capital -= custo
-        c.nivel += 1
-        self.estatisticas['total_gasto'] += custo
-        self.estatisticas['upgrades_feitos'] += 1
-    
-    def demolir_construcao(self, index: int):
-        if index < 0 or index >= len(self.construcoes):
-            raise ValueError("Construção inválida")
-        
-        c = self.construcoes[index]
-        reembolso = c.modelo.custo * 0.3  # 30% de reembolso
-        self.capital += reembolso
-        self.estatisticas['total_ganho'] += reembolso
-        self.construcoes.pop(index)
-    
-    def to_dict(self) -> dict:
-        return {
-            'capital': self.capital,
-            'turno': self.turno,
-            'pontos_pesquisa': self.pontos_pesquisa,
-            'recursos': {k: {'quantidade': v.quantidade, 'preco': v.preco, 
-                            'preco_historico': v.preco_historico} 
-                        for k, v in self.recursos.items()},
-            'construcoes': [{'modelo_id': c.modelo.id, 'nivel': c.nivel, 'built_at': c.built_at} 
-                           for c in self.construcoes],
-            'conquistas': {k: {'desbloqueada': v.desbloqueada, 'turno': v.turno_desbloqueio}
-                          for k, v in self.conquistas.items()},
-            'estatisticas': self.estatisticas,
+        self.calls = 0
+
+    def install(self, namespace: dict):
+        for name, func in list(namespace.items()):
+            prefix = 3 if name.startswith('glu') else 2
+            if (name.startswith('gl') and name[prefix:prefix + 1].isupper() and callable(func)
+                    and not hasattr(func, '__wrapped__')):
+                namespace[name] = self._wrap(func)
+
+    def _wrap(self, func):
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return func(*args, **kwargs)
+        counted.__wrapped__ = func
+        return counted
+
+    def take(self) -> int:
+        calls, self.calls = self.calls, 0
+        return calls
+
+class MeshBuilder:
+    """Records primitives under a CPU-side matrix stack into one colored mesh.
+
+    It mirrors the subset of fixed-function calls the building models use, so
+    a model's static geometry is written once and either baked through this
+    class or replayed through ``ImmediateBuilder``.
+    """
+
+    def __init__(self):
+        self._matrix = np.eye(4)
+        self._stack = []
+        self._color = (1.0, 1.0, 1.0, 1.0)
+        self._parts = []
+
+    def push(self):
+        self._stack.append(self._matrix.copy())
+
+    def pop(self):
+        self._matrix = self._stack.pop()
+
+    def translate(self, x, y, z):
+        m = np.eye(4)
+        m[:3, 3] = (x, y, z)
+        self._matrix = self._matrix @ m
+
+    def scale(self, x, y, z):
+        self._matrix = self._matrix @ np.diag((x, y, z, 1.0))
+
+    def rotate(self, angle, x, y, z):
+        # Same matrix as glRotatef
+        x, y, z = np.array((x, y, z), dtype=np.float64) / math.sqrt(x*x + y*y + z*z)
+        c, s = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+        k = 1 - c
+        m = np.eye(4)
+        m[:3, :3] = ((x*x*k + c, x*y*k - z*s, x*z*k + y*s),
+                     (y*x*k + z*s, y*y*k + c, y*z*k - x*s),
+                     (x*z*k - y*s, y*z*k + x*s, z*z*k + c))
+        self._matrix = self._matrix @ m
+
+    def color(self, r, g, b, a=1.0):
+        self._color = (r, g, b, a)
+
+    def box(self, w, h, d):
+        self._add(box_mesh(w, h, d))
+
+    def prism(self, base, height, depth):
+        self._add(prism_triangle_mesh(base, height, depth))
+
+    def cylinder(self, radius, height, segments=12):
+        self._add(cylinder_mesh(radius, height, segments))
+
+    def _add(self, vertices):
+        linear, offset = self._matrix[:3, :3], self._matrix[:3, 3]
+        positions = vertices[:, :3] @ linear.T + offset
+        # Normals go through the inverse transpose, then get the GL_NORMALIZE treatment
+        normals = vertices[:, 3:6] @ np.linalg.inv(linear)
+        normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+        colors = np.broadcast_to(self._color, (len(vertices), 4))
+        self._parts.append(np.concatenate([positions, normals, colors], axis=1))
+
+    def mesh(self) -> np.ndarray:
+        if not self._parts:
+            return np.empty((0, MESH_FLOATS), dtype=np.float32)
+        return np.concatenate(self._parts).astype(np.float32)
+
+class ImmediateBuilder:
+    """``MeshBuilder``'s interface issued straight to GL (the immediate-mode path)."""
+
+    def push(self):
+        glPushMatrix()
+
+    def pop(self):
+        glPopMatrix()
+
+    def translate(self, x, y, z):
+        glTranslatef(x, y, z)
+
+    def scale(self, x, y, z):
+        glScalef(x, y, z)
+
+    def rotate(self, angle, x, y, z):
+        glRotatef(angle, x, y, z)
+
+    def color(self, r, g, b, a=1.0):
+        glColor4f(r, g, b, a)
+
+    def box(self, w, h, d):
+        draw_box(w, h, d)
+
+    def prism(self, base, height, depth):
+        draw_prism_triangle(base, height, depth)
+
+    def cylinder(self, radius, height, segments=12):
+        draw_cylinder(radius, height, segments)
+
+class MeshCache:
+    """Meshes generated once with NumPy and packed into one shared VBO.
+
+    Between ``begin_frame`` and ``end_frame`` the buffer and the vertex,
+    normal and color pointers stay bound, so drawing a cached mesh costs a
+    single ``glDrawArrays`` call (plus toggling the color array for baked
+    meshes). Primitives are keyed by shape and dimensions, baked buildings by
+    their static builder, scale and level; a new mesh is appended on first use
+    and the buffer is re-uploaded once.
+    """
+
+    def __init__(self):
+        self.enabled = True   # False forces the immediate-mode path
+        self.active = False
+        self._ranges = {}     # key -> (first vertex, vertex count)
+        self._parts = []
+        self._vertices = 0
+        self._vbo = None
+        self._dirty = False
+
+    def reset(self):
+        """Forget the GL buffer (a new context); the NumPy meshes are kept."""
+        self._vbo = None
+        self._dirty = bool(self._vertices)
+        self.active = False
+
+    def begin_frame(self):
+        if not self.enabled or not bool(glGenBuffers):
+            return
+        if self._vbo is None:
+            self._vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+        if self._dirty:
+            self._upload()
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        self.point()
+        self.active = True
+
+    def end_frame(self):
+        if not self.active:
+            return
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.active = False
+
+    def span(self, key, builder, *args):
+        """(first vertex, count) of a cached mesh, building it if needed."""
+        span = self._ranges.get(key)
+        if span is None:
+            span = self._add(key, builder(*args))
+        return span
+
+    def bind(self):
+        glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+
+    def point(self):
+        """Bind the buffer and aim the vertex, normal and color pointers at it."""
+        self.bind()
+        glVertexPointer(3, GL_FLOAT, MESH_STRIDE, ctypes.c_void_p(0))
+        glNormalPointer(GL_FLOAT, MESH_STRIDE, ctypes.c_void_p(12))
+        glColorPointer(4, GL_FLOAT, MESH_STRIDE, ctypes.c_void_p(24))
+
+    def draw(self, key, builder, *args):
+        glDrawArrays(GL_TRIANGLES, *self.span(key, builder, *args))
+
+    def draw_baked(self, static, scale, nivel):
+        """Draw the static part of a building, baking it on first use.
+
+        The key holds the builder function itself, so a redefined model
+        bakes a new mesh instead of reusing a stale one.
+        """
+        key = (static, scale, nivel)
+        span = self._ranges.get(key)
+        if span is None:
+            builder = MeshBuilder()
+            static(builder, scale, nivel)
+            span = self._add(key, builder.mesh())
+        if span[1]:
+            glEnableClientState(GL_COLOR_ARRAY)
+            glDrawArrays(GL_TRIANGLES, *span)
+            glDisableClientState(GL_COLOR_ARRAY)
+
+    def _add(self, key, vertices):
+        if vertices.shape[1] < MESH_FLOATS:
+            vertices = np.hstack([vertices, np.ones((len(vertices), MESH_FLOATS - vertices.shape[1]), np.float32)])
+        span = self._ranges[key] = (self._vertices, len(vertices))
+        self._parts.append(vertices)
+        self._vertices += len(vertices)
+        self._upload()
+        return span
+
+    def _upload(self):
+        data = np.concatenate(self._parts) if len(self._parts) > 1 else self._parts[0]
+        self._parts = [data]
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
+        self._dirty = False
+
+# Per-instance layout of instanced cubes: offset xyz, scale xyz, color rgba
+INSTANCE_FLOATS = 10
+INSTANCE_STRIDE = INSTANCE_FLOATS * 4
+
+INSTANCE_VERTEX_SHADER = """
+#version 120
+attribute vec3 instance_offset;
+attribute vec3 instance_scale;
+attribute vec4 instance_color;
+uniform bool lit;
+varying vec4 color;
+
+void main() {
+    vec4 eye = gl_ModelViewMatrix * vec4(gl_Vertex.xyz * instance_scale + instance_offset, 1.0);
+    gl_Position = gl_ProjectionMatrix * eye;
+    if (!lit) {
+        color = instance_color;
+        return;
+    }
+    // Fixed-function lighting: directional lights, GL_COLOR_MATERIAL on
+    // ambient and diffuse, GL_NORMALIZE, infinite viewer
+    vec3 n = normalize(gl_NormalMatrix * (gl_Normal / instance_scale));
+    vec4 c = gl_FrontMaterial.emission + gl_LightModel.ambient * instance_color;
+    for (int i = 0; i < 2; i++) {
+        float d = max(dot(n, normalize(gl_LightSource[i].position.xyz)), 0.0);
+        c += gl_LightSource[i].ambient * instance_color + gl_LightSource[i].diffuse * instance_color * d;
+        if (d > 0.0) {
+            float h = max(dot(n, normalize(gl_LightSource[i].halfVector.xyz)), 0.0);
+            c += gl_LightSource[i].specular * gl_FrontMaterial.specular * pow(h, gl_FrontMaterial.shininess);
         }
-    
-    def from_dict(self, data: dict):
-        self.capital = data['capital']
-        self.turno = data['turno']
-        self.pontos_pesquisa = data['pontos_pesquisa']
-        
-        for k, v in data['recursos'].items():
-            if k in self.recursos:
-                self.recursos[k].quantidade = v['quantidade']
-                self.recursos[k].preco = v['preco']
-                self.recursos[k].preco_historico = v.get('preco_historico', [v['preco']])
-        
-        self.construcoes = []
-        for c_data in data['construcoes']:
-            modelo = self.modelos_construcao[c_data['modelo_id']]
-            self.construcoes.append(Construcao(
-                modelo=modelo, nivel=c_data['nivel'], built_at=c_data['built_at']
-            ))
-        
-        for k, v in data.get('conquistas', {}).items():
-            if k in self.conquistas:
-                self.conquistas[k].desbloqueada = v['desbloqueada']
-                self.conquistas[k].turno_desbloqueio = v['turno']
-        
-        self.estatisticas = data.get('estatisticas', self.estatisticas)
+    }
+    color = vec4(clamp(c.rgb, 0.0, 1.0), instance_color.a);
+}
+"""
 
-# ═══════════════════════════════════════════════════════════════════════════════
-# OPENGL HELPERS
-# ═══════════════════════════════════════════════════════════════════════════════
+INSTANCE_FRAGMENT_SHADER = """
+#version 120
+varying vec4 color;
+
+void main() {
+    gl_FragColor = color;
+}
+"""
+
+def make_instances(*columns) -> np.ndarray:
+    """Rows of instance data from broadcastable offset/scale/color columns."""
+    return np.stack(np.broadcast_arrays(*columns), axis=-1).reshape(-1, INSTANCE_FLOATS).astype(np.float32)
+
+class InstanceRenderer:
+    """Unit-cube instances with per-instance offset, scale and color.
+
+    Every instance of a batch goes out in one ``glDrawArraysInstanced`` call
+    over the cached unit cube. The vertex shader reproduces the scene's
+    fixed-function lighting, so an instanced cube shades like a ``draw_box``.
+    Without shader or instancing support ``active`` stays False and callers
+    keep their per-object loops.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.available = False
+        self._program = None
+        self._vbo = None
+
+    @property
+    def active(self) -> bool:
+        return self.enabled and self.available and MESHES.active
+
+    def initialize(self):
+        """Compile the program in the current (new) context."""
+        self.available = False
+        if not (bool(glDrawArraysInstanced) and bool(glVertexAttribDivisor) and bool(glCreateShader)):
+            return
+        try:
+            self._program = shaders.compileProgram(
+                shaders.compileShader(INSTANCE_VERTEX_SHADER, GL_VERTEX_SHADER),
+                shaders.compileShader(INSTANCE_FRAGMENT_SHADER, GL_FRAGMENT_SHADER))
+        except (RuntimeError, GLError) as e:
+            print(f"Instanciamento indisponível: {e}", file=sys.stderr)
+            return
+        self._attributes = [glGetAttribLocation(self._program, nome)
+                            for nome in ('instance_offset', 'instance_scale', 'instance_color')]
+        self._lit = glGetUniformLocation(self._program, 'lit')
+        self._vbo = glGenBuffers(1)
+        self.available = True
+
+    def draw(self, lit: np.ndarray, unlit: np.ndarray):
+        """Draw a lit and an unlit batch of instances (either may be empty)."""
+        self._draw([(b, flag) for b, flag in ((lit, True), (unlit, False)) if len(b)])
+
+    def draw_transparent(self, instances: np.ndarray):
+        """Unlit, already depth-sorted instances that blend without writing depth."""
+        if len(instances):
+            glDepthMask(GL_FALSE)
+            self._draw([(instances, False)])
+            glDepthMask(GL_TRUE)
+
+    def _draw(self, batches):
+        if not batches:
+            return
+        first, count = MESHES.span(('box', 1, 1, 1), box_mesh, 1, 1, 1)
+        data = np.concatenate([b for b, _ in batches])
+        glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STREAM_DRAW)
+        glUseProgram(self._program)
+        for location in self._attributes:
+            glEnableVertexAttribArray(location)
+            glVertexAttribDivisor(location, 1)
+        start = 0
+        for batch, flag in batches:
+            for location, size, offset in zip(self._attributes, (3, 3, 4), (0, 12, 24)):
+                glVertexAttribPointer(location, size, GL_FLOAT, GL_FALSE, INSTANCE_STRIDE,
+                                      ctypes.c_void_p(start * INSTANCE_STRIDE + offset))
+            glUniform1i(self._lit, flag)
+            glDrawArraysInstanced(GL_TRIANGLES, first, count, len(batch))
+            start += len(batch)
+        for location in self._attributes:
+            glVertexAttribDivisor(location, 0)
+            glDisableVertexAttribArray(location)
+        glUseProgram(0)
+        MESHES.bind()
+
+# Grid subdivisions per cell of a water surface (quality setting, --agua)
+WATER_QUALITY = 4
+
+WATER_VERTEX_SHADER = """
+#version 120
+uniform float level;
+uniform float amplitude;
+uniform float phase;
+varying vec4 color;
+
+void main() {
+    // The static grid stores each vertex's wave phase in y
+    vec4 p = vec4(gl_Vertex.x, level + amplitude * sin(phase + gl_Vertex.y), gl_Vertex.z, 1.0);
+    gl_Position = gl_ModelViewProjectionMatrix * p;
+    color = gl_Color;
+}
+"""
+
+class WaterSurface:
+    """A rippling water grid, displaced on the GPU from a few uniforms.
+
+    The surface covers ``cells`` (cols, rows) of the original model, each one
+    split into ``quality`` × ``quality`` quads. The grid is a static cached
+    mesh that keeps the wave phase of every vertex in place of its height;
+    the vertex shader turns it into ``level + amplitude * sin(phase + p)``,
+    so a frame costs the same few calls at any resolution. Without shaders
+    the heights of every corner come from one NumPy expression and go out
+    in one ``glDrawArrays``, streamed through a buffer of their own when
+    VBOs are on and from a client-side array otherwise.
+    """
+
+    def __init__(self, x_range, z_range, cells, phase_step, quality=WATER_QUALITY):
+        self.x_range, self.z_range = x_range, z_range
+        self.cells, self.phase_step = cells, phase_step
+        self.enabled = True
+        self.available = False
+        self._program = None
+        self._vbo = None
+        self.set_quality(quality)
+
+    @property
+    def active(self) -> bool:
+        return self.enabled and self.available and MESHES.active
+
+    def set_quality(self, quality: int):
+        if quality < 1:
+            raise ValueError(f"Qualidade da água inválida: {quality}")
+        self.quality = quality
+        cols, rows = self.cells
+        i = np.arange(cols * quality + 1) / quality
+        j = np.arange(rows * quality + 1) / quality
+        x = self.x_range[0] + i * (self.x_range[1] - self.x_range[0]) / cols
+        z = self.z_range[0] + j * (self.z_range[1] - self.z_range[0]) / rows
+        phase = i[None, :] * self.phase_step[0] + j[:, None] * self.phase_step[1]
+        grid = np.stack(np.broadcast_arrays(x[None, :], phase, z[:, None]), axis=-1)
+        # Quad corners in the order of the old loop: (i, j), (i+1, j), (i+1, j+1), (i, j+1)
+        self._quads = np.stack([grid[:-1, :-1], grid[:-1, 1:], grid[1:, 1:], grid[1:, :-1]],
+                               axis=2).reshape(-1, 4, 3)
+
+    def mesh(self) -> np.ndarray:
+        return _triangulate_quads(self._quads, np.broadcast_to((0.0, 1.0, 0.0), self._quads.shape))
+
+    def initialize(self):
+        """Compile the program in the current (new) context."""
+        self.available = False
+        self._vbo = None
+        if not bool(glCreateShader):
+            return
+        try:
+            self._program = shaders.compileProgram(
+                shaders.compileShader(WATER_VERTEX_SHADER, GL_VERTEX_SHADER),
+                shaders.compileShader(INSTANCE_FRAGMENT_SHADER, GL_FRAGMENT_SHADER))
+        except (RuntimeError, GLError) as e:
+            print(f"Água por shader indisponível: {e}", file=sys.stderr)
+            return
+        self._uniforms = [glGetUniformLocation(self._program, nome) for nome in ('level', 'amplitude', 'phase')]
+        self.available = True
+
+    def draw(self, level: float, amplitude: float, phase: float):
+        """Draw the surface with the current color and modelview."""
+        if self.active:
+            glUseProgram(self._program)
+            for location, value in zip(self._uniforms, (level, amplitude, phase)):
+                glUniform1f(location, value)
+            glDrawArrays(GL_TRIANGLES, *MESHES.span(('water', id(self), self.quality), self.mesh))
+            glUseProgram(0)
+            return
+        vertices = self._quads.astype(np.float32).reshape(-1, 3)
+        vertices[:, 1] = level + amplitude * np.sin(phase + self._quads[..., 1].reshape(-1))
+        if MESHES.active:
+            if self._vbo is None:
+                self._vbo = glGenBuffers(1)
+            glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+            glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STREAM_DRAW)
+            # Like the immediate-mode quads, the surface takes the current normal
+            glDisableClientState(GL_NORMAL_ARRAY)
+            glVertexPointer(3, GL_FLOAT, 0, ctypes.c_void_p(0))
+            glDrawArrays(GL_QUADS, 0, len(vertices))
+            glEnableClientState(GL_NORMAL_ARRAY)
+            MESHES.point()
+            return
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, vertices)
+        glDrawArrays(GL_QUADS, 0, len(vertices))
+        glDisableClientState(GL_VERTEX_ARRAY)
+
+MESHES = MeshCache()
+INSTANCES = InstanceRenderer()
+IMMEDIATE = ImmediateBuilder()
+
+def draw_static(static, scale, nivel):
+    """Static part of a building: one cached mesh, or replayed in immediate mode."""
+    if MESHES.active:
+        MESHES.draw_baked(static, scale, nivel)
+    else:
+        static(IMMEDIATE, scale, nivel)
 
 def draw_box(w, h, d):
+    if MESHES.active:
+        MESHES.draw(('box', w, h, d), box_mesh, w, h, d)
+        return
     hw, hh, hd = w/2.0, h/2.0, d/2.0
     glBegin(GL_QUADS)
     glNormal3f(0,0,1)
@@ -573,6 +760,9 @@ def draw_box(w, h, d):
     glEnd()
 
 def draw_prism_triangle(base, height, depth):
+    if MESHES.active:
+        MESHES.draw(('prism', base, height, depth), prism_triangle_mesh, base, height, depth)
+        return
     glBegin(GL_TRIANGLES)
     glNormal3f(0,0,1)
     glVertex3f(-base/2, -height/2, depth/2)
@@ -602,6 +792,9 @@ def draw_prism_triangle(base, height, depth):
     glEnd()
 
 def draw_cylinder(radius, height, segments=12):
+    if MESHES.active:
+        MESHES.draw(('cylinder', radius, height, segments), cylinder_mesh, radius, height, segments)
+        return
     glBegin(GL_QUAD_STRIP)
     for i in range(segments + 1):
         angle = 2 * math.pi * i / segments
@@ -632,46 +825,40 @@ def draw_cylinder(radius, height, segments=12):
 # LOW-POLY BUILDING MODELS
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def draw_factory(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
-    glPushMatrix()
-    glScalef(scale, scale * (1 + nivel * 0.1), scale)
+# Each building is split in two: a ``*_static`` builder for everything that
+# depends only on scale and level, baked once into a cached mesh (see
+# ``draw_static``), and the animated remainder drawn every frame.
+
+def factory_static(g, scale, nivel):
+    g.push()
+    g.scale(scale, scale * (1 + nivel * 0.1), scale)
     
     # Main building
-    glColor3f(0.6, 0.45, 0.3)
-    draw_box(2.0, 1.4, 1.6)
+    g.color(0.6, 0.45, 0.3)
+    g.box(2.0, 1.4, 1.6)
     
     # Roof
-    glTranslatef(0, 0.9, 0)
-    glColor3f(0.4, 0.2, 0.15)
-    draw_prism_triangle(2.4, 0.8, 1.6)
-    glPopMatrix()
+    g.translate(0, 0.9, 0)
+    g.color(0.4, 0.2, 0.15)
+    g.prism(2.4, 0.8, 1.6)
+    g.pop()
+
+def draw_factory(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
+    draw_static(factory_static, scale, nivel)
     
-    # Chimney with smoke
+    # Chimney (only while productive, so not part of the static mesh); its
+    # smoke comes from the chimney's emitter in the particle system
     if prod_level > 0.2:
         glPushMatrix()
         glTranslatef(1.1*scale, 0.9*scale, 0)
         glColor3f(0.35, 0.35, 0.35)
-        glPushMatrix()
         glScalef(scale*0.25, scale*1.2, scale*0.25)
         draw_box(1, 1, 1)
         glPopMatrix()
-        
-        # Smoke particles
-        glDisable(GL_LIGHTING)
-        for i in range(3 + nivel):
-            y = 1.2*scale + (t*0.6 + i*0.8) % 1.5
-            alpha = max(0.1, 1.0 - (y - 1.2*scale) / 1.5)
-            glColor4f(0.2, 0.2, 0.25, alpha * 0.6)
-            glPushMatrix()
-            glTranslatef(math.sin(t + i) * 0.1, y, math.cos(t + i) * 0.1)
-            size = 0.15*scale*(1 + i*0.3)
-            glScalef(size, size, size)
-            draw_box(1, 1, 1)
-            glPopMatrix()
-        glEnable(GL_LIGHTING)
-        glPopMatrix()
     
-    # Level indicator lights
+    # Level indicator lights (instanced for every factory at once when possible)
+    if INSTANCES.active:
+        return
     glDisable(GL_LIGHTING)
     for i in range(nivel):
         glPushMatrix()
@@ -682,21 +869,41 @@ def draw_factory(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
         glPopMatrix()
     glEnable(GL_LIGHTING)
 
-def draw_mine(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
-    glPushMatrix()
-    glScalef(scale, scale * (1 + nivel * 0.1), scale)
+def factory_light_instances(xs, zs, niveis, t, scale=1.0):
+    """``draw_factory``'s indicator lights for every factory lot, as unlit instances."""
+    partes = [np.empty((0, INSTANCE_FLOATS), np.float32)]
+    for nivel in np.unique(niveis):
+        sel = niveis == nivel
+        i = np.arange(nivel)
+        intensity = 0.5 + 0.5 * np.sin(t * 3 + i)
+        partes.append(make_instances(
+            xs[sel, None] - 0.8 + i * 0.35, 0.8*scale, zs[sel, None] + 0.82*scale,
+            0.15, 0.15, 0.05,
+            0.2 * intensity, 0.8 * intensity, 0.2 * intensity, 1.0))
+    return np.concatenate(partes)
+
+def mine_static(g, scale, nivel):
+    g.push()
+    g.scale(scale, scale * (1 + nivel * 0.1), scale)
     
     # Main tower
-    glColor3f(0.4, 0.4, 0.45)
-    draw_box(1.0, 2.0 + nivel * 0.2, 1.0)
+    g.color(0.4, 0.4, 0.45)
+    g.box(1.0, 2.0 + nivel * 0.2, 1.0)
     
     # Conveyor belt
+    g.push()
+    g.translate(-0.9, -0.2, 0)
+    g.rotate(-25, 0, 0, 1)
+    g.color(0.25, 0.2, 0.18)
+    g.box(1.6, 0.18, 0.6)
+    g.pop()
+    g.pop()
+
+def draw_mine(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
+    draw_static(mine_static, scale, nivel)
+    
     glPushMatrix()
-    glTranslatef(-0.9, -0.2, 0)
-    glRotatef(-25, 0, 0, 1)
-    glColor3f(0.25, 0.2, 0.18)
-    draw_box(1.6, 0.18, 0.6)
-    glPopMatrix()
+    glScalef(scale, scale * (1 + nivel * 0.1), scale)
     
     # Mining wheel
     glPushMatrix()
@@ -718,30 +925,36 @@ def draw_mine(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
     draw_box(1, 1, 1)
     glPopMatrix()
 
-def draw_hydro(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
-    glPushMatrix()
-    glScalef(scale, scale, scale)
+def hydro_static(g, scale, nivel):
+    g.push()
+    g.scale(scale, scale, scale)
     
     # Dam wall
-    glColor3f(0.5, 0.55, 0.6)
-    draw_box(2.5, 1.0 + nivel * 0.15, 1.2)
+    g.color(0.5, 0.55, 0.6)
+    g.box(2.5, 1.0 + nivel * 0.15, 1.2)
     
     # Control tower
-    glPushMatrix()
-    glTranslatef(0, 0.9, 0.6)
-    glColor3f(0.45, 0.5, 0.55)
-    draw_box(0.6, 0.9 + nivel * 0.1, 0.6)
-    glPopMatrix()
+    g.push()
+    g.translate(0, 0.9, 0.6)
+    g.color(0.45, 0.5, 0.55)
+    g.box(0.6, 0.9 + nivel * 0.1, 0.6)
+    g.pop()
     
     # Turbine housing
     for i in range(min(nivel, 3)):
-        glPushMatrix()
-        glTranslatef(-0.7 + i * 0.7, -0.3, -0.7)
-        glColor3f(0.35, 0.4, 0.45)
-        draw_cylinder(0.25, 0.3, 8)
-        glPopMatrix()
+        g.push()
+        g.translate(-0.7 + i * 0.7, -0.3, -0.7)
+        g.color(0.35, 0.4, 0.45)
+        g.cylinder(0.25, 0.3, 8)
+        g.pop()
     
-    glPopMatrix()
+    g.pop()
+
+# Reservoir of the hydro plant: 4×4 cells whose wave phase steps 1 along x and z
+WATER = WaterSurface((-1.8, 1.8), (-1.2, 0.0), (4, 4), (1.0, 1.0))
+
+def draw_hydro(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
+    draw_static(hydro_static, scale, nivel)
     
     # Animated water
     glPushMatrix()
@@ -752,23 +965,40 @@ def draw_hydro(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
     wave_intensity = 0.05 * prod_level
     
     glColor4f(0.05, 0.4, 0.7, 0.85)
-    glBegin(GL_QUADS)
-    for i in range(4):
-        for j in range(4):
-            x1 = -1.8 + i * 0.9
-            x2 = x1 + 0.9
-            z1 = -1.2 + j * 0.3
-            z2 = z1 + 0.3
-            h1 = level + wave_intensity * math.sin(t * 2 + i + j)
-            h2 = level + wave_intensity * math.sin(t * 2 + i + j + 1)
-            glVertex3f(x1, h1, z1)
-            glVertex3f(x2, h1, z2)
-            glVertex3f(x2, h2, z2)
-            glVertex3f(x1, h2, z1)
-    glEnd()
+    WATER.draw(level, wave_intensity, t * 2)
     glEnable(GL_LIGHTING)
     glPopMatrix()
 
+def coffee_instances(xs, zs, niveis, prod_levels, t, scale=1.0):
+    """Bushes and berries of every plantation lot in one pass, as lit instances.
+
+    Same layout and animation as ``draw_coffee``; lots are grouped by level
+    so each group is a single broadcast over (lot, bush).
+    """
+    partes = [np.empty((0, INSTANCE_FLOATS), np.float32)]
+    spacing = 0.7 * scale
+    for nivel in np.unique(niveis):
+        sel = niveis == nivel
+        rows, cols = 3 + nivel, 4 + nivel
+        r, c = np.divmod(np.arange(rows * cols), cols)
+        x = xs[sel, None] + (c - (cols-1)/2) * spacing
+        z = zs[sel, None] + (r - (rows-1)/2) * spacing
+        prod_level = prod_levels[sel, None]
+        growth = 0.3 + 0.5 * prod_level * (0.7 + 0.3 * np.sin((r+c) * 0.5 + t * 0.5))
+        partes.append(make_instances(
+            x, 0.1 + growth/2, z,
+            0.35*scale, growth, 0.35*scale,
+            0.15, 0.45 + 0.1 * np.sin(r + c), 0.15, 1.0))
+        # Berries only on productive plantations
+        productive = prod_level[:, 0] > 0.3
+        berry = (r + c) % 2 == 0
+        partes.append(make_instances(
+            x[productive][:, berry] + 0.1, 0.15 + growth[productive][:, berry] * 0.7,
+            z[productive][:, berry] + 0.1,
+            0.08, 0.08, 0.08,
+            0.6, 0.15, 0.1, 1.0))
+    return np.concatenate(partes)
+
 def draw_coffee(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
     rows = 3 + nivel
     cols = 4 + nivel
@@ -801,28 +1031,34 @@ def draw_coffee(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
                 draw_box(1, 1, 1)
                 glPopMatrix()
 
-def draw_research(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
-    glPushMatrix()
-    glScalef(scale, scale * (1 + nivel * 0.08), scale)
+def research_static(g, scale, nivel):
+    g.push()
+    g.scale(scale, scale * (1 + nivel * 0.08), scale)
     
     # Main building (modern style)
-    glColor3f(0.35, 0.4, 0.85)
-    draw_box(1.6, 1.0, 1.2)
+    g.color(0.35, 0.4, 0.85)
+    g.box(1.6, 1.0, 1.2)
     
     # Glass panels
-    glColor4f(0.4, 0.6, 0.9, 0.8)
-    glPushMatrix()
-    glTranslatef(0, 0, 0.61)
-    draw_box(1.2, 0.6, 0.02)
-    glPopMatrix()
+    g.color(0.4, 0.6, 0.9, 0.8)
+    g.push()
+    g.translate(0, 0, 0.61)
+    g.box(1.2, 0.6, 0.02)
+    g.pop()
     
     # Antenna
-    glTranslatef(0, 0.8, 0)
-    glColor3f(0.2, 0.2, 0.2)
+    g.translate(0, 0.8, 0)
+    g.color(0.2, 0.2, 0.2)
+    g.scale(0.08, 0.7 + nivel * 0.1, 0.08)
+    g.box(1, 1, 1)
+    g.pop()
+
+def draw_research(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
+    draw_static(research_static, scale, nivel)
+    
     glPushMatrix()
-    glScalef(0.08, 0.7 + nivel * 0.1, 0.08)
-    draw_box(1, 1, 1)
-    glPopMatrix()
+    glScalef(scale, scale * (1 + nivel * 0.08), scale)
+    glTranslatef(0, 0.8, 0)
     
     # Satellite dish
     glPushMatrix()
@@ -847,75 +1083,68 @@ def draw_research(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
         glPopMatrix()
     glEnable(GL_LIGHTING)
 
-def draw_refinery(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
-    glPushMatrix()
-    glScalef(scale, scale, scale)
+def refinery_static(g, scale, nivel):
+    g.push()
+    g.scale(scale, scale, scale)
     
     # Main tanks
     for i in range(2 + nivel // 2):
-        glPushMatrix()
-        glTranslatef(-0.7 + i * 0.8, 0.6, 0)
-        glColor3f(0.35 + i * 0.05, 0.35, 0.4)
-        draw_cylinder(0.35, 1.2 + i * 0.15, 10)
-        glPopMatrix()
+        g.push()
+        g.translate(-0.7 + i * 0.8, 0.6, 0)
+        g.color(0.35 + i * 0.05, 0.35, 0.4)
+        g.cylinder(0.35, 1.2 + i * 0.15, 10)
+        g.pop()
     
     # Processing unit
-    glColor3f(0.3, 0.32, 0.35)
-    draw_box(1.8, 0.8, 1.2)
+    g.color(0.3, 0.32, 0.35)
+    g.box(1.8, 0.8, 1.2)
     
     # Pipes
-    glColor3f(0.5, 0.5, 0.52)
+    g.color(0.5, 0.5, 0.52)
     for i in range(3):
-        glPushMatrix()
-        glTranslatef(-0.6 + i * 0.6, 0.5, 0.65)
-        glRotatef(90, 1, 0, 0)
-        draw_cylinder(0.08, 0.4, 6)
-        glPopMatrix()
-    
-    glPopMatrix()
+        g.push()
+        g.translate(-0.6 + i * 0.6, 0.5, 0.65)
+        g.rotate(90, 1, 0, 0)
+        g.cylinder(0.08, 0.4, 6)
+        g.pop()
     
-    # Flame on top (when producing)
-    if prod_level > 0.3:
-        glDisable(GL_LIGHTING)
-        glPushMatrix()
-        glTranslatef(0.7 * scale, 1.5 * scale, 0)
-        
-        flame_height = 0.2 + 0.15 * math.sin(t * 8) * prod_level
-        glColor4f(1.0, 0.5, 0.1, 0.9)
-        glScalef(0.1, flame_height, 0.1)
-        draw_box(1, 1, 1)
-        
-        glColor4f(1.0, 0.8, 0.2, 0.7)
-        glTranslatef(0, 0.3, 0)
-        glScalef(0.7, 0.5, 0.7)
-        draw_box(1, 1, 1)
-        
-        glPopMatrix()
-        glEnable(GL_LIGHTING)
+    g.pop()
 
-def draw_gold_mine(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
-    glPushMatrix()
-    glScalef(scale, scale, scale)
+def draw_refinery(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
+    draw_static(refinery_static, scale, nivel)
+    # The flame on top (when producing) is a particle emitter
+
+def gold_mine_static(g, scale, nivel):
+    g.push()
+    g.scale(scale, scale, scale)
     
     # Mine entrance
-    glColor3f(0.45, 0.35, 0.25)
-    draw_box(1.5, 1.2, 1.0)
+    g.color(0.45, 0.35, 0.25)
+    g.box(1.5, 1.2, 1.0)
     
     # Entrance arch
-    glPushMatrix()
-    glTranslatef(0, 0.6, 0.51)
-    glColor3f(0.55, 0.45, 0.2)
-    draw_prism_triangle(1.0, 0.5, 0.1)
-    glPopMatrix()
+    g.push()
+    g.translate(0, 0.6, 0.51)
+    g.color(0.55, 0.45, 0.2)
+    g.prism(1.0, 0.5, 0.1)
+    g.pop()
     
     # Support beams
-    glColor3f(0.4, 0.3, 0.2)
+    g.color(0.4, 0.3, 0.2)
     for x in [-0.6, 0.6]:
-        glPushMatrix()
-        glTranslatef(x, 0, 0.52)
-        glScalef(0.1, 1.2, 0.1)
-        draw_box(1, 1, 1)
-        glPopMatrix()
+        g.push()
+        g.translate(x, 0, 0.52)
+        g.scale(0.1, 1.2, 0.1)
+        g.box(1, 1, 1)
+        g.pop()
+    
+    g.pop()
+
+def draw_gold_mine(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
+    draw_static(gold_mine_static, scale, nivel)
+    
+    glPushMatrix()
+    glScalef(scale, scale, scale)
     
     # Gold veins (decorative)
     glDisable(GL_LIGHTING)
@@ -951,49 +1180,228 @@ def draw_gold_mine(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
     
     glPopMatrix()
 
-def draw_bank(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
-    glPushMatrix()
-    glScalef(scale, scale * (1 + nivel * 0.1), scale)
+def bank_static(g, scale, nivel):
+    g.push()
+    g.scale(scale, scale * (1 + nivel * 0.1), scale)
     
     # Main building (classic style)
-    glColor3f(0.55, 0.55, 0.58)
-    draw_box(2.0, 1.5, 1.4)
+    g.color(0.55, 0.55, 0.58)
+    g.box(2.0, 1.5, 1.4)
     
     # Columns
-    glColor3f(0.65, 0.65, 0.68)
+    g.color(0.65, 0.65, 0.68)
     for x in [-0.7, -0.35, 0.35, 0.7]:
-        glPushMatrix()
-        glTranslatef(x, 0, 0.72)
-        draw_cylinder(0.08, 1.4, 8)
-        glPopMatrix()
+        g.push()
+        g.translate(x, 0, 0.72)
+        g.cylinder(0.08, 1.4, 8)
+        g.pop()
     
     # Pediment (triangular top)
-    glPushMatrix()
-    glTranslatef(0, 0.95, 0)
-    glColor3f(0.6, 0.6, 0.63)
-    draw_prism_triangle(2.2, 0.6, 0.3)
-    glPopMatrix()
+    g.push()
+    g.translate(0, 0.95, 0)
+    g.color(0.6, 0.6, 0.63)
+    g.prism(2.2, 0.6, 0.3)
+    g.pop()
     
     # Door
-    glColor3f(0.25, 0.2, 0.15)
-    glPushMatrix()
-    glTranslatef(0, -0.35, 0.71)
-    draw_box(0.5, 0.8, 0.02)
-    glPopMatrix()
-    
-    glPopMatrix()
+    g.color(0.25, 0.2, 0.15)
+    g.push()
+    g.translate(0, -0.35, 0.71)
+    g.box(0.5, 0.8, 0.02)
+    g.pop()
     
-    # Dollar sign (floating, animated)
+    g.pop()
+
+def draw_bank(scale=1.0, prod_level=1.0, t=0.0, nivel=1):
+    draw_static(bank_static, scale, nivel)
+    # The floating dollar signs are a particle emitter
+
+# Bounding sphere of one lot: the widest coffee field, smoke and level stars fit inside
+BUILDING_CENTER_Y = 1.5
+BUILDING_RADIUS = 6.0
+
+DRAW_FUNCS = {
+    'madeira': draw_factory,
+    'metal': draw_mine,
+    'energia': draw_hydro,
+    'cafe': draw_coffee,
+    'pesquisa': draw_research,
+    'petroleo': draw_refinery,
+    'ouro': draw_gold_mine,
+    'banco': draw_bank,
+}
+
+def level_star_instances(xs, zs, niveis):
+    """``GLScene.draw_level_indicator``'s stars for every lot, as unlit instances."""
+    partes = [np.empty((0, INSTANCE_FLOATS), np.float32)]
+    for nivel in np.unique(niveis):
+        sel = niveis == nivel
+        i = np.arange(nivel)
+        partes.append(make_instances(
+            xs[sel, None] - 0.3 * (nivel - 1) / 2 + i * 0.3, 2.5, zs[sel, None],
+            0.15, 0.15, 0.02,
+            1.0, 0.85, 0.2, 1.0))
+    return np.concatenate(partes)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PARTICLE EFFECTS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+PARTICLE_BUDGET = 2048
+
+@dataclass(frozen=True)
+class ParticleKind:
+    """Look and motion of one effect; size and color blend from start to end over a lifetime."""
+    lifetime: float
+    velocity: Tuple[float, float, float]
+    spread: float                               # horizontal jitter of the spawn point
+    size: Tuple[float, float]
+    aspect: Tuple[float, float, float]          # per-axis size multiplier
+    color_start: Tuple[float, float, float, float]
+    color_end: Tuple[float, float, float, float]
+    sway: float = 0.0                           # radius of the sideways drift, grows with age
+    fade_in: bool = False                       # alpha also ramps up from zero
+
+PARTICLE_KINDS = {
+    'smoke': ParticleKind(lifetime=1.5, velocity=(0.0, 1.0, 0.0), spread=0.05, size=(0.16, 0.4),
+                          aspect=(1, 1, 1), color_start=(0.2, 0.2, 0.25, 0.6),
+                          color_end=(0.2, 0.2, 0.25, 0.06), sway=0.1),
+    'flame': ParticleKind(lifetime=0.3, velocity=(0.0, 1.2, 0.0), spread=0.03, size=(0.11, 0.04),
+                          aspect=(1, 1.6, 1), color_start=(1.0, 0.5, 0.1, 0.9),
+                          color_end=(1.0, 0.8, 0.2, 0.7), sway=0.02),
+    'dollar': ParticleKind(lifetime=2.0, velocity=(0.0, 0.15, 0.0), spread=0.0, size=(0.25, 0.25),
+                           aspect=(0.8, 1, 0.2), color_start=(0.2, 0.8, 0.3, 0.9),
+                           color_end=(0.2, 0.8, 0.3, 0.9), fade_in=True),
+}
+
+class ParticleSystem:
+    """Every particle of the scene in preallocated NumPy arrays.
+
+    Buildings act as emitters: each frame the scene passes one origin, rate
+    and intensity per emitting lot and kind to ``emit``. ``update`` then
+    spawns (Poisson per emitter), ages and moves all particles with array
+    math. ``instances`` returns them depth-sorted for one transparent draw.
+    When emitters ask for more particles than the budget has free slots,
+    every request is thinned by the same factor, so a huge city gets
+    sparser effects instead of a slower frame.
+    """
+
+    def __init__(self, budget: int = PARTICLE_BUDGET, seed: int = 0):
+        self.rng = np.random.default_rng(seed)
+        self.kinds = list(PARTICLE_KINDS)
+        tipos = [PARTICLE_KINDS[k] for k in self.kinds]
+        self._lifetime = np.array([k.lifetime for k in tipos])
+        self._velocity = np.array([k.velocity for k in tipos])
+        self._spread = np.array([k.spread for k in tipos])
+        self._size = np.array([k.size for k in tipos])
+        self._aspect = np.array([k.aspect for k in tipos], dtype=np.float64)
+        self._color_start = np.array([k.color_start for k in tipos])
+        self._color_end = np.array([k.color_end for k in tipos])
+        self._sway = np.array([k.sway for k in tipos])
+        self._fade_in = np.array([k.fade_in for k in tipos])
+        self.resize(budget)
+
+    def resize(self, budget: int):
+        """Reallocate for a new budget; live particles are dropped."""
+        self.budget = max(0, int(budget))
+        self.position = np.zeros((self.budget, 3))
+        self.age = np.zeros(self.budget)
+        self.kind = np.zeros(self.budget, dtype=np.int64)
+        self.phase = np.zeros(self.budget)
+        self.intensity = np.zeros(self.budget)
+        self.alive = np.zeros(self.budget, dtype=bool)
+        self._pending = []
+
+    @property
+    def count(self) -> int:
+        return int(self.alive.sum())
+
+    def emit(self, kind: str, origins: np.ndarray, rates, intensities):
+        """Queue this frame's emitters of one kind.
+
+        ``origins`` is (E, 3), ``rates`` in particles per time unit and
+        ``intensities`` (0..1) scale the opacity of what they emit.
+        """
+        if len(origins):
+            self._pending.append((self.kinds.index(kind), np.asarray(origins, dtype=np.float64),
+                                  np.broadcast_to(rates, len(origins)),
+                                  np.broadcast_to(intensities, len(origins))))
+
+    def update(self, dt: float):
+        vivos = self.alive
+        self.age[vivos] += dt
+        self.position[vivos] += self._velocity[self.kind[vivos]] * dt
+        vivos &= self.age < self._lifetime[self.kind]
+
+        pendentes, self._pending = self._pending, []
+        if not pendentes or not self.budget:
+            return
+        kind = np.concatenate([np.full(len(o), k) for k, o, _, _ in pendentes])
+        origins = np.concatenate([o for _, o, _, _ in pendentes])
+        intensity = np.concatenate([i for _, _, _, i in pendentes])
+        counts = self.rng.poisson(np.concatenate([r for _, _, r, _ in pendentes]) * dt)
+        fonte = np.repeat(np.arange(len(counts)), counts)
+        livres = np.flatnonzero(~vivos)
+        if len(fonte) > len(livres):
+            fonte = np.sort(self.rng.choice(fonte, len(livres), replace=False))
+        total = len(fonte)
+        slots = livres[:total]
+        kind = kind[fonte]
+        jitter = self.rng.uniform(-1, 1, (total, 3)) * self._spread[kind, None] * (1, 0, 1)
+        self.position[slots] = origins[fonte] + jitter
+        # Spread births over the frame so a burst does not move in lockstep
+        self.age[slots] = self.rng.uniform(0, dt, total)
+        self.kind[slots] = kind
+        self.phase[slots] = self.rng.uniform(0, 2 * np.pi, total)
+        self.intensity[slots] = intensity[fonte]
+        self.alive[slots] = True
+
+    def instances(self, modelview: np.ndarray) -> np.ndarray:
+        """Instance rows of the live particles, farthest from the eye first.
+
+        ``modelview`` is the column-major matrix from ``glGetFloatv``, so
+        row vectors times it give eye coordinates.
+        """
+        idx = np.flatnonzero(self.alive)
+        kind = self.kind[idx]
+        rise = np.clip(self.age[idx] / self._lifetime[kind], 0.0, 1.0)
+        swing = self.phase[idx] + self.age[idx] * 1.2
+        sway = self._sway[kind] * (1 + 0.4 * rise)
+        position = self.position[idx] + np.stack([np.sin(swing), np.zeros_like(swing), np.cos(swing)], axis=1) * sway[:, None]
+        size = (self._size[kind, 0] + (self._size[kind, 1] - self._size[kind, 0]) * rise)[:, None] * self._aspect[kind]
+        color = self._color_start[kind] + (self._color_end[kind] - self._color_start[kind]) * rise[:, None]
+        color[:, 3] *= self.intensity[idx] * np.where(self._fade_in[kind], np.sin(np.pi * rise), 1.0)
+        eye_z = np.hstack([position, np.ones((len(idx), 1))]) @ modelview[:, 2]
+        order = np.argsort(eye_z)
+        return make_instances(*position[order].T, *size[order].T, *color[order].T)
+
+def emit_building_particles(particles: ParticleSystem, kinds, xs, zs, niveis, prod_levels, scale=1.0):
+    """Emitters of the visible lots: smoke and flame while productive, bank dollars always."""
+    fabricas = (kinds == 'madeira') & (prod_levels > 0.2)
+    particles.emit('smoke',
+                   np.stack([xs[fabricas] + 1.1*scale, np.full(fabricas.sum(), 2.1*scale), zs[fabricas]], axis=1),
+                   (3 + niveis[fabricas]) / PARTICLE_KINDS['smoke'].lifetime, 1.0)
+    refinarias = (kinds == 'petroleo') & (prod_levels > 0.3)
+    particles.emit('flame',
+                   np.stack([xs[refinarias] + 0.7*scale, np.full(refinarias.sum(), 1.4*scale), zs[refinarias]], axis=1),
+                   20.0, 1.0)
+    bancos = kinds == 'banco'
+    particles.emit('dollar',
+                   np.stack([xs[bancos], np.full(bancos.sum(), 1.5*scale), zs[bancos]], axis=1),
+                   0.75, 1.0)
+
+def draw_particles_immediate(instances: np.ndarray):
+    """Fallback for ``InstanceRenderer.draw_transparent``: one draw_box per particle."""
     glDisable(GL_LIGHTING)
-    glPushMatrix()
-    y_offset = 1.6 * scale + 0.1 * math.sin(t * 2)
-    glTranslatef(0, y_offset, 0)
-    
-    intensity = 0.6 + 0.4 * math.sin(t * 1.5)
-    glColor4f(0.2 * intensity, 0.8 * intensity, 0.3 * intensity, 0.9)
-    glScalef(0.2, 0.25, 0.05)
-    draw_box(1, 1, 1)
-    glPopMatrix()
+    glDepthMask(GL_FALSE)
+    for x, y, z, sx, sy, sz, r, g, b, a in instances:
+        glPushMatrix()
+        glTranslatef(x, y, z)
+        glScalef(sx, sy, sz)
+        glColor4f(r, g, b, a)
+        draw_box(1, 1, 1)
+        glPopMatrix()
+    glDepthMask(GL_TRUE)
     glEnable(GL_LIGHTING)
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -1010,9 +1418,13 @@ class GLScene(QOpenGLWidget):
         self.target_zoom = 45.0
         self.last_pos = None
         self.time = 0.0
+        self.particles = ParticleSystem(PARTICLE_BUDGET)
         self.setMinimumSize(600, 400)
         
     def initializeGL(self):
+        MESHES.reset()
+        INSTANCES.initialize()
+        WATER.initialize()
         glEnable(GL_DEPTH_TEST)
         glEnable(GL_COLOR_MATERIAL)
         glEnable(GL_NORMALIZE)
@@ -1046,7 +1458,8 @@ class GLScene(QOpenGLWidget):
         glMatrixMode(GL_MODELVIEW)
         
     def paintGL(self):
-        self.time += 0.025
+        dt = 0.025
+        self.time += dt
         
         # Smooth camera movement
         self.camera_angle[0] += (self.camera_target_angle[0] - self.camera_angle[0]) * 0.15
@@ -1069,7 +1482,11 @@ class GLScene(QOpenGLWidget):
         
         self.draw_ground()
         self.draw_grid()
+        MESHES.begin_frame()
         self.draw_constructions()
+        self.particles.update(dt)
+        self.draw_particles()
+        MESHES.end_frame()
         
     def draw_sky_gradient(self):
         glDisable(GL_DEPTH_TEST)
@@ -1137,16 +1554,38 @@ class GLScene(QOpenGLWidget):
         glEnd()
         glEnable(GL_LIGHTING)
         
+    def visible_mask(self, xs, zs):
+        """Which building lots intersect the view frustum (bounding-sphere test).
+
+        The planes come from the current projection * modelview matrix, so
+        this must run after the camera is set up.
+        """
+        # glGet returns column-major matrices, so this is the transpose of P * MV
+        clip = (np.array(glGetFloatv(GL_MODELVIEW_MATRIX), dtype=np.float64).reshape(4, 4)
+                @ np.array(glGetFloatv(GL_PROJECTION_MATRIX), dtype=np.float64).reshape(4, 4))
+        planes = np.stack([clip[:, 3] + clip[:, i] * sign for i in range(3) for sign in (1, -1)])
+        planes /= np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+        centers = np.stack([xs, np.full_like(xs, BUILDING_CENTER_Y), zs, np.ones_like(xs)], axis=1)
+        return ((centers @ planes.T) >= -BUILDING_RADIUS).all(axis=1)
+    
     def draw_constructions(self):
         gap = 6.5
         cols = 6
         
-        for idx, c in enumerate(self.empresa.construcoes):
+        construcoes = self.empresa.construcoes
+        lots = np.arange(len(construcoes))
+        xs = (lots % cols - (cols - 1) / 2) * gap
+        zs = (lots // cols - 1) * gap
+        # Most lots of a large city are off screen; skip them before any GL call
+        visible = np.flatnonzero(self.visible_mask(xs, zs))
+        niveis = np.zeros(len(construcoes), dtype=np.int64)
+        prod_levels = np.zeros(len(construcoes))
+        kinds = [None] * len(construcoes)
+        for idx in visible:
+            c = construcoes[idx]
             modelo = c.modelo
-            col = idx % cols
-            row = idx // cols
-            x = (col - (cols - 1) / 2) * gap
-            z = (row - 1) * gap
+            x, z = xs[idx], zs[idx]
+            niveis[idx], kinds[idx] = c.nivel, modelo.id
             
             # Calculate production level
             prod_level = 0.0
@@ -1156,23 +1595,15 @@ class GLScene(QOpenGLWidget):
                     prod_level = min(1.0, rec.quantidade / 200.0)
             else:
                 prod_level = 0.5  # Default for non-producing buildings
+            prod_levels[idx] = prod_level
+            if modelo.id == 'cafe' and INSTANCES.active:
+                continue  # every plantation is drawn at once below
             
             glPushMatrix()
             glTranslatef(x, 0, z)
             
             # Draw appropriate model
-            draw_funcs = {
-                'madeira': draw_factory,
-                'metal': draw_mine,
-                'energia': draw_hydro,
-                'cafe': draw_coffee,
-                'pesquisa': draw_research,
-                'petroleo': draw_refinery,
-                'ouro': draw_gold_mine,
-                'banco': draw_bank,
-            }
-            
-            func = draw_funcs.get(modelo.id)
+            func = DRAW_FUNCS.get(modelo.id)
             if func:
                 func(scale=1.1, prod_level=prod_level, t=self.time, nivel=c.nivel)
             else:
@@ -1181,11 +1612,36 @@ class GLScene(QOpenGLWidget):
                 draw_box(1.5, 1.5, 1.5)
             
             # Level indicator above building
-            self.draw_level_indicator(c.nivel, modelo.nivel_max)
+            if not INSTANCES.active:
+                self.draw_level_indicator(c.nivel, modelo.nivel_max)
             
             glPopMatrix()
+        
+        kinds = np.array(kinds)
+        emit_building_particles(self.particles, kinds[visible], xs[visible], zs[visible],
+                                niveis[visible], prod_levels[visible], 1.1)
+        if INSTANCES.active:
+            coffee = visible[kinds[visible] == 'cafe']
+            factories = visible[kinds[visible] == 'madeira']
+            INSTANCES.draw(
+                coffee_instances(xs[coffee], zs[coffee], niveis[coffee], prod_levels[coffee], self.time, 1.1),
+                np.concatenate([level_star_instances(xs[visible], zs[visible], niveis[visible]),
+                                factory_light_instances(xs[factories], zs[factories], niveis[factories],
+                                                        self.time, 1.1)]))
+    
+    def draw_particles(self):
+        """Every particle in one depth-sorted transparent batch, drawn last."""
+        if not self.particles.count:
+            return
+        modelview = np.array(glGetFloatv(GL_MODELVIEW_MATRIX), dtype=np.float64).reshape(4, 4)
+        instances = self.particles.instances(modelview)
+        if INSTANCES.active:
+            INSTANCES.draw_transparent(instances)
+        else:
+            draw_particles_immediate(instances)
     
     def draw_level_indicator(self, nivel, nivel_max):
+        """Stars for the level; see ``level_star_instances`` for the instanced path."""
         glDisable(GL_LIGHTING)
         glPushMatrix()
         glTranslatef(0, 2.5, 0)
@@ -1254,17 +1710,17 @@ class PriceChartWidget(QWidget):
             painter.drawText(self.rect(), Qt.AlignCenter, "Dados insuficientes")
             return
         
-        prices = rec.preco_historico[-30:]  # Last 30 data points
+        prices = rec.preco_historico.ultimos(30)  # Last 30 data points (zero-copy view)
         
         margin = 40
         w = self.width() - margin * 2
         h = self.height() - margin * 2
         
-        if not prices:
+        if not len(prices):
             return
             
-        min_price = min(prices) * 0.9
-        max_price = max(prices) * 1.1
+        min_price = float(prices.min()) * 0.9
+        max_price = float(prices.max()) * 1.1
         price_range = max_price - min_price if max_price != min_price else 1
         
         # Draw axes
@@ -1313,12 +1769,19 @@ class PriceChartWidget(QWidget):
 # MAIN WINDOW
 # ═══════════════════════════════════════════════════════════════════════════════
 
+LIMITE_DESFAZER = 100
+CAPITAL_INICIAL = 15000.0
+
 class MainWindow(QtWidgets.QMainWindow):
-    def __init__(self):
+    def __init__(self, autosave: Optional[Autosalvamento] = None):
         super().__init__()
         self.setWindowTitle("🏭 Simulador Econômico 3D — Enhanced Edition")
         self.resize(1200, 700)
-        self.empresa = Empresa()
+        self.empresa = Empresa(capital=CAPITAL_INICIAL)
+        self.autosave = autosave
+        self.pilha_desfazer: deque = deque(maxlen=LIMITE_DESFAZER)
+        self.pilha_refazer: List[FotoEmpresa] = []
+        self.plano: Optional[ResultadoPlanejamento] = None
         
         self.setup_ui()
         self.setup_connections()
@@ -1478,6 +1941,52 @@ class MainWindow(QtWidgets.QMainWindow):
         
         tabs.addTab(achieve_tab, "🏆 Conquistas")
         
+        # Planner tab
+        plan_tab = QWidget()
+        plan_layout = QVBoxLayout(plan_tab)
+        
+        plan_label = QLabel("🧭 Planejador de Ações")
+        plan_label.setObjectName("sectionTitle")
+        plan_layout.addWidget(plan_label)
+        
+        plan_params = QHBoxLayout()
+        self.spn_horizonte = QSpinBox()
+        self.spn_horizonte.setRange(1, 1000)
+        self.spn_horizonte.setValue(50)
+        self.spn_horizonte.setToolTip("Turnos simulados à frente")
+        self.spn_sementes = QSpinBox()
+        self.spn_sementes.setRange(1, 4096)
+        self.spn_sementes.setValue(64)
+        self.spn_sementes.setToolTip("Futuros de mercado sorteados por ação")
+        plan_params.addWidget(QLabel("Horizonte:"))
+        plan_params.addWidget(self.spn_horizonte)
+        plan_params.addWidget(QLabel("Sementes:"))
+        plan_params.addWidget(self.spn_sementes)
+        plan_layout.addLayout(plan_params)
+        
+        self.tbl_plano = QTableWidget(0, 5)
+        self.tbl_plano.setHorizontalHeaderLabels(["Ação", "Patrimônio", "Risco (σ)", "P5", "Ruína"])
+        self.tbl_plano.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.tbl_plano.verticalHeader().setVisible(False)
+        self.tbl_plano.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.tbl_plano.setSelectionBehavior(QTableWidget.SelectRows)
+        self.tbl_plano.setSelectionMode(QTableWidget.SingleSelection)
+        plan_layout.addWidget(self.tbl_plano)
+        
+        self.lbl_plano = QLabel("")
+        plan_layout.addWidget(self.lbl_plano)
+        
+        plan_btn_layout = QHBoxLayout()
+        self.btn_planejar = QPushButton("🔍 Avaliar Ações")
+        self.btn_planejar.setObjectName("actionBtn")
+        self.btn_executar_plano = QPushButton("▶️ Executar Selecionada")
+        self.btn_executar_plano.setObjectName("successBtn")
+        plan_btn_layout.addWidget(self.btn_planejar)
+        plan_btn_layout.addWidget(self.btn_executar_plano)
+        plan_layout.addLayout(plan_btn_layout)
+        
+        tabs.addTab(plan_tab, "🧭 Planejador")
+        
         left_layout.addWidget(tabs)
         
         # Action buttons
@@ -1486,6 +1995,18 @@ class MainWindow(QtWidgets.QMainWindow):
         self.btn_turno.setObjectName("successBtn")
         self.btn_turno.setMinimumHeight(40)
         action_layout.addWidget(self.btn_turno)
+        
+        self.spn_turnos = QSpinBox()
+        self.spn_turnos.setRange(1, 100000)
+        self.spn_turnos.setValue(100)
+        self.spn_turnos.setToolTip("Quantidade de turnos para avançar de uma vez")
+        self.spn_turnos.setMinimumHeight(40)
+        action_layout.addWidget(self.spn_turnos)
+        
+        self.btn_turnos = QPushButton("⏩ Avançar N")
+        self.btn_turnos.setObjectName("actionBtn")
+        self.btn_turnos.setMinimumHeight(40)
+        action_layout.addWidget(self.btn_turnos)
         left_layout.addLayout(action_layout)
         
         # Save/Load buttons
@@ -1496,6 +2017,18 @@ class MainWindow(QtWidgets.QMainWindow):
         file_layout.addWidget(self.btn_carregar)
         left_layout.addLayout(file_layout)
         
+        # Undo/Redo buttons
+        history_layout = QHBoxLayout()
+        self.btn_desfazer = QPushButton("↶ Desfazer (Ctrl+Z)")
+        self.btn_refazer = QPushButton("↷ Refazer (Ctrl+Y)")
+        history_layout.addWidget(self.btn_desfazer)
+        history_layout.addWidget(self.btn_refazer)
+        left_layout.addLayout(history_layout)
+        
+        self.lbl_autosave = QLabel("💾 Autosave desativado")
+        self.lbl_autosave.setStyleSheet("color: #81d4fa; font-size: 11px;")
+        left_layout.addWidget(self.lbl_autosave)
+        
         main_layout.addWidget(left_panel)
         
         # GL Scene
@@ -1532,6 +2065,7 @@ class MainWindow(QtWidgets.QMainWindow):
         
     def setup_connections(self):
         self.btn_turno.clicked.connect(self.on_turno)
+        self.btn_turnos.clicked.connect(self.on_turnos)
         self.btn_comprar.clicked.connect(self.on_comprar)
         self.btn_vender.clicked.connect(self.on_vender)
         self.btn_vender_tudo.clicked.connect(self.on_vender_tudo)
@@ -1540,18 +2074,48 @@ class MainWindow(QtWidgets.QMainWindow):
         self.btn_demolir.clicked.connect(self.on_demolir)
         self.btn_salvar.clicked.connect(self.on_salvar)
         self.btn_carregar.clicked.connect(self.on_carregar)
+        self.btn_desfazer.clicked.connect(self.on_desfazer)
+        self.btn_planejar.clicked.connect(self.on_planejar)
+        self.btn_executar_plano.clicked.connect(self.on_executar_plano)
+        self.btn_refazer.clicked.connect(self.on_refazer)
         self.cmb_recurso.currentIndexChanged.connect(self.on_recurso_changed)
         
     def setup_shortcuts(self):
         QShortcut(QKeySequence(Qt.Key_Space), self, self.on_turno)
         QShortcut(QKeySequence("Ctrl+S"), self, self.on_salvar)
         QShortcut(QKeySequence("Ctrl+O"), self, self.on_carregar)
+        QShortcut(QKeySequence("Ctrl+Z"), self, self.on_desfazer)
+        QShortcut(QKeySequence("Ctrl+Y"), self, self.on_refazer)
+        QShortcut(QKeySequence("Ctrl+Shift+Z"), self, self.on_refazer)
         
     def fmoney(self, v: float) -> str:
         return f"R$ {v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
     
     def tick(self):
+        if self.autosave is not None:
+            self.autosave.verificar(self.empresa)
+            self.update_autosave()
         self.gl.update()
+    
+    def update_autosave(self):
+        st = self.autosave.status
+        if st.erro:
+            texto = f"⚠️ Autosave falhou: {st.erro}"
+        elif st.salvando:
+            texto = f"💾 Autosave: salvando… (snapshot {st.snapshot_ms:.2f} ms)"
+        elif st.ultimo_arquivo:
+            texto = (f"💾 Autosave: turno {st.ultimo_turno} às {st.ultima_hora:%H:%M:%S} "
+                     f"em {os.path.basename(st.ultimo_arquivo)} — snapshot {st.snapshot_ms:.2f} ms, "
+                     f"gravação {st.escrita_ms:.0f} ms")
+        else:
+            texto = "💾 Autosave: aguardando"
+        if texto != self.lbl_autosave.text():
+            self.lbl_autosave.setText(texto)
+    
+    def closeEvent(self, event):
+        if self.autosave is not None:
+            self.autosave.encerrar()
+        super().closeEvent(event)
         
     def update_all(self):
         # Update stat cards
@@ -1565,6 +2129,11 @@ class MainWindow(QtWidgets.QMainWindow):
         self.update_minhas_construcoes()
         self.update_eventos()
         self.update_conquistas()
+        # Any change to the game makes the last ranking stale
+        self.plano = None
+        self.update_plano()
+        self.btn_desfazer.setEnabled(bool(self.pilha_desfazer))
+        self.btn_refazer.setEnabled(bool(self.pilha_refazer))
         self.price_chart.update()
         self.gl.update()
         
@@ -1594,7 +2163,11 @@ class MainWindow(QtWidgets.QMainWindow):
         for mid, m in self.empresa.modelos_construcao.items():
             item = QListWidgetItem(f"{m.simbolo} {m.nome} — {self.fmoney(m.custo)}")
             item.setData(Qt.UserRole, mid)
-            item.setToolTip(m.descricao)
+            dica = m.descricao
+            if m.insumos:
+                dica += "\nConsome por unidade: " + ", ".join(
+                    f"{self.empresa.recursos[k].simbolo} {qtd:g}" for k, qtd in m.insumos.items())
+            item.setToolTip(dica)
             
             # Gray out if can't afford
             if self.empresa.capital < m.custo:
@@ -1640,9 +2213,34 @@ class MainWindow(QtWidgets.QMainWindow):
                 item.setForeground(QColor(100, 100, 100))
             self.lst_conquistas.addItem(item)
     
+    # Undo/redo
+    def registrar_desfazer(self, foto: FotoEmpresa):
+        """Remember the state before a completed action; a new action drops the redo history."""
+        self.pilha_desfazer.append(foto)
+        self.pilha_refazer.clear()
+    
+    def on_desfazer(self):
+        if not self.pilha_desfazer:
+            return
+        self.pilha_refazer.append(self.empresa.capturar())
+        self.empresa.restaurar(self.pilha_desfazer.pop())
+        self.update_all()
+    
+    def on_refazer(self):
+        if not self.pilha_refazer:
+            return
+        self.pilha_desfazer.append(self.empresa.capturar())
+        self.empresa.restaurar(self.pilha_refazer.pop())
+        self.update_all()
+    
     # Event handlers
     def on_turno(self):
-        eventos, conquistas = self.empresa.avancar_turno()
+        self.registrar_desfazer(self.empresa.capturar())
+        mercado = self.empresa.mercado
+        if mercado is None:
+            eventos, conquistas = self.empresa.avancar_turno()
+        else:
+            eventos, conquistas = mercado.avancar_turno()[mercado.empresas.index(self.empresa)]
         self.update_all()
         
         # Show achievement notifications
@@ -1658,12 +2256,32 @@ class MainWindow(QtWidgets.QMainWindow):
                 icon = QMessageBox.Information if ev.tipo == 'bonus' else QMessageBox.Warning
                 QMessageBox.information(self, ev.titulo, ev.descricao)
                 
+    def on_turnos(self):
+        n = self.spn_turnos.value()
+        self.registrar_desfazer(self.empresa.capturar())
+        mercado = self.empresa.mercado
+        if mercado is None:
+            eventos, conquistas = self.empresa.avancar_turnos(n)
+        else:
+            eventos, conquistas = mercado.avancar_turnos(n)[mercado.empresas.index(self.empresa)]
+        self.update_all()
+        
+        # One summary instead of a dialog per event
+        resumo = f"{n} turnos avançados — {len(eventos)} eventos."
+        if conquistas:
+            resumo += "\n\n🏆 Conquistas desbloqueadas:\n" + "\n".join(
+                f"{c.icone} {c.nome} (turno {c.turno_desbloqueio})" for c in conquistas
+            )
+        QMessageBox.information(self, "⏩ Avanço Rápido", resumo)
+                
     def on_comprar(self):
         chave = self.cmb_recurso.currentData()
         qtd = self.spn_quantidade.value()
         
+        foto = self.empresa.capturar()
         try:
             self.empresa.comprar_recurso(chave, qtd)
+            self.registrar_desfazer(foto)
             self.update_all()
         except ValueError as e:
             QMessageBox.warning(self, "Erro", str(e))
@@ -1672,8 +2290,10 @@ class MainWindow(QtWidgets.QMainWindow):
         chave = self.cmb_recurso.currentData()
         qtd = self.spn_quantidade.value()
         
+        foto = self.empresa.capturar()
         try:
             self.empresa.vender_recurso(chave, qtd)
+            self.registrar_desfazer(foto)
             self.update_all()
         except ValueError as e:
             QMessageBox.warning(self, "Erro", str(e))
@@ -1692,11 +2312,9 @@ class MainWindow(QtWidgets.QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
-            for r in self.empresa.recursos.values():
-                self.empresa.estatisticas['total_ganho'] += r.quantidade * r.preco
-                self.empresa.estatisticas['recursos_vendidos'] += r.quantidade
-                r.quantidade = 0
-            self.empresa.capital += total
+            self.registrar_desfazer(self.empresa.capturar())
+            self.empresa.executar_ordens([Ordem('vender', k, r.quantidade)
+                                          for k, r in self.empresa.recursos.items() if r.quantidade])
             QMessageBox.information(self, "Venda Completa", f"Receita: {self.fmoney(total)}")
             self.update_all()
             
@@ -1708,8 +2326,10 @@ class MainWindow(QtWidgets.QMainWindow):
         
         modelo_id = item.data(Qt.UserRole)
         
+        foto = self.empresa.capturar()
         try:
             self.empresa.construir(modelo_id)
+            self.registrar_desfazer(foto)
             self.update_all()
         except ValueError as e:
             QMessageBox.warning(self, "Erro", str(e))
@@ -1735,8 +2355,10 @@ class MainWindow(QtWidgets.QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
+            foto = self.empresa.capturar()
             try:
                 self.empresa.upgrade_construcao(idx)
+                self.registrar_desfazer(foto)
                 self.update_all()
             except ValueError as e:
                 QMessageBox.warning(self, "Erro", str(e))
@@ -1758,40 +2380,92 @@ class MainWindow(QtWidgets.QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
+            self.registrar_desfazer(self.empresa.capturar())
             self.empresa.demolir_construcao(idx)
             self.update_all()
             
+    def on_planejar(self):
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            self.plano = planejar_acoes(self.empresa, self.spn_horizonte.value(), self.spn_sementes.value())
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.update_plano()
+    
+    def update_plano(self):
+        avaliacoes = self.plano.avaliacoes if self.plano else []
+        self.tbl_plano.setRowCount(len(avaliacoes))
+        for linha, av in enumerate(avaliacoes):
+            valores = [av.acao.descricao, self.fmoney(av.patrimonio_medio), self.fmoney(av.desvio),
+                       self.fmoney(av.p5), f"{av.prob_ruina:.0%}"]
+            for coluna, texto in enumerate(valores):
+                item = QTableWidgetItem(texto)
+                if coluna:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                if av.prob_ruina > 0:
+                    item.setForeground(QColor(255, 100, 100))
+                self.tbl_plano.setItem(linha, coluna, item)
+        if self.plano:
+            self.lbl_plano.setText(
+                f"{len(avaliacoes)} ações × {self.plano.sementes} sementes × {self.plano.horizonte} turnos "
+                f"em {self.plano.segundos * 1000:.0f} ms"
+            )
+        else:
+            self.lbl_plano.setText("")
+    
+    def on_executar_plano(self):
+        linha = self.tbl_plano.currentRow()
+        if not self.plano or linha < 0:
+            QMessageBox.warning(self, "Erro", "Avalie as ações e selecione uma.")
+            return
+        
+        foto = self.empresa.capturar()
+        try:
+            self.plano.avaliacoes[linha].acao.aplicar(self.empresa)
+            self.registrar_desfazer(foto)
+        except ValueError as e:
+            QMessageBox.warning(self, "Erro", str(e))
+            return
+        self.update_all()
+    
     def on_recurso_changed(self):
         chave = self.cmb_recurso.currentData()
         if chave:
             self.price_chart.set_resource(chave)
             
     def on_salvar(self):
-        filename, _ = QFileDialog.getSaveFileName(
-            self, "Salvar Jogo", "", "JSON Files (*.json)"
+        filename, filtro = QFileDialog.getSaveFileName(
+            self, "Salvar Jogo", "", "Jogo Binário (*.npz);;JSON Files (*.json)"
         )
         
         if filename:
-            if not filename.endswith('.json'):
-                filename += '.json'
+            if not filename.endswith(('.npz', '.json')):
+                filename += '.json' if 'json' in filtro else '.npz'
             
             try:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(self.empresa.to_dict(), f, indent=2, ensure_ascii=False)
+                if filename.endswith('.npz'):
+                    self.empresa.salvar_binario(filename)
+                else:
+                    with open(filename, 'w', encoding='utf-8') as f:
+                        json.dump(self.empresa.to_dict(), f, indent=2, ensure_ascii=False)
                 QMessageBox.information(self, "Sucesso", "Jogo salvo com sucesso!")
             except Exception as e:
                 QMessageBox.critical(self, "Erro", f"Erro ao salvar: {e}")
                 
     def on_carregar(self):
         filename, _ = QFileDialog.getOpenFileName(
-            self, "Carregar Jogo", "", "JSON Files (*.json)"
+            self, "Carregar Jogo", "", "Jogos Salvos (*.npz *.json);;Jogo Binário (*.npz);;JSON Files (*.json)"
         )
         
         if filename:
             try:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                self.empresa.from_dict(data)
+                foto = self.empresa.capturar()
+                if filename.endswith('.npz'):
+                    self.empresa.carregar_binario(filename)
+                else:
+                    with open(filename, 'r', encoding='utf-8') as f:
+                        self.empresa.from_dict(json.load(f))
+                self.registrar_desfazer(foto)
                 self.update_all()
                 QMessageBox.information(self, "Sucesso", "Jogo carregado com sucesso!")
             except Exception as e:
@@ -1801,20 +2475,213 @@ class MainWindow(QtWidgets.QMainWindow):
 # MAIN
 # ═══════════════════════════════════════════════════════════════════════════════
 
+def main_ensemble(args):
+    ordem = [m for m in args.ordem.split(',') if m]
+    
+    def progresso(parcial: ResultadoEnsemble):
+        print(f"  {parcial.execucoes}/{args.ensemble} execuções...", flush=True)
+    
+    res = executar_ensemble(args.ensemble, args.turnos, ordem, args.capital,
+                            args.semente, args.workers, ao_progredir=progresso)
+    
+    print(f"\n{'Turno':>6} {'Média':>14} " + " ".join(f"{'P' + str(p):>14}" for p in PERCENTIS_ENSEMBLE)
+          + f" {'Ruína':>7}")
+    passo = max(1, res.turnos // 20)
+    for t in list(range(passo - 1, res.turnos, passo)):
+        print(f"{t + 1:>6} {res.media[t]:>14,.2f} "
+              + " ".join(f"{res.percentis[p][t]:>14,.2f}" for p in PERCENTIS_ENSEMBLE)
+              + f" {res.prob_ruina[t]:>7.1%}")
+    print(f"\n{res.execucoes} execuções em {res.segundos:.2f}s com {res.workers} workers "
+          f"— {res.execucoes_por_segundo_por_nucleo:.1f} execuções/s/núcleo")
+
+def main_estrategia(args):
+    empresa = Empresa(semente=args.semente)
+    if args.capital is not None:
+        empresa.capital = args.capital
+    res = buscar_estrategia(empresa, args.estrategia, args.feixe, args.acoes_por_turno,
+                            semente=args.semente, workers=args.workers or 1)
+    
+    turno = empresa.turno
+    print(f"Turno {turno}:")
+    for acao in res.plano:
+        if acao.tipo == 'turno':
+            turno += 1
+            if turno < empresa.turno + args.estrategia:
+                print(f"Turno {turno}:")
+        else:
+            print(f"  {acao.descricao}")
+    print(f"\nPatrimônio esperado: {res.valor:,.2f}")
+    print(f"{res.nos} nós em {res.segundos:.2f}s — {res.nos_por_segundo:,.0f} nós/s, "
+          f"cache de transposição {res.taxa_acerto_cache:.1%} de acertos")
+
+def main_reproduzir(args):
+    inicio = time.perf_counter()
+    empresa = reproduzir_diario(args.reproduzir, args.ate_turno)
+    segundos = time.perf_counter() - inicio
+    print(f"Turno {empresa.turno} — capital {empresa.capital:,.2f}, {len(empresa.construcoes)} construções, "
+          f"{empresa.pontos_pesquisa} pontos de pesquisa")
+    print(f"Reproduzido em {segundos:.2f}s")
+
+def _contexto_offscreen(largura, altura):
+    """Make an EGL pbuffer context current: software Mesa (llvmpipe) is enough."""
+    from OpenGL import EGL
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    if not EGL.eglInitialize(display, None, None):
+        raise RuntimeError("EGL indisponível")
+    atributos = (EGL.EGLint * 13)(
+        EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT, EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+        EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8, EGL.EGL_DEPTH_SIZE, 24,
+        EGL.EGL_NONE)
+    config, encontrados = EGL.EGLConfig(), EGL.EGLint()
+    if not EGL.eglChooseConfig(display, atributos, ctypes.pointer(config), 1, ctypes.pointer(encontrados)) \
+            or not encontrados.value:
+        raise RuntimeError("nenhuma configuração EGL com pbuffer e OpenGL")
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    contexto = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+    superficie = EGL.eglCreatePbufferSurface(display, config, (EGL.EGLint * 5)(
+        EGL.EGL_WIDTH, largura, EGL.EGL_HEIGHT, altura, EGL.EGL_NONE))
+    if not EGL.eglMakeCurrent(display, superficie, superficie, contexto):
+        raise RuntimeError("não foi possível ativar o contexto EGL")
+    return display, superficie, contexto
+
+# The two modes may differ by a few edge pixels. Baked meshes are moved to
+# their place on the CPU, while immediate mode has GL compose the same
+# matrices, so a vertex can land one rounding step away. That flips
+# pixels on silhouettes and on the lines where faces cross (a roof sunk
+# into its walls). A neutral glScalef(3)·glScalef(1/3) in immediate mode
+# alone flips some of these pixels too. Colour and lighting must match
+# everywhere else.
+TOLERANCIA_COR_PERFIL = 2         # per channel, out of 255
+TOLERANCIA_PIXELS_PERFIL = 0.001  # share of the frame allowed past TOLERANCIA_COR_PERFIL
+
+def main_perfil_render(args):
+    largura, altura = 800, 600
+    app = QApplication(sys.argv[:1])
+    _contexto_offscreen(largura, altura)
+    empresa = Empresa(semente=args.semente, capital=1e12)
+    modelos = list(empresa.modelos_construcao)
+    for i in range(args.perfil_render):
+        empresa.construir(modelos[i % len(modelos)])
+        for _ in range(i // len(modelos) % empresa.modelos_construcao[modelos[i % len(modelos)]].nivel_max):
+            empresa.upgrade_construcao(i)
+
+    contador = GLCallCounter()
+    contador.install(globals())
+    print(f"Render offscreen {largura}x{altura}, {args.perfil_render} construções, {args.quadros} quadros "
+          f"({glGetString(GL_RENDERER).decode()})")
+    print(f"{'modo':<10}{'chamadas GL/quadro':>20}{'ms/quadro':>12}")
+    imagens = {}
+    for modo in ('imediato', 'vbo'):
+        MESHES.enabled = modo == 'vbo'
+        # initializeGL places the lights under the current modelview, which a
+        # real context starts as identity; the previous mode left a camera there
+        glMatrixMode(GL_MODELVIEW)
+        glLoadIdentity()
+        cena = GLScene(empresa)
+        cena.particles.resize(args.particulas)
+        cena.initializeGL()
+        cena.resizeGL(largura, altura)
+        cena.paintGL()  # warm-up: the mesh cache fills on the first frame
+        glFinish()
+        chamadas, inicio = [], time.perf_counter()
+        for _ in range(args.quadros):
+            contador.take()
+            cena.paintGL()
+            chamadas.append(contador.take())
+            glFinish()
+        ms = (time.perf_counter() - inicio) * 1e3 / args.quadros
+        pixels = glReadPixels(0, 0, largura, altura, GL_RGBA, GL_UNSIGNED_BYTE)
+        imagens[modo] = np.frombuffer(pixels, dtype=np.uint8).reshape(altura, largura, 4).astype(np.int16)
+        print(f"{modo:<10}{int(np.median(chamadas)):>20,}{ms:>12.2f}")
+
+    diferenca = np.abs(imagens['vbo'] - imagens['imediato']).max(axis=2)
+    diferentes = int((diferenca > TOLERANCIA_COR_PERFIL).sum())
+    limite = int(largura * altura * TOLERANCIA_PIXELS_PERFIL)
+    print(f"Imagens: {diferentes} pixels diferentes (máx. {int(diferenca.max())}/255), "
+          f"tolerância {limite} pixels de borda")
+    return 0 if diferentes <= limite else 1
+
 def main():
+    parser = argparse.ArgumentParser(description="Simulador Econômico 3D")
+    parser.add_argument('--ensemble', type=int, metavar='N',
+                        help="roda N simulações headless em paralelo e mostra a distribuição do capital")
+    parser.add_argument('--estrategia', type=int, metavar='TURNOS',
+                        help="procura o melhor plano para os próximos TURNOS turnos (busca em feixe)")
+    parser.add_argument('--feixe', type=int, default=8, help="largura do feixe da busca de estratégia")
+    parser.add_argument('--acoes-por-turno', type=int, default=2)
+    parser.add_argument('--turnos', type=int, default=200)
+    parser.add_argument('--ordem', default='', help="ordem de construção, ex.: banco,madeira,pesquisa")
+    parser.add_argument('--capital', type=float, default=CAPITAL_INICIAL, help="capital inicial")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--diario', metavar='ARQUIVO', help="grava um diário binário de todas as ações da sessão")
+    parser.add_argument('--reproduzir', metavar='ARQUIVO', help="reconstrói um jogo a partir de um diário")
+    parser.add_argument('--ate-turno', type=int, default=None, help="turno a reconstruir com --reproduzir")
+    parser.add_argument('--autosave-turnos', type=int, default=0,
+                        help="autosave a cada N turnos (desligado por padrão; ex.: 10)")
+    parser.add_argument('--autosave-segundos', type=float, default=0, help="autosave a cada N segundos (0 desliga)")
+    parser.add_argument('--autosave-slots', type=int, default=3)
+    parser.add_argument('--autosave-dir', default=DIRETORIO_AUTOSAVE)
+    parser.add_argument('--concorrentes', type=int, default=0, metavar='N',
+                        help="joga num mercado compartilhado com N empresas de IA")
+    parser.add_argument('--render', choices=('vbo', 'imediato'), default='vbo',
+                        help="desenho das primitivas: malhas em VBO ou modo imediato do OpenGL")
+    parser.add_argument('--perfil-render', type=int, metavar='N',
+                        help="renderiza N construções offscreen (EGL, sem GPU) nos dois modos e compara "
+                             "chamadas GL por quadro, tempo e imagem")
+    parser.add_argument('--quadros', type=int, default=30, help="quadros medidos por --perfil-render")
+    parser.add_argument('--particulas', type=int, default=PARTICLE_BUDGET,
+                        help="máximo de partículas vivas (fumaça, chamas, cifrões)")
+    parser.add_argument('--agua', type=int, default=WATER_QUALITY,
+                        help="subdivisões da grade da água por célula (qualidade)")
+    args, qt_args = parser.parse_known_args()
+    if args.ensemble:
+        main_ensemble(args)
+        return
+    if args.estrategia:
+        main_estrategia(args)
+        return
+    if args.reproduzir:
+        try:
+            main_reproduzir(args)
+        except ValueError as e:
+            parser.error(str(e))
+        return
+    try:
+        WATER.set_quality(args.agua)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.perfil_render:
+        sys.exit(main_perfil_render(args))
+    MESHES.enabled = args.render == 'vbo'
+    
     fmt = QSurfaceFormat()
     fmt.setProfile(QSurfaceFormat.CompatibilityProfile)
     fmt.setVersion(2, 1)
     fmt.setSamples(4)  # Anti-aliasing
     QSurfaceFormat.setDefaultFormat(fmt)
     
-    app = QApplication(sys.argv)
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setStyleSheet(DARK_STYLE)
     
-    win = MainWindow()
+    autosave = None
+    if args.autosave_turnos or args.autosave_segundos:
+        autosave = Autosalvamento(args.autosave_dir, args.autosave_slots,
+                                  args.autosave_turnos, args.autosave_segundos)
+    win = MainWindow(autosave)
+    win.gl.particles.resize(args.particulas)
+    if args.concorrentes:
+        mercado = Mercado(semente=args.semente)
+        mercado.registrar(win.empresa)
+        mercado.adicionar_concorrentes(args.concorrentes)
+    if args.diario:
+        win.empresa.iniciar_diario(args.diario)
     win.show()
     
-    sys.exit(app.exec())
+    codigo = app.exec()
+    if win.empresa.diario is not None:
+        win.empresa.diario.fechar()
+    sys.exit(codigo)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,68 @@
+"""Replaying a journal to any turn it passed through."""
+
+import pytest
+
+from economia import Empresa, Mercado, Ordem, reproduzir_diario
+
+def _estado(empresa):
+    return (empresa.turno, empresa.capital, [r.quantidade for r in empresa.recursos.values()],
+            [r.preco for r in empresa.recursos.values()], len(empresa.construcoes))
+
+def _jogo_com_diario():
+    empresa = Empresa(semente=4)
+    for _ in range(3):
+        empresa.avancar_turno()
+    empresa.iniciar_diario(intervalo_checkpoint=5)  # journal starts on turn 4
+    estados = {}
+    empresa.construir('madeira')
+    for _ in range(8):
+        empresa.avancar_turno()
+        estados[empresa.turno] = _estado(empresa)
+    empresa.avancar_turnos(6)  # turns 13..18 in one atomic span
+    estados[empresa.turno] = _estado(empresa)
+    empresa.avancar_turno()
+    empresa.construir('energia')
+    estados[empresa.turno] = _estado(empresa)
+    return empresa.diario.conteudo(), estados
+
+def test_reproduz_cada_turno_registrado():
+    diario, estados = _jogo_com_diario()
+    for turno, estado in estados.items():
+        assert _estado(reproduzir_diario(diario, turno)) == estado
+    assert _estado(reproduzir_diario(diario)) == estados[max(estados)]
+
+@pytest.mark.parametrize('turno', [1, 3, 21, 100])
+def test_turno_fora_do_diario(turno):
+    diario, _ = _jogo_com_diario()
+    with pytest.raises(ValueError, match='fora do diário'):
+        reproduzir_diario(diario, turno)
+
+def test_turno_dentro_de_avanco_atomico():
+    diario, _ = _jogo_com_diario()
+    with pytest.raises(ValueError, match='vários turnos'):
+        reproduzir_diario(diario, 15)
+
+def test_reproduz_jogo_ligado_a_mercado():
+    mercado = Mercado(semente=2)
+    empresa = Empresa(semente=4)
+    empresa.iniciar_diario(intervalo_checkpoint=5)
+    mercado.registrar(empresa)
+    mercado.adicionar_concorrentes(3)
+    empresa.construir('madeira')
+    empresa.construir('ouro')
+    estados = {}
+    for _ in range(15):
+        mercado.enviar_ordens(empresa, [Ordem('vender', 'madeira', 3)])
+        mercado.avancar_turno()
+        estados[empresa.turno] = _estado(empresa)
+    empresa.vender_recurso('ouro', empresa.recursos['ouro'].quantidade)
+    mercado.desligar(empresa)
+    estados[empresa.turno] = _estado(empresa)  # replay stops after a turn's last record
+    empresa.avancar_turno()
+    estados[empresa.turno] = _estado(empresa)
+    
+    diario = empresa.diario.conteudo()
+    for turno, estado in estados.items():
+        assert _estado(reproduzir_diario(diario, turno)) == estado
+    reproduzida = reproduzir_diario(diario)
+    assert reproduzida.to_dict() == empresa.to_dict()
@@ -0,0 +1,43 @@
+"""Mergeable ensemble summaries against the exact statistics of the runs."""
+
+import numpy as np
+
+from economia.ensemble import (
+    ERRO_PERCENTIS, PERCENTIS_ENSEMBLE, ResumoEnsemble, _jogar_lote, executar_ensemble
+)
+
+ORDEM = ('banco', 'madeira', 'metal')
+
+def _capitais(execucoes, turnos, semente):
+    return _jogar_lote(np.random.SeedSequence(semente).spawn(execucoes), turnos, ORDEM, None)
+
+def _conferir_percentis(percentis, capitais):
+    for p in PERCENTIS_ENSEMBLE:
+        exato = np.percentile(capitais, p, axis=0, method='lower')
+        np.testing.assert_allclose(percentis[p], exato, rtol=ERRO_PERCENTIS * 1.0001, atol=0.01)
+
+def test_juntar_lotes_equivale_a_resumir_tudo():
+    capitais = _capitais(40, 25, 1)
+    capitais[:5, 10:] = -capitais[:5, 10:]  # negative capital and ruin
+    inteiro = ResumoEnsemble.de_capitais(capitais)
+    partes = [ResumoEnsemble.de_capitais(capitais[i:i + 7]) for i in range(0, 40, 7)]
+    juntos = partes[0]
+    for parte in partes[1:]:
+        juntos = juntos.juntar(parte)
+    
+    assert juntos.execucoes == 40
+    np.testing.assert_array_equal(juntos.chaves, inteiro.chaves)
+    np.testing.assert_array_equal(juntos.contagens, inteiro.contagens)
+    np.testing.assert_array_equal(juntos.ruinas, np.logical_or.accumulate(capitais < 0, axis=1).sum(axis=0))
+    np.testing.assert_allclose(juntos.media, capitais.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(juntos.m2 / 40, capitais.var(axis=0), rtol=1e-9)
+    _conferir_percentis(juntos.percentis(), capitais)
+
+def test_executar_ensemble_bate_com_as_execucoes():
+    resultado = executar_ensemble(24, 20, ORDEM, semente=2, workers=2, tamanho_lote=5)
+    capitais = _capitais(24, 20, 2)
+    assert resultado.execucoes == 24 and resultado.turnos == 20
+    np.testing.assert_allclose(resultado.media, capitais.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(resultado.desvio, capitais.std(axis=0), rtol=1e-9, atol=1e-6)
+    np.testing.assert_array_equal(resultado.prob_ruina, np.logical_or.accumulate(capitais < 0, axis=1).mean(axis=0))
+    _conferir_percentis(resultado.percentis, capitais)
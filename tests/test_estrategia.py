@@ -0,0 +1,46 @@
+"""Beam search reproducibility and statistics."""
+
+import numpy as np
+
+from economia import Empresa
+from economia.estrategia import _chave_transposicao, buscar_estrategia
+from economia.planejador import _amostrar_futuros
+
+def _buscar(workers=1):
+    return buscar_estrategia(Empresa(semente=1), turnos=3, largura_feixe=3, horizonte_avaliacao=10,
+                             sementes=8, semente=5, workers=workers)
+
+def test_mesma_semente_da_os_mesmos_futuros():
+    foto = Empresa(semente=1).capturar()
+    filhas = np.random.SeedSequence(5).spawn(4)
+    trabalho = Empresa(compacta=True)
+    primeiro = _amostrar_futuros(trabalho, foto, 10, filhas)
+    segundo = _amostrar_futuros(trabalho, foto, 10, filhas)
+    for a, b in zip(primeiro, segundo):
+        np.testing.assert_array_equal(a, b)
+
+def test_busca_reprodutivel_em_serie_e_em_paralelo():
+    serie = _buscar()
+    paralelo = _buscar(workers=2)
+    assert serie.plano == _buscar().plano == paralelo.plano
+    assert serie.valor == paralelo.valor
+
+def test_nos_conta_so_expansoes():
+    resultado = _buscar()
+    # Every expanded node queries the table at least once (its end of turn)
+    assert 0 < resultado.nos < resultado.consultas_cache
+    assert resultado.acertos_cache <= resultado.consultas_cache
+
+def test_chave_separa_movimentos_restantes():
+    # Selling all café in one move or buying more first and then selling it
+    # all leaves the same economy, but only the first can still act this turn
+    empresa = Empresa(semente=1)
+    raiz = empresa.capturar()
+    empresa.vender_recurso('cafe', 20)
+    um_movimento = empresa.capturar()
+    empresa.restaurar(raiz)
+    empresa.comprar_recurso('cafe', 10)
+    empresa.vender_recurso('cafe', 30)
+    dois_movimentos = empresa.capturar()
+    assert _chave_transposicao(um_movimento, 1) != _chave_transposicao(dois_movimentos, 2)
+    assert _chave_transposicao(um_movimento, 1) == _chave_transposicao(dois_movimentos, 1)
@@ -0,0 +1,23 @@
+"""The economia package stays importable on headless machines, and fast to import."""
+
+import json
+import os
+import subprocess
+import sys
+
+from economia.__main__ import importacoes_gui
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_nenhum_import_de_gui_no_fonte():
+    assert importacoes_gui() == []
+
+def test_verificar_passa():
+    # The same check a release runs by hand: a fresh interpreter, so the
+    # Qt/OpenGL modules other tests may have loaded don't count
+    saida = subprocess.run([sys.executable, '-m', 'economia', 'verificar', '--json'], cwd=RAIZ,
+                           capture_output=True, text=True)
+    relatorio = json.loads(saida.stdout)
+    assert relatorio['modulos_gui_carregados'] == []
+    assert relatorio['economia_ms'] <= relatorio['orcamento_ms'], relatorio
+    assert saida.returncode == 0 and relatorio['ok']
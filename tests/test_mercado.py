@@ -0,0 +1,27 @@
+"""AI competitors' shortcut production against a full input solve."""
+
+import numpy as np
+
+from economia import Empresa
+from economia.insumos import _liquidar_insumos, resolver_insumos
+from economia.mercado import Mercado
+
+def test_producao_concorrentes_bate_com_resolver_insumos():
+    mercado = Mercado(semente=5)
+    mercado.registrar(Empresa(semente=5))
+    mercado.adicionar_concorrentes(2000)
+    modelo = mercado._modelo
+    # The first turns start from empty stock, later ones mostly from full
+    for _ in range(25):
+        estoque = mercado.ia_estoque.copy()
+        capital = mercado.ia_capital - mercado.ia_manutencao
+        producao, consumo, _ = resolver_insumos(mercado.ia_potencial, estoque,
+                                                modelo._tab_insumos, modelo._saida_recurso)
+        esperado = estoque + _liquidar_insumos(producao, consumo, estoque)
+        # Clearing trades right after producing; undo the fills to compare
+        ordens = mercado._ordens_concorrentes
+        mercado._ordens_concorrentes = lambda: np.zeros_like(estoque)
+        mercado.avancar_turno()
+        mercado._ordens_concorrentes = ordens
+        np.testing.assert_array_equal(mercado.ia_estoque, esperado)
+        np.testing.assert_array_equal(mercado.ia_capital, capital)
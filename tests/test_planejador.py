@@ -0,0 +1,31 @@
+"""The planner's scores against the real turn engine."""
+
+import numpy as np
+import pytest
+
+from economia import Empresa
+from economia.planejador import planejar_acoes
+
+def _patrimonio_real(foto, acao, horizonte, semente, indice, sementes):
+    empresa = Empresa(compacta=True)
+    empresa.restaurar(foto)
+    acao.aplicar(empresa)
+    empresa._init_rngs(np.random.SeedSequence(semente).spawn(sementes)[indice])
+    empresa.avancar_turnos(horizonte)
+    return empresa.capital + sum(r.quantidade * r.preco for r in empresa.recursos.values())
+
+def test_pontuacao_bate_com_avancar_turnos_com_insumos():
+    # Mineradora and Refinaria consume energy that the single Hidrelétrica
+    # can't cover, so their output is rationed every turn
+    empresa = Empresa(semente=3, capital=200000.0)
+    for modelo in ('energia', 'metal', 'petroleo'):
+        empresa.construir(modelo)
+    horizonte, sementes, semente = 30, 8, 7
+    resultado = planejar_acoes(empresa, horizonte, sementes, semente)
+    foto = empresa.capturar()
+    
+    alvos = {a.acao.alvo for a in resultado.avaliacoes if a.acao.tipo == 'construir'}
+    assert {'metal', 'petroleo'} <= alvos
+    for avaliacao in resultado.avaliacoes:
+        reais = [_patrimonio_real(foto, avaliacao.acao, horizonte, semente, i, sementes) for i in range(sementes)]
+        assert avaliacao.patrimonio_medio == pytest.approx(np.mean(reais), rel=1e-9), avaliacao.acao.descricao